@@ -0,0 +1,111 @@
+"""Sending one run from several quota-limited accounts vs. one account that runs into its daily quota.
+
+Usage:
+    python benchmarks/bench_accounts.py [--messages 900] [--accounts 3] [--quota 300] [--rate 50] [--outside-use 100]
+
+Every account may send ``--quota`` messages a day at ``--rate`` messages per
+second. The local sink enforces the same quotas, except that the last account
+already sent ``--outside-use`` messages elsewhere today, so its server refuses
+it before the journal says it is full. "one account, no quota" is the old
+``SMTPPool`` loop: it sends until the server refuses, and every refusal is a
+failure. "one account" and "N accounts" use ``QuotaScheduler``, which defers
+what no account has room for; a second run over the same journal then sends
+nothing and never reaches the server's limit.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.accounts import QuotaExhausted, QuotaScheduler, SendingAccount  # noqa: E402
+from payment_mail_sender.compose import build_message  # noqa: E402
+from payment_mail_sender.journal import ResumableRun, SendJournal  # noqa: E402
+from payment_mail_sender.transport import SMTPPool  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+FROM_ADDR = "ap@example.com"
+
+
+def messages(count):
+    jobs = []
+    for i in range(count):
+        recipients = [f"party{i}@example.com"] + [f"cc{i}-{j}@example.com" for j in range(i % 3)]
+        _, message = build_message(FROM_ADDR, recipients[:1], f"Statement {i}", f"<p>Statement {i}</p>" * 50,
+                                   cc=recipients[1:])
+        jobs.append((str(i), recipients, message.replace("\n", "\r\n").encode()))
+    return jobs
+
+
+def accounts_for(sink, names, quota, rate):
+    return [SendingAccount(name, "secret", daily_messages=quota, daily_recipients=None, rate=rate,
+                           host="127.0.0.1", port=sink.port, use_ssl=False) for name in names]
+
+
+def scheduled_run(journal, accounts, jobs):
+    run_id = journal.start_run(source="bench")
+    send_run = ResumableRun(journal, run_id, [key for key, _, _ in jobs])
+    todo = [(key, recipients, message) for key, recipients, message in jobs if not send_run.is_delivered(key)]
+    send_run.begin([(key, key, "", recipients, message) for key, recipients, message in todo])
+    scheduler = QuotaScheduler(accounts, journal, run_id)
+    counts = {"sent": 0, "failed": 0, "deferred": 0}
+    start = time.perf_counter()
+    for (key, recipients, message), account, error in scheduler.imap(
+            (FROM_ADDR, recipients, message, (key, recipients, message)) for key, recipients, message in todo):
+        if isinstance(error, QuotaExhausted):
+            send_run.defer(key, key, "", recipients, str(error))
+            counts["deferred"] += 1
+            continue
+        send_run.finish(key, key, "", recipients, error, message=message, account=account)
+        counts["sent" if error is None else "failed"] += 1
+    return counts, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=900)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--quota", type=int, default=300, help="messages per account per day")
+    parser.add_argument("--rate", type=float, default=50.0, help="messages per second per account")
+    parser.add_argument("--outside-use", type=int, default=100,
+                        help="messages the last account already sent outside this journal today")
+    args = parser.parse_args(argv)
+
+    jobs = messages(args.messages)
+    names = [f"sender{i}@example.com" for i in range(args.accounts)]
+    server_quota = dict.fromkeys(names, args.quota)
+    server_quota[names[-1]] = args.quota - args.outside_use
+    print(f"{args.messages} messages, {args.accounts} accounts x {args.quota}/day at {args.rate:g} msg/s "
+          f"({args.outside_use} already used outside the journal on {names[-1]})")
+
+    with SMTPSink(quota=server_quota) as sink:
+        start = time.perf_counter()
+        with SMTPPool(names[0], "secret", host="127.0.0.1", port=sink.port, size=1, use_ssl=False,
+                      rate=args.rate) as pool:
+            errors = [error for _, error in pool.imap((names[0], recipients, message, key)
+                                                      for key, recipients, message in jobs)]
+        elapsed = time.perf_counter() - start
+        sent = sum(error is None for error in errors)
+        print(f"  {'one account, no quota':>24}: sent {sent:4d}, failed {len(errors) - sent:4d}, deferred    0 "
+              f"in {elapsed:5.2f}s ({sent / elapsed:5.1f} msg/s), {sink.rejected} refused by the server")
+
+    for label, count in (("one account", 1), (f"{args.accounts} accounts", args.accounts)):
+        with SMTPSink(quota=server_quota) as sink, tempfile.TemporaryDirectory() as tmp:
+            journal = SendJournal(Path(tmp) / "journal.db")
+            accounts = accounts_for(sink, names[:count], args.quota, args.rate)
+            for run in ("first run", "second run"):
+                counts, elapsed = scheduled_run(journal, accounts, jobs)
+                assert counts["failed"] == 0
+                assert sink.messages == sum(usage[0] for usage in sink.usage.values())
+                print(f"  {label + ', ' + run:>24}: sent {counts['sent']:4d}, failed {counts['failed']:4d}, "
+                      f"deferred {counts['deferred']:4d} in {elapsed:5.2f}s "
+                      f"({counts['sent'] / elapsed if counts['sent'] else 0:5.1f} msg/s), "
+                      f"{sink.rejected} refused by the server so far")
+            delivered = journal.delivered_keys(None)
+            assert len(delivered) == sink.messages  # nothing delivered twice
+            journal.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Load one workbook per channel one after another vs. in parallel with load_many.
+
+Usage:
+    python benchmarks/bench_batch_ingest.py [--channels Amazon Flipkart Meesho Myntra] [--rows 10000] [--workers 1 2 4]
+
+The sequential baseline is what the dashboard did before: load_excel on each
+upload in turn. load_many's merged frames are checked against concatenating
+those results (no bills overlap between channels, so nothing is dropped), and
+an extra copy of the first channel's workbook must come back fully dropped as
+duplicates. Parallel speedup is bounded by the CPU count.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.ingest import load_excel, load_many  # noqa: E402
+from workload import write_vendor_workbook  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", nargs="+", default=["Amazon", "Flipkart", "Meesho", "Myntra"])
+    parser.add_argument("--rows", type=int, default=10000, help="rows per workbook")
+    parser.add_argument("--parties", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [write_vendor_workbook(Path(tmp) / f"{channel}.xlsx", args.rows, args.parties, seed=i,
+                                       channel=channel, bill_prefix=channel[:3].upper())
+                 for i, channel in enumerate(args.channels)]
+        print(f"{len(paths)} workbooks x {args.rows} rows, {os.cpu_count()} CPUs")
+
+        start = time.perf_counter()
+        frames = [load_excel(path) for path in paths]
+        sequential_t = time.perf_counter() - start
+        expected_pay = pd.concat([f[0] for f in frames], ignore_index=True)
+        expected_debit = pd.concat([f[1] for f in frames], ignore_index=True)
+        print(f"{'sequential load_excel':>24}: {sequential_t:6.2f}s")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            payment_df, debit_df, report = load_many(paths, workers=workers)
+            elapsed = time.perf_counter() - start
+            pd.testing.assert_frame_equal(payment_df, expected_pay)
+            pd.testing.assert_frame_equal(debit_df, expected_debit)
+            print(f"{f'load_many workers={workers}':>24}: {elapsed:6.2f}s  "
+                  f"(per file {', '.join(f'{s:.2f}' for s in report['Seconds'])}s)")
+
+        duplicate = write_vendor_workbook(Path(tmp) / "duplicate.xlsx", args.rows, args.parties, seed=0,
+                                          channel=args.channels[0], bill_prefix=args.channels[0][:3].upper())
+        payment_df, _, report = load_many(paths + [duplicate], workers=max(args.workers))
+        assert len(payment_df) == len(expected_pay), (len(payment_df), len(expected_pay))
+        assert report["Duplicates Dropped"].iloc[-1] == args.rows
+        print(f"{'with a duplicate file':>24}: {report['Duplicates Dropped'].iloc[-1]} rows dropped as duplicates")
+
+
+if __name__ == "__main__":
+    main()
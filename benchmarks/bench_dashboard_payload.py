@@ -0,0 +1,102 @@
+"""Bytes each dashboard rerun ships to the browser for the party sections, old vs. paginated.
+
+Usage:
+    python benchmarks/bench_dashboard_payload.py [--parties 100 700 2000] [--rows-per-party 30]
+
+Streamlit can't run here, so this measures the payloads the widgets
+serialize: the old "Ready to Email" section sent one ``st.json(entry)`` per
+matched party (every payment row) and one HTML card per party without an
+email; the new one sends one page of ``party_summary`` (Arrow, like
+``st.dataframe``) per table. The summary is computed once per upload and
+cached, so its time is only paid on the first rerun.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.ingest import normalize_vendor_frame  # noqa: E402
+from payment_mail_sender.matching import match_data  # noqa: E402
+from payment_mail_sender.summary import party_summary  # noqa: E402
+from workload import VENDOR_HEADERS, party_names, vendor_rows  # noqa: E402
+
+PAGE_SIZE = 25
+
+
+def legacy_payload(matched_results, parties_without_email):
+    # What the per-party st.json expanders and HTML cards serialized
+    size = sum(len(json.dumps(dict(entry, payments=entry['payments'].records(), debits=entry['debits'].records()),
+                              default=str)) for entry in matched_results)
+    for party in parties_without_email:
+        size += len(f"""
+                        <div style="
+                            background-color: #fff3cd;
+                            border: 1px solid #ffeaa7;
+                            border-radius: 8px;
+                            padding: 15px;
+                            margin: 5px 0;
+                            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                        ">
+                            <h4 style="color: #856404; margin: 0 0 8px 0;">🏢 {party['party_name']}</h4>
+                            <p style="margin: 2px 0; color: #6c757d;"><strong>Code:</strong> {party['party_code']}</p>
+                            <p style="margin: 2px 0; color: #6c757d;"><strong>Payment Records:</strong> {party['payment_count']}</p>
+                            <div style="
+                                background-color: #f8d7da;
+                                color: #721c24;
+                                padding: 5px 10px;
+                                border-radius: 4px;
+                                font-size: 0.85em;
+                                margin-top: 8px;
+                                text-align: center;
+                            ">
+                                ⚠️ Email Required
+                            </div>
+                        </div>
+                        """.encode())
+    return size, len(matched_results) + 2 * len(parties_without_email)
+
+
+def arrow_size(frame):
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parties", type=int, nargs="+", default=[100, 700, 2000])
+    parser.add_argument("--rows-per-party", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    for parties in args.parties:
+        raw = pd.DataFrame(list(vendor_rows(parties * args.rows_per_party, parties)), columns=VENDOR_HEADERS)
+        for column in ("Invoice Date", "Payment Date"):
+            raw[column] = pd.to_datetime(raw[column])
+        payment_df, debit_df = normalize_vendor_frame(raw)
+        # Every tenth party has no email address
+        party_emails = [{"PartyCode": "", "PartyName": name, "Email": "" if i % 10 == 0 else "ap@example.com", "CC": ""}
+                        for i, name in enumerate(party_names(parties))]
+        matched_results, _, parties_without_email = match_data(payment_df, debit_df, party_emails)
+
+        old_bytes, old_widgets = legacy_payload(matched_results, parties_without_email)
+        start = time.perf_counter()
+        summary = party_summary(payment_df, debit_df, matched_results)
+        summary_t = time.perf_counter() - start
+        assert summary["Rows"].tolist() == [len(entry['payments']) for entry in matched_results]
+        missing = pd.DataFrame(parties_without_email)
+        new_bytes = arrow_size(summary.iloc[:PAGE_SIZE]) + arrow_size(missing.iloc[:PAGE_SIZE])
+        detail_bytes = arrow_size(matched_results[0]['payments'].plain())
+        print(f"{parties:>5} parties: old {old_bytes / 1024:8.0f} KB in {old_widgets} widgets; "
+              f"new {new_bytes / 1024:5.1f} KB in 2 tables (+{detail_bytes / 1024:.1f} KB for one party's rows); "
+              f"party_summary {summary_t * 1000:.0f}ms once per upload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Database source vs. exported workbook, using a SQLite stand-in for EasySell.
+
+The same seeded rows are written to a PaymentDetails table and to a vendor
+workbook; both must normalize to identical frames before timings are printed.
+
+    python benchmarks/bench_db_source.py --rows 20000 --chunk-size 5000
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from payment_mail_sender.datasource import (  # noqa: E402
+    ConnectionPool, build_payment_query, create_standin, load_database, sqlite_connector,
+)
+from payment_mail_sender.ingest import parse_workbook  # noqa: E402
+from workload import VENDOR_HEADERS, vendor_rows, write_vendor_workbook  # noqa: E402
+
+_TABLE_COLUMNS = {
+    "SellerName": "Seller Name", "Channel": "Channel", "TransactionType": "Transaction Type",
+    "Category": "Category", "BillNo": "Bill No", "InvoiceDate": "Invoice Date",
+    "TotalWithTax": "Total With Tax", "CR": "CR", "DR": "DR", "MainAdvisedNo": "Main Advised No",
+    "SellerAdvisedNo": "Seller Advised No", "PaymentDate": "Payment Date",
+}
+
+
+def populate_standin(db_path, rows, parties, seed):
+    create_standin(db_path)
+    positions = [VENDOR_HEADERS.index(header) for header in _TABLE_COLUMNS.values()]
+    placeholders = ", ".join("?" * (len(positions) + 1))
+    conn = sqlite3.connect(str(db_path))
+    with conn:
+        conn.executemany(
+            f"INSERT INTO PaymentDetails (Id, {', '.join(_TABLE_COLUMNS)}) VALUES ({placeholders})",
+            ((i + 1, *[row[p].isoformat() if hasattr(row[p], "isoformat") else row[p] for p in positions])
+             for i, row in enumerate(vendor_rows(rows, parties, seed=seed))),
+        )
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--parties", type=int, default=300)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "easysell.db"
+        xlsx_path = Path(tmp) / "payments.xlsx"
+        populate_standin(db_path, args.rows, args.parties, args.seed)
+        write_vendor_workbook(xlsx_path, args.rows, args.parties, seed=args.seed)
+
+        start = time.perf_counter()
+        expected = parse_workbook(xlsx_path)
+        xlsx_t = time.perf_counter() - start
+
+        with ConnectionPool(sqlite_connector(db_path), size=2) as pool:
+            query, params = build_payment_query()
+            start = time.perf_counter()
+            actual = load_database(pool, query, params, chunk_size=args.chunk_size)
+            db_t = time.perf_counter() - start
+            # Second load reuses the pooled connection
+            start = time.perf_counter()
+            load_database(pool, query, params, chunk_size=args.chunk_size)
+            warm_t = time.perf_counter() - start
+            opened = pool.opened
+
+    pd.testing.assert_frame_equal(actual[0], expected[0])
+    pd.testing.assert_frame_equal(actual[1], expected[1])
+    print(f"{args.rows} rows, chunk {args.chunk_size}: export+parse xlsx {xlsx_t:.2f}s, "
+          f"database {db_t:.3f}s (warm {warm_t:.3f}s, {opened} connection opened)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Corrected re-upload: full re-match and re-render vs. rebuilding only the parties whose fingerprint changed.
+
+Usage:
+    python benchmarks/bench_delta.py [--parties 700] [--rows-per-party 30] [--changed 0.02 0.1 0.5] [--repeat 3]
+
+The "afternoon" upload is the morning one with the amounts of a share of the
+parties' first row corrected. "full" runs ``match_data`` and renders a fresh
+outbox; "delta" runs ``reconcile`` against the morning reconciliation and
+rebuilds the morning outbox with the new fingerprints. Both must produce the
+same matched entries and the same message keys.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.delta import reconcile  # noqa: E402
+from payment_mail_sender.directory import PartyDirectory  # noqa: E402
+from payment_mail_sender.ingest import normalize_vendor_frame  # noqa: E402
+from payment_mail_sender.matching import group_party_rows, match_data  # noqa: E402
+from payment_mail_sender.outbox import build_outbox  # noqa: E402
+from workload import VENDOR_HEADERS, party_names, vendor_rows  # noqa: E402
+
+FROM_ADDR = "bench@example.com"
+
+
+def corrected(payment_df, share, seed=7):
+    # Bump the first row of a random share of the parties by one rupee
+    groups, _ = group_party_rows(payment_df["Party Name"])
+    keys = sorted(groups)
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(keys), size=max(1, int(len(keys) * share)), replace=False)
+    rows = [groups[keys[i]][0] for i in picked]
+    afternoon = payment_df.copy()
+    column = afternoon.columns.get_loc("Total Inv. Amount")
+    afternoon.iloc[rows, column] = afternoon.iloc[rows, column] + 1
+    return afternoon, len(picked)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parties", type=int, default=700)
+    parser.add_argument("--rows-per-party", type=int, default=30)
+    parser.add_argument("--changed", type=float, nargs="+", default=[0.02, 0.1, 0.5],
+                        help="share of parties corrected in the afternoon upload")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    raw = pd.DataFrame(list(vendor_rows(args.parties * args.rows_per_party, args.parties)), columns=VENDOR_HEADERS)
+    for column in ("Invoice Date", "Payment Date"):
+        raw[column] = pd.to_datetime(raw[column])
+    payment_df, debit_df = normalize_vendor_frame(raw)
+    directory = PartyDirectory([{"PartyCode": "", "PartyName": name, "Email": "ap@example.com", "CC": ""}
+                                for name in party_names(args.parties)])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        morning = reconcile(payment_df, debit_df, directory.entries)
+        build_outbox(tmp / "morning", morning.matched_results, directory, FROM_ADDR, fingerprints=morning.fingerprints)
+        for share in args.changed:
+            afternoon_df, changed = corrected(payment_df, share)
+            best = {"full": float("inf"), "delta": float("inf")}
+            for _ in range(args.repeat):
+                shutil.rmtree(tmp / "full", ignore_errors=True)
+                start = time.perf_counter()
+                matched_results, _, _ = match_data(afternoon_df.copy(), debit_df, directory.entries)
+                full = build_outbox(tmp / "full", matched_results, directory, FROM_ADDR)
+                best["full"] = min(best["full"], time.perf_counter() - start)
+
+                shutil.rmtree(tmp / "delta", ignore_errors=True)
+                shutil.copytree(tmp / "morning", tmp / "delta")
+                start = time.perf_counter()
+                reconciliation = reconcile(afternoon_df.copy(), debit_df, directory.entries, previous=morning)
+                delta = build_outbox(tmp / "delta", reconciliation.matched_results, directory, FROM_ADDR,
+                                     fingerprints=reconciliation.fingerprints)
+                best["delta"] = min(best["delta"], time.perf_counter() - start)
+
+            assert reconciliation.matched_results == matched_results
+            assert [m["key"] for m in delta.messages] == [m["key"] for m in full.messages]
+            assert len(reconciliation.delta.changed) == changed and len(delta) - delta.reused == changed
+            print(f"{share:5.0%} of {len(matched_results)} parties changed ({reconciliation.delta}): "
+                  f"full {best['full']:6.2f}s, delta {best['delta']:6.2f}s ({best['full'] / best['delta']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
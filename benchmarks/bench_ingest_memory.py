@@ -0,0 +1,87 @@
+"""Peak memory of parse_workbook vs. the streaming reader, each in a fresh process.
+
+Usage:
+    python benchmarks/bench_ingest_memory.py [--rows 20000 100000] [--chunk-rows 2000 20000]
+
+Each load runs in its own subprocess and reports its peak RSS minus the RSS
+after imports, so the numbers are the cost of the load itself. The streaming
+frames are checked against parse_workbook with ``assert_frame_equal`` first.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def _rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, path, chunk_rows):
+    import pandas as pd  # noqa: F401  (imported before the baseline is taken)
+
+    from payment_mail_sender.ingest import parse_workbook, stream_workbook
+
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    if mode == "verify":
+        expected = parse_workbook(path)
+        actual = stream_workbook(path, chunk_rows=chunk_rows)
+        pd.testing.assert_frame_equal(actual[0], expected[0])
+        pd.testing.assert_frame_equal(actual[1], expected[1])
+        payment_df = actual[0]
+    elif mode == "parse":
+        payment_df, _ = parse_workbook(path)
+    else:
+        payment_df, _ = stream_workbook(path, chunk_rows=chunk_rows)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_mb": _rss_mb() - baseline,
+        "output_mb": payment_df.memory_usage(index=True, deep=True).sum() / 1024 / 1024,
+    }))
+
+
+def run_child(mode, path, chunk_rows=0):
+    proc = subprocess.run([sys.executable, __file__, "--child", mode, str(path), str(chunk_rows)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--chunk-rows", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--parties", type=int, default=700)
+    args = parser.parse_args(argv)
+
+    from workload import write_vendor_workbook
+
+    print(f"{'rows':>8} {'reader':>18} {'seconds':>8} {'peak MB':>8} {'output MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = Path(tmp) / f"vendor_{rows}.xlsx"
+            write_vendor_workbook(path, rows, args.parties)
+            run_child("verify", path, min(args.chunk_rows))
+            runs = [("parse_workbook", run_child("parse", path))]
+            for chunk_rows in args.chunk_rows:
+                runs.append((f"stream/{chunk_rows}", run_child("stream", path, chunk_rows)))
+            for label, result in runs:
+                print(f"{rows:>8} {label:>18} {result['seconds']:>8.2f} {result['peak_mb']:>8.1f} {result['output_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,119 @@
+"""Send-journal append cost and report refresh time against the old text-log conversion.
+
+Usage:
+    python benchmarks/bench_journal.py [--records 700 20000] [--batch-size 20]
+
+Appends: one fsync per record (like the old bulk-mode checkpoint file) vs.
+SendJournal's batched commits. Report: the old section re-read and
+string-parsed FinalEmailLog.txt into a workbook on every rerun; JournalReport only fetches rows appended since
+its last refresh. Rerun times are for a rerun after one more send.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+import xlsxwriter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.journal import JournalReport, SendJournal, write_report  # noqa: E402
+
+
+def legacy_log_to_excel(log_path):
+    # Verbatim copy of the old "Convert Final Email Log to Excel" section, kept as the baseline
+    with open(log_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output)
+    worksheet = workbook.add_worksheet("Email Log")
+    headers = ["Status", "Party Code", "Party Name", "Emails / Error"]
+    for col, header in enumerate(headers):
+        worksheet.write(0, col, header)
+    row_num = 1
+    for line in lines:
+        line = line.strip()
+        if line.startswith("Party Code:"):
+            parts = line.replace("Party Code:", "").split("|")
+            party_code = parts[0].strip()
+            party_name = parts[1].replace("Party Name:", "").strip() if len(parts) > 1 else ""
+            emails = parts[2].replace("Emails:", "").strip() if len(parts) > 2 else ""
+            worksheet.write_row(row_num, 0, ["SENT", party_code, party_name, emails])
+            row_num += 1
+        elif line.startswith("FAILED:"):
+            parts = line.replace("FAILED:", "").split("|")
+            party_code = parts[0].strip()
+            error = parts[1].replace("Error:", "").strip() if len(parts) > 1 else ""
+            worksheet.write_row(row_num, 0, ["FAILED", party_code, "", error])
+            row_num += 1
+        elif line.startswith("SKIPPED:"):
+            worksheet.write_row(row_num, 0, ["SKIPPED", "", "", line])
+            row_num += 1
+    workbook.close()
+    output.seek(0)
+    return output
+
+
+def fsync_per_record(path, records):
+    for record in records:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[700, 20000])
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    for count in args.records:
+        parties = [(f"P{i:05d}", f"Party {i}", [f"ap{i}@example.com"]) for i in range(count)]
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            start = time.perf_counter()
+            fsync_per_record(tmp / "checkpoint.jsonl",
+                             [{"party": code, "log": f"Party Code: {code} | Party Name: {name}"} for code, name, _ in parties])
+            per_record_t = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with SendJournal(tmp / "journal.db", batch_size=args.batch_size) as journal:
+                run_id = journal.start_run(source="bench")
+                for code, name, emails in parties:
+                    journal.append(run_id, "SENT", code, name, emails, latency=0.2, message="x" * 20000)
+            batched_t = time.perf_counter() - start
+
+            log_path = tmp / "FinalEmailLog.txt"
+            with open(log_path, "w", encoding="utf-8") as f:
+                f.write("=== Emails Sent Successfully ===\n")
+                for code, name, emails in parties:
+                    f.write(f"Party Code: {code} | Party Name: {name} | Emails: {', '.join(emails)} | CC: \n")
+            start = time.perf_counter()
+            legacy_log_to_excel(log_path)
+            legacy_t = time.perf_counter() - start
+
+            with SendJournal(tmp / "journal.db") as journal:
+                report = JournalReport(journal)
+                start = time.perf_counter()
+                report.refresh()
+                write_report(tmp / "report.xlsx", report.select(run_id=run_id))
+                first_t = time.perf_counter() - start
+                assert len(report.frame) == count
+
+                journal.append(run_id, "SENT", "P-extra", "Party extra", ["extra@example.com"], latency=0.2, message="x")
+                start = time.perf_counter()
+                new_rows = report.refresh()
+                refresh_t = time.perf_counter() - start
+                assert new_rows == 1 and len(report.frame) == count + 1
+
+        print(f"{count:>6} records: append fsync/record {per_record_t:.2f}s vs batched ({args.batch_size}) {batched_t:.2f}s; "
+              f"text log -> xlsx {legacy_t:.3f}s per rerun; journal report {first_t:.3f}s first build, "
+              f"{refresh_t * 1000:.1f}ms incremental refresh")
+
+
+if __name__ == "__main__":
+    main()
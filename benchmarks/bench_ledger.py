@@ -0,0 +1,101 @@
+"""Memory held by matched party rows: the old list of row dicts per party vs. PartyLedger views.
+
+Usage:
+    python benchmarks/bench_ledger.py [--rows 20000 100000] [--rows-per-party 30]
+
+"row dicts" rebuilds what ``match_data`` used to return (every payment and
+debit row as a dict, shared by the per-party lists); "ledger" is the current
+``match_data``. Retained memory is what the result still holds once built
+(tracemalloc, plus Arrow buffers for string columns); peak includes the
+temporaries. Both are then rendered and must give identical messages.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.compose import prepare_party_message  # noqa: E402
+from payment_mail_sender.directory import PartyDirectory  # noqa: E402
+from payment_mail_sender.ingest import normalize_vendor_frame  # noqa: E402
+from payment_mail_sender.matching import build_email_map, group_party_rows, match_data  # noqa: E402
+from workload import VENDOR_HEADERS, party_names, vendor_rows  # noqa: E402
+
+
+def row_dict_match(payment_df, debit_df, party_emails):
+    # match_data's result before ledgers (minus the debit check, which this workload always passes)
+    email_map = build_email_map(party_emails)
+    payment_groups, _ = group_party_rows(payment_df["Party Name"])
+    debit_groups, _ = group_party_rows(debit_df["Party Name"])
+    filled_payments = payment_df.copy()
+    filled_payments['Debit Amount'] = filled_payments['Debit Amount'].fillna(0)
+    payment_records = filled_payments.to_dict(orient='records')
+    debit_records = debit_df.to_dict(orient='records')
+    return [{
+        'party_code': email_data["display_name"],
+        'emails': email_data["to"],
+        'cc_emails': email_data["cc"],
+        'payments': [payment_records[i] for i in payment_groups[key]],
+        'debits': [debit_records[i] for i in debit_groups[key]] if key in debit_groups else [],
+    } for key, email_data in email_map.items() if key in payment_groups]
+
+
+def measure(build):
+    gc.collect()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained += pa.total_allocated_bytes() - arrow_before
+    return result, elapsed, retained, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--rows-per-party", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        parties = max(1, rows // args.rows_per_party)
+        raw = pd.DataFrame(list(vendor_rows(rows, parties)), columns=VENDOR_HEADERS)
+        for column in ("Invoice Date", "Payment Date"):
+            raw[column] = pd.to_datetime(raw[column])
+        payment_df, debit_df = normalize_vendor_frame(raw)
+        directory = PartyDirectory([{"PartyCode": "", "PartyName": name, "Email": "ap@example.com", "CC": ""}
+                                    for name in party_names(parties)])
+
+        dicts, dict_t, dict_mem, dict_peak = measure(lambda: row_dict_match(payment_df, debit_df, directory.entries))
+        ledgers, ledger_t, ledger_mem, ledger_peak = measure(
+            lambda: match_data(payment_df, debit_df, directory.entries)[0])
+        assert [entry['party_code'] for entry in dicts] == [entry['party_code'] for entry in ledgers]
+        assert all(entry['payments'] == ledger['payments'].records() for entry, ledger in zip(dicts, ledgers))
+
+        renders = {}
+        for label, entries in (("row dicts", dicts), ("ledger", ledgers)):
+            start = time.perf_counter()
+            renders[label] = [prepare_party_message(entry, directory, "bench@example.com")[1] for entry in entries]
+            renders[label + " t"] = time.perf_counter() - start
+        assert renders["row dicts"] == renders["ledger"]
+
+        print(f"{rows} rows / {len(ledgers)} parties:")
+        for label, elapsed, retained, peak, render_t in (
+                ("row dicts", dict_t, dict_mem, dict_peak, renders["row dicts t"]),
+                ("ledger", ledger_t, ledger_mem, ledger_peak, renders["ledger t"])):
+            print(f"  {label:>9}: build {elapsed:6.2f}s, retained {retained / 1024 / 1024:7.1f} MB, "
+                  f"peak {peak / 1024 / 1024:7.1f} MB, render {render_t:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
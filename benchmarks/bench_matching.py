@@ -0,0 +1,164 @@
+"""Compare the grouped matching engine against the original per-party scans.
+
+Usage:
+    python benchmarks/bench_matching.py [--sizes 1000 10000 100000] [--parties 700]
+
+Both implementations run on the same synthetic sheets and their outputs are
+checked for equality before the timings are printed.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.ledger import PartyLedger  # noqa: E402
+from payment_mail_sender.matching import match_data  # noqa: E402
+
+
+def legacy_match_data(payment_df, debit_df, party_emails):
+    # Verbatim copy of match_data before the grouped engine, kept as the baseline
+    def normalize_name(name: str) -> str:
+        if name is None:
+            return ""
+        collapsed = re.sub(r"\s+", "", str(name))
+        return collapsed.strip().lower()
+
+    email_map = {}
+    for e in party_emails:
+        name = str(e.get("PartyName", "")).strip()
+        if not name:
+            continue
+        key = normalize_name(name)
+        email_map[key] = {
+            "to": [email.strip() for email in str(e.get("Email", "")).split(",")],
+            "cc": [cc.strip() for cc in str(e.get("CC", "")).split(",")] if "CC" in e and pd.notna(e["CC"]) else [],
+            "display_name": name,
+        }
+    payment_df.columns = payment_df.columns.str.strip()
+    debit_df.columns = debit_df.columns.str.strip()
+    result = []
+    skip_log_lines = []
+    payment_party_col = 'Party Name' if 'Party Name' in payment_df.columns else ('Party Code' if 'Party Code' in payment_df.columns else None)
+    debit_party_col = 'Party Name' if 'Party Name' in debit_df.columns else ('Party Code' if 'Party Code' in debit_df.columns else None)
+    parties_without_email = []
+    if payment_party_col:
+        payment_party_names = set(payment_df[payment_party_col].astype(str).str.strip())
+        for party_name_val in payment_party_names:
+            key = normalize_name(party_name_val)
+            if key not in email_map or not email_map[key]["to"] or all(email.strip().lower() in ['nan', 'none', ''] for email in email_map[key]["to"]):
+                parties_without_email.append({
+                    "party_code": party_name_val,
+                    "party_name": party_name_val or "Unknown",
+                    "payment_count": len(payment_df[payment_df[payment_party_col].astype(str).apply(normalize_name) == key])
+                })
+    for name_key, email_data in email_map.items():
+        party_code = email_data.get("display_name", name_key)
+        if payment_party_col:
+            party_payments = payment_df[payment_df[payment_party_col].astype(str).apply(normalize_name) == name_key]
+        else:
+            party_payments = pd.DataFrame()
+        if party_payments.empty:
+            skip_log_lines.append(f"SKIPPED: {party_code} — No payment rows found in Payment Sheet")
+            continue
+        related_debits = debit_df[debit_df[debit_party_col].astype(str).apply(normalize_name) == name_key] if debit_party_col else pd.DataFrame()
+        total_debit_amount = related_debits[related_debits['Amount'] > 0]['Amount'].sum() if not related_debits.empty else 0
+        party_payments = party_payments.copy()
+        party_payments['Debit Amount'] = party_payments['Debit Amount'].fillna(0)
+        party_debit_sum = party_payments['Debit Amount'].sum()
+        if abs(party_debit_sum - total_debit_amount) > 0.01:
+            skip_log_lines.append(f"SKIPPED: {party_code} — Debit Amount mismatch between payment sheet and debit sheet")
+            continue
+        payment_issues = []
+        for _, row in party_payments.iterrows():
+            payment_issues.append(row.to_dict())
+        if payment_issues:
+            result.append({
+                'party_code': party_code,
+                'emails': email_data["to"],
+                'cc_emails': email_data["cc"],
+                'payments': payment_issues,
+                'debits': related_debits.to_dict(orient='records') if not related_debits.empty else []
+            })
+    return result, skip_log_lines, parties_without_email
+
+
+def make_workload(rows, parties, seed=42):
+    rng = random.Random(seed)
+    names = [f"{100 + i}-VENDOR {i}-Amazon" for i in range(parties)]
+    # Roughly 10% of the sheet's sellers are missing from the directory
+    party_emails = [
+        {"PartyCode": str(100 + i), "PartyName": name, "Email": f"vendor{i}@example.com", "CC": ""}
+        for i, name in enumerate(names) if i % 10
+    ]
+    payment_rows = []
+    debit_rows = []
+    for i in range(rows):
+        name = rng.choice(names)
+        if rng.random() < 0.2:
+            # Same seller, different spacing/case, as seen in vendor exports
+            name = name.replace("-", " - ").upper()
+        dr = round(rng.uniform(10, 500), 2) if rng.random() < 0.3 else 0.0
+        cr = round(rng.uniform(100, 5000), 2)
+        payment_rows.append({
+            "Party Name": name,
+            "Party Code": name.split("-")[0].strip(),
+            "Inv. No.": f"INV{i:07d}",
+            "Pur. Date": "2025-01-10",
+            "Total Inv. Amount": cr + dr,
+            "Debit Amount": dr,
+            "Net Amount": cr,
+            "Bank Payment": cr,
+            "Payment Date": "2025-02-10",
+        })
+        if dr:
+            debit_rows.append({"Party Name": name, "Party Code": name.split("-")[0].strip(),
+                               "Date": "2025-01-10", "Return Invoice No.": f"INV{i:07d}", "Amount": dr})
+    return pd.DataFrame(payment_rows), pd.DataFrame(debit_rows), party_emails
+
+
+def _rows(rows):
+    # match_data returns PartyLedger views; the legacy engine returns lists of row dicts
+    return rows.records() if isinstance(rows, PartyLedger) else rows
+
+
+def _canonical(output):
+    result, skips, without = output
+    result = [dict(entry, payments=_rows(entry['payments']), debits=_rows(entry['debits'])) for entry in result]
+    return result, skips, sorted(without, key=lambda p: str(p["party_code"]))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--parties", type=int, default=700)
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the grouped engine")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())  # match_data writes SkippedPartiesLog.txt to cwd
+    print(f"{'rows':>8} {'legacy (s)':>12} {'grouped (s)':>12} {'speedup':>9}")
+    for size in args.sizes:
+        payment_df, debit_df, party_emails = make_workload(size, args.parties)
+        new_out, new_t = timed(match_data, payment_df.copy(), debit_df.copy(), party_emails)
+        if args.skip_legacy:
+            print(f"{size:>8} {'-':>12} {new_t:>12.3f} {'-':>9}")
+            continue
+        old_out, old_t = timed(legacy_match_data, payment_df.copy(), debit_df.copy(), party_emails)
+        assert _canonical(new_out) == _canonical(old_out), f"output mismatch at {size} rows"
+        print(f"{size:>8} {old_t:>12.3f} {new_t:>12.3f} {old_t / new_t:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Send window with messages rendered inline vs. spooled to an outbox ahead of time.
+
+Usage:
+    python benchmarks/bench_outbox.py [--parties 700] [--rows-per-party 30] [--latency-ms 1] [--workers 0]
+
+"inline" renders each party's message right before its SMTP transaction, as
+the send loop did; "outbox" renders everything with ``build_outbox`` first and
+then only streams the spooled bytes. Both send over one connection to the
+local sink, which must receive the same number of messages and bytes. The
+outbox build is reported separately: it runs before the send window, and in a
+process pool it scales with the CPUs available (``--workers 0`` uses all).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.compose import prepare_party_message  # noqa: E402
+from payment_mail_sender.directory import PartyDirectory  # noqa: E402
+from payment_mail_sender.ingest import normalize_vendor_frame  # noqa: E402
+from payment_mail_sender.matching import match_data  # noqa: E402
+from payment_mail_sender.outbox import build_outbox  # noqa: E402
+from payment_mail_sender.transport import SMTPPool  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+from workload import VENDOR_HEADERS, party_names, vendor_rows  # noqa: E402
+
+FROM_ADDR = "bench@example.com"
+
+
+def send_window(sink, jobs):
+    before_messages, before_bytes = sink.messages, sink.bytes_received
+    start = time.perf_counter()
+    with SMTPPool("bench", "secret", host="127.0.0.1", port=sink.port, size=1, use_ssl=False) as pool:
+        errors = [error for _, error in pool.imap(jobs) if error is not None]
+    elapsed = time.perf_counter() - start
+    assert not errors, errors[:3]
+    return elapsed, sink.messages - before_messages, sink.bytes_received - before_bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parties", type=int, default=700)
+    parser.add_argument("--rows-per-party", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="sink delay per SMTP reply")
+    parser.add_argument("--workers", type=int, default=0, help="outbox render processes (0: one per CPU)")
+    args = parser.parse_args(argv)
+
+    raw = pd.DataFrame(list(vendor_rows(args.parties * args.rows_per_party, args.parties)), columns=VENDOR_HEADERS)
+    for column in ("Invoice Date", "Payment Date"):
+        raw[column] = pd.to_datetime(raw[column])
+    payment_df, debit_df = normalize_vendor_frame(raw)
+    directory = PartyDirectory([{"PartyCode": "", "PartyName": name, "Email": "ap@example.com", "CC": ""}
+                                for name in party_names(args.parties)])
+    matched_results, _, _ = match_data(payment_df, debit_df, directory.entries)
+
+    def inline_jobs():
+        for i, entry in enumerate(matched_results):
+            recipients, message, _, _ = prepare_party_message(entry, directory, FROM_ADDR)
+            yield FROM_ADDR, recipients, message, i
+
+    with tempfile.TemporaryDirectory() as tmp, SMTPSink(latency=args.latency_ms / 1000.0) as sink:
+        inline_t, inline_count, inline_bytes = send_window(sink, inline_jobs())
+
+        start = time.perf_counter()
+        outbox = build_outbox(Path(tmp) / "outbox", matched_results, directory, FROM_ADDR, workers=args.workers or None)
+        build_t = time.perf_counter() - start
+        spooled_t, spooled_count, spooled_bytes = send_window(
+            sink, ((FROM_ADDR, message['recipients'], outbox.read(message), i) for i, message in enumerate(outbox.messages)))
+
+    assert inline_count == spooled_count == len(matched_results), (inline_count, spooled_count)
+    assert inline_bytes == spooled_bytes, (inline_bytes, spooled_bytes)
+    print(f"{len(matched_results)} messages, {spooled_bytes / 1024 / 1024:.1f} MB, {os.cpu_count()} CPU(s)")
+    print(f"{'inline':>7}: send window {inline_t:6.2f}s ({inline_count / inline_t:6.1f} msg/s)")
+    print(f"{'outbox':>7}: send window {spooled_t:6.2f}s ({spooled_count / spooled_t:6.1f} msg/s), "
+          f"built beforehand in {build_t:.2f}s ({(1 - spooled_t / inline_t) * 100:.0f}% shorter window)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Compare the compiled email renderer with the original string-concatenation version.
+
+Usage:
+    python benchmarks/bench_render.py [--rows 10 1000 20000]
+
+Bodies are checked for byte equality before timings are printed.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.render import render_email_body, safe_date_format  # noqa: E402
+
+PARTY_EMAILS = [{"PartyName": "101-VENDOR 1-Amazon", "Email": "v1@example.com"}]
+
+
+def normalize_name(name: str) -> str:
+    if name is None:
+        return ""
+    collapsed = re.sub(r"\s+", "", str(name))
+    return collapsed.strip().lower()
+
+
+LEGACY_EMAIL_TEMPLATE = """
+<html>
+  <body style="font-family: Arial, sans-serif; color: #333;">
+    <p>Dear [Party Name],</p>
+    <p>Please find below the summary of your recent transactions with us:</p>
+    <h3>Purchase & Payment Details</h3>
+    <table style="border-collapse: collapse;  width: 100%; margin-bottom: 20px;">
+      <thead>
+        <tr style="background-color: #f2f2f2; border: 2px solid #333;">
+          <th style="border: 1px solid #333; padding: 8px; ">Purchase Bill</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Main Advised No.</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Seller Advised No.</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Transaction Type</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Pur. Date</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Credit (CR)</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Debit (DR)</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Balance</th>
+        </tr>
+      </thead>
+      <tbody>
+        <!-- Dynamic payment rows inserted here -->
+      </tbody>
+    </table>
+  </body>
+</html>
+"""
+
+
+def legacy_generate_email_body(party_code, payment_rows, debit_rows, party_emails):
+    # Copy of generate_email_body before the compiled renderer (party_emails passed in; dates through the
+    # shared safe_date_format)
+    # party_code is actually PartyName (case-insensitive)
+    lookup_key = normalize_name(party_code)
+    party_name = next(
+        (e['PartyName'] for e in party_emails if normalize_name(e.get('PartyName', '')) == lookup_key),
+        party_code if party_code else 'Unknown Party'
+    )
+    template = LEGACY_EMAIL_TEMPLATE
+    payment_html = ""
+    total_credit = 0.0
+    total_debit = 0.0
+    running_balance = 0.0
+    payment_dates = []
+    for row in payment_rows:
+        # Raw numeric values for CR / DR
+        debit_val_num = row.get('Debit Amount', 0)
+        credit_val_num = row.get('Bank Payment', 0)
+        try:
+            dr = float(debit_val_num) if not pd.isna(debit_val_num) and debit_val_num != '' else 0.0
+        except (ValueError, TypeError):
+            dr = 0.0
+        try:
+            cr = float(credit_val_num) if not pd.isna(credit_val_num) and credit_val_num != '' else 0.0
+        except (ValueError, TypeError):
+            cr = 0.0
+
+        total_credit += cr
+        total_debit += dr
+        running_balance += cr - dr
+
+        # Handle NaN and missing values for display
+        inv_no = row.get('Inv. No.', '')
+        main_adv = row.get('Main Advised No.', '')
+        seller_adv = row.get('Seller Advised No.', '')
+        pur_date = safe_date_format(row.get('Pur. Date', ''))
+        txn_type = row.get('Transaction Type', '')
+        
+        inv_no = '-' if pd.isna(inv_no) or inv_no == '' else str(inv_no)
+        main_adv_display = '-' if pd.isna(main_adv) or main_adv == '' else str(main_adv)
+        seller_adv_display = '-' if pd.isna(seller_adv) or seller_adv == '' else str(seller_adv)
+        pur_date_display = pur_date or '-'
+        debit_val_display = '-' if pd.isna(dr) or dr == '' else f"{dr:.2f}"
+        credit_val_display = '-' if pd.isna(cr) or cr == '' else f"{cr:.2f}"
+        txn_type_display = '-' if pd.isna(txn_type) or txn_type == '' else str(txn_type)
+        balance_display = f"{running_balance:.2f}"
+        
+        payment_html += f"""
+        <tr style="text-align:center; border:1px solid #ccc;">
+          <td style="border:1px solid #ccc;">{inv_no}</td>
+          <td style="border:1px solid #ccc;">{main_adv_display}</td>
+          <td style="border:1px solid #ccc;">{seller_adv_display}</td>
+          <td style="border:1px solid #ccc;">{txn_type_display}</td>
+          <td style="border:1px solid #ccc;">{pur_date_display}</td>
+          <td style="border:1px solid #ccc;">{credit_val_display}</td>
+          <td style="border:1px solid #ccc;">{debit_val_display}</td>
+          <td style="border:1px solid #ccc;">{balance_display}</td>
+        </tr>"""
+        if row.get('Payment Date') and not pd.isna(row.get('Payment Date')):
+            payment_dates.append(row['Payment Date'])
+
+    # Final balance = total credit - total debit (as in sheet Balance column)
+    final_balance = total_credit - total_debit
+    # First show Total row with CR, DR, and Balance totals
+    payment_html += f"""
+    <tr style="text-align:center; font-weight:bold; background-color:#f9f9f9;">
+      <td colspan="5" style="border:1px solid #ccc;">Total</td>
+      <td style="border:1px solid #ccc;">{total_credit:.2f}</td>
+      <td style="border:1px solid #ccc;">{total_debit:.2f}</td>
+      <td style="border:1px solid #ccc;">{final_balance:.2f}</td>
+    </tr>"""
+    # Then show Bank Final Amount row with just the final balance
+    payment_html += f"""
+    <tr style="text-align:center; font-weight:bold; background-color:#f9f9f9;">
+      <td colspan="7" style="border:1px solid #ccc; text-align:right;">Bank Final Amount</td>
+      <td style="border:1px solid #ccc;">{final_balance:.2f}</td>
+    </tr>"""
+    html_body = template.replace("[Party Name]", party_name)
+    html_body = html_body.replace("<!-- Dynamic payment rows inserted here -->", payment_html)
+    # Payment summary after table
+    latest_payment_date = safe_date_format(max(pd.to_datetime(payment_dates, errors='coerce')) if payment_dates else None) or 'N/A'
+    html_body = html_body.replace("</table>", f"</table>\n<p><strong>Bank Payment Date:</strong> {latest_payment_date}</p>")
+    closing_note = """
+    <br><br>
+    <p><strong>🔔 Important Note:</strong> If you have any discrepancies or concerns regarding the above payment summary, please raise the issue within 7 days. No changes or claims will be entertained after this period.</p>
+    <p>Thank you for your continued partnership.</p>
+    <p>Best regards,<br><strong>Easy Sell Service Pvt. Ltd.</strong></p>
+        """
+    html_body = html_body.replace("</body>", f"{closing_note}</body>")
+    return html_body
+
+
+def payment_rows(count, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        dr = round(rng.uniform(10, 500), 2) if rng.random() < 0.3 else 0.0
+        rows.append({
+            "Party Name": "101-VENDOR 1-Amazon",
+            "Inv. No.": f"BILL{i:07d}" if rng.random() > 0.01 else float("nan"),
+            "Main Advised No.": f"ADV{i // 50:05d}",
+            "Seller Advised No.": "" if rng.random() < 0.05 else f"SADV{i // 10:06d}",
+            "Transaction Type": rng.choice(["Sale", "Return", None]),
+            "Pur. Date": pd.Timestamp(start + timedelta(days=rng.randrange(60))) if rng.random() > 0.02 else "2025-03-01",
+            "Debit Amount": dr,
+            "Bank Payment": round(rng.uniform(100, 5000), 2) if rng.random() > 0.05 else float("nan"),
+            "Payment Date": pd.Timestamp(start + timedelta(days=60 + rng.randrange(30))),
+        })
+    return rows
+
+
+def timed(fn, *args, repeat=1):
+    # Best-of-N per-call time; small parties need repeats to rise above timer noise
+    out = fn(*args)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 1_000, 20_000])
+    args = parser.parse_args()
+    print(f"{'rows':>8} {'legacy (s)':>12} {'compiled (s)':>13} {'speedup':>9}")
+    for count in args.rows:
+        rows = payment_rows(count)
+        repeat = max(3, 20_000 // count)
+        new_body, new_t = timed(render_email_body, "101-VENDOR 1-Amazon", rows, repeat=repeat)
+        old_body, old_t = timed(legacy_generate_email_body, "101-vendor 1-amazon", rows, [], PARTY_EMAILS, repeat=repeat)
+        assert new_body == old_body, f"rendered body differs at {count} rows"
+        print(f"{count:>8} {old_t:>12.4f} {new_t:>13.4f} {old_t / new_t:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
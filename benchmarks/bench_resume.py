@@ -0,0 +1,91 @@
+"""Restart cost of an interrupted send run: resend everything vs. resume from the journal.
+
+Usage:
+    python benchmarks/bench_resume.py [--parties 700] [--interrupt-at 600] [--rate 20] [--latency-ms 20]
+
+The first run stops after ``--interrupt-at`` messages, with a few more left
+PENDING as if the process died mid-transaction. The restart either sends every
+statement again (the old behaviour) or skips the keys the journal shows as
+delivered. Messages go to a local SMTP sink, rate-limited like the dashboard;
+the sink's message count is checked after each restart.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.compose import build_message, message_key  # noqa: E402
+from payment_mail_sender.journal import ResumableRun, SendJournal  # noqa: E402
+from payment_mail_sender.transport import SMTPPool  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+IN_FLIGHT = 3  # PENDING with no outcome when the first run stops
+
+
+def make_jobs(parties):
+    jobs = []
+    for i in range(parties):
+        entry = {"party_code": f"P{i:04d}", "payments": [{"Payment Date": "2026-09-30"}]}
+        recipients, message = build_message("bench@example.com", [f"party{i}@example.com"], f"Statement {i}",
+                                            "<table>" + "<tr><td>row</td></tr>" * 100 + "</table>")
+        jobs.append((entry["party_code"], recipients, message, message_key(entry, recipients, message)))
+    return jobs
+
+
+def send(pool, send_run, jobs):
+    send_run.begin([(key, code, "", recipients, message) for code, recipients, message, key in jobs])
+    keys = {code: (key, recipients, message) for code, recipients, message, key in jobs}
+    for code, error, latency in pool.imap([("bench@example.com", r, m, c) for c, r, m, _ in jobs], timed=True):
+        key, recipients, message = keys[code]
+        send_run.finish(key, code, "", recipients, error, latency, message)
+
+
+def restart(sink, journal_path, jobs, resume, rate):
+    start = time.perf_counter()
+    before = sink.messages
+    with SendJournal(journal_path) as journal, \
+            SMTPPool("bench", "secret", host="127.0.0.1", port=sink.port, size=2, use_ssl=False, rate=rate) as pool:
+        send_run = ResumableRun(journal, journal.start_run(source="restart"), [job[3] for job in jobs], resume=resume)
+        todo = [job for job in jobs if not send_run.is_delivered(job[3])]
+        send(pool, send_run, todo)
+        in_doubt = len(send_run.in_doubt)
+    return time.perf_counter() - start, sink.messages - before, in_doubt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parties", type=int, default=700)
+    parser.add_argument("--interrupt-at", type=int, default=600)
+    parser.add_argument("--rate", type=float, default=20.0, help="messages per second (the dashboard default is 1)")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args(argv)
+    jobs = make_jobs(args.parties)
+    remaining = args.parties - args.interrupt_at
+
+    with SMTPSink(latency=args.latency_ms / 1000.0) as sink, tempfile.TemporaryDirectory() as tmp:
+        for resume in (False, True):
+            journal_path = Path(tmp) / f"journal_{resume}.db"
+            # Interrupted first run
+            with SendJournal(journal_path) as journal, \
+                    SMTPPool("bench", "secret", host="127.0.0.1", port=sink.port, size=2, use_ssl=False) as pool:
+                send_run = ResumableRun(journal, journal.start_run(source="first"), [job[3] for job in jobs])
+                send(pool, send_run, jobs[:args.interrupt_at])
+                in_flight = jobs[args.interrupt_at:args.interrupt_at + IN_FLIGHT]
+                send_run.begin([(key, code, "", recipients, message) for code, recipients, message, key in in_flight])
+
+            elapsed, sent, in_doubt = restart(sink, journal_path, jobs, resume, args.rate)
+            expected = remaining if resume else args.parties
+            assert sent == expected, (resume, sent, expected)
+            label = "resume from journal" if resume else "resend everything"
+            print(f"{label:>20}: {sent:4d} messages in {elapsed:6.2f}s ({in_doubt} in doubt, retried)")
+
+        # A second resume has nothing left to send
+        elapsed, sent, _ = restart(sink, journal_path, jobs, True, args.rate)
+        assert sent == 0, sent
+        print(f"{'resume when done':>20}: {sent:4d} messages in {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare loading a payment workbook from xlsx against its Arrow snapshot.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--rows 20000 50000 100000] [--parties 700]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.ingest import load_excel  # noqa: E402
+from payment_mail_sender.snapshot import file_digest, snapshot_paths  # noqa: E402
+from workload import write_vendor_workbook  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 50_000, 100_000])
+    parser.add_argument("--parties", type=int, default=700)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    snapshot_dir = tmp / "snapshots"
+    print(f"{'rows':>8} {'xlsx MB':>8} {'arrow MB':>9} {'xlsx load (s)':>14} {'snapshot load (s)':>18} {'speedup':>9}")
+    for rows in args.rows:
+        path = write_vendor_workbook(tmp / f"vendor_{rows}.xlsx", rows, args.parties)
+        start = time.perf_counter()
+        parsed = load_excel(path, snapshot_dir=snapshot_dir)  # miss: parse + write snapshot
+        xlsx_t = time.perf_counter() - start
+        start = time.perf_counter()
+        cached = load_excel(path, snapshot_dir=snapshot_dir)
+        snap_t = time.perf_counter() - start
+        for a, b in zip(parsed, cached):
+            pd.testing.assert_frame_equal(a, b)
+        arrow_mb = sum(p.stat().st_size for p in snapshot_paths(snapshot_dir, file_digest(path))) / 1e6
+        print(f"{rows:>8} {path.stat().st_size / 1e6:>8.1f} {arrow_mb:>9.1f} {xlsx_t:>14.2f} {snap_t:>18.3f} {xlsx_t / snap_t:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
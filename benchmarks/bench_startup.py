@@ -0,0 +1,103 @@
+"""Startup cost of the headless runner, measured with ``python -X importtime``.
+
+Times ``--help`` and a dry run on a small workbook (cold: parses the xlsx and
+writes a snapshot; warm: loads the snapshot), lists the slowest imports and
+fails if Streamlit is imported or a ``--max-*`` budget is exceeded.
+
+    python benchmarks/bench_startup.py --rows 200 --max-help 0.5 --max-dry-run 1.5 --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from workload import party_names, write_vendor_workbook  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def parse_importtime(stderr):
+    """Return ``{module: (self_us, cumulative_us, depth)}`` from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def measure(args, cwd, repeat):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    cmd = [sys.executable, "-X", "importtime", "-m", "payment_mail_sender", *args]
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise SystemExit(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+        if best is None or elapsed < best[0]:
+            best = (elapsed, parse_importtime(proc.stderr))
+    elapsed, modules = best
+    top_level_us = sum(cum for _, cum, depth in modules.values() if depth == 0)
+    return {
+        "wall_s": round(elapsed, 3),
+        "import_s": round(top_level_us / 1e6, 3),
+        "modules": len(modules),
+        "streamlit": any(name.split(".")[0] == "streamlit" for name in modules),
+        "slowest": sorted(((name, cum) for name, (_, cum, depth) in modules.items() if depth == 0),
+                          key=lambda item: -item[1])[:8],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--parties", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="best-of-N wall time")
+    parser.add_argument("--max-help", type=float, help="fail if --help takes longer (seconds)")
+    parser.add_argument("--max-dry-run", type=float, help="fail if the warm dry run takes longer (seconds)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_vendor_workbook(Path(tmp) / "small.xlsx", args.rows, args.parties)
+        entries = [{"PartyCode": name.split("-")[0], "PartyName": name, "Email": f"party{i}@example.com", "CC": ""}
+                   for i, name in enumerate(party_names(args.parties))]
+        (Path(tmp) / "party_emails.json").write_text(json.dumps(entries))
+        dry_run = ["run", "--input", "small.xlsx", "--dry-run"]
+        results = {
+            "help": measure(["--help"], tmp, args.repeat),
+            "dry_run_cold": measure(dry_run + ["--no-snapshots"], tmp, args.repeat),
+            "dry_run_warm": None,
+        }
+        measure(dry_run, tmp, 1)  # writes the snapshot (no-op without pyarrow)
+        results["dry_run_warm"] = measure(dry_run, tmp, args.repeat)
+
+    failures = []
+    for label, result in results.items():
+        print(f"{label:13s} wall {result['wall_s']:.3f}s  imports {result['import_s']:.3f}s  ({result['modules']} modules)")
+        for name, cum in result["slowest"]:
+            print(f"    {cum / 1000:8.1f} ms  {name}")
+        if result["streamlit"]:
+            failures.append(f"{label} imported streamlit")
+    if args.max_help is not None and results["help"]["wall_s"] > args.max_help:
+        failures.append(f"--help took {results['help']['wall_s']}s > {args.max_help}s")
+    if args.max_dry_run is not None and results["dry_run_warm"]["wall_s"] > args.max_dry_run:
+        failures.append(f"dry run took {results['dry_run_warm']['wall_s']}s > {args.max_dry_run}s")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if failures:
+        raise SystemExit("REGRESSION: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
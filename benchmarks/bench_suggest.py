@@ -0,0 +1,113 @@
+"""Near-match suggestions for misspelled sellers: trigram/code index vs. scoring every directory name.
+
+Usage:
+    python benchmarks/bench_suggest.py [--directory 700 5000] [--sellers 2000] [--seed 42]
+
+The directory holds seeded "<code>-<NAME>-<channel>" parties; each seller is
+one of them with a typo (dropped, swapped or replaced letter), another
+channel, its spaces changed or its code missing. "naive" computes the same
+confidence against every directory record; "index" only scores the
+candidates ``SuggestionIndex`` nominates. Reports time per seller and how
+often the true party is the first suggestion or in the top 3.
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.directory import PartyDirectory  # noqa: E402
+from payment_mail_sender.suggest import CODE_WEIGHT, SuggestionIndex, numeric_code, trigrams  # noqa: E402
+
+CHANNELS = ["Amazon", "Flipkart", "Meesho", "Myntra"]
+SYLLABLES = ["au", "ro", "min", "tex", "sha", "ri", "kan", "vel", "pra", "jay", "lux", "mo", "dev", "ind", "ka", "nova"]
+
+
+def directory_names(rng, count):
+    names = set()
+    while len(names) < count:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+        suffix = rng.choice(["", " TEXTILES", " ENTERPRISES", " TRADERS", " FASHION"])
+        names.add(f"{rng.randint(100, 9999)}-{word}{suffix}-{rng.choice(CHANNELS)}")
+    return sorted(names)
+
+
+def misspell(rng, name):
+    code, rest = name.split("-", 1)
+    body, channel = rest.rsplit("-", 1)
+    kind = rng.choice(["drop", "swap", "replace", "channel", "spacing", "no_code"])
+    i = rng.randrange(1, len(body) - 1)
+    if kind == "drop":
+        body = body[:i] + body[i + 1:]
+    elif kind == "swap":
+        body = body[:i - 1] + body[i] + body[i - 1] + body[i + 1:]
+    elif kind == "replace":
+        body = body[:i] + rng.choice(string.ascii_uppercase) + body[i + 1:]
+    elif kind == "channel":
+        channel = rng.choice([c for c in CHANNELS if c != channel])
+    elif kind == "spacing":
+        return f"{code} - {body.replace(' ', '')} - {channel}".lower()
+    else:
+        return f"{body}-{channel}"
+    return f"{code}-{body}-{channel}"
+
+
+def naive_suggest(records, record_grams, record_codes, name, k=3, min_confidence=0.3):
+    # Same score as SuggestionIndex.suggest (record trigrams precomputed), against every record
+    grams = trigrams(name)
+    code = numeric_code(name)
+    scored = []
+    for i, other in enumerate(record_grams):
+        dice = 2 * len(grams & other) / (len(grams) + len(other)) if grams or other else 0.0
+        confidence = (1 - CODE_WEIGHT) * dice + (CODE_WEIGHT if code and code == record_codes[i] else 0.0)
+        if confidence >= min_confidence:
+            scored.append((confidence, i))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(records[i], round(confidence, 3)) for confidence, i in scored[:k]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--directory", type=int, nargs="+", default=[700, 5000], help="directory sizes")
+    parser.add_argument("--sellers", type=int, default=2000, help="misspelled sellers to look up")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    for size in args.directory:
+        rng = random.Random(args.seed)
+        names = directory_names(rng, size)
+        directory = PartyDirectory([{"PartyCode": name.split("-")[0], "PartyName": name, "Email": "ap@example.com",
+                                     "CC": ""} for name in names])
+        truth = [rng.choice(names) for _ in range(args.sellers)]
+        sellers = [misspell(rng, name) for name in truth]
+
+        start = time.perf_counter()
+        index = SuggestionIndex(directory)
+        build_t = time.perf_counter() - start
+        record_grams = [trigrams(record.name) for record in index.records]
+        record_codes = [numeric_code(record.name) for record in index.records]
+        results = {}
+        timings = {}
+        for label, suggest in (("naive", lambda s: naive_suggest(index.records, record_grams, record_codes, s)),
+                               ("index", index.suggest)):
+            start = time.perf_counter()
+            results[label] = [suggest(seller) for seller in sellers]
+            timings[label] = time.perf_counter() - start
+
+        for label, found in results.items():
+            top1 = sum(bool(s) and s[0][0].name == t for s, t in zip(found, truth)) / len(truth)
+            top3 = sum(any(record.name == t for record, _ in s) for s, t in zip(found, truth)) / len(truth)
+            extra = f" (+{build_t * 1000:.0f}ms index build)" if label == "index" else ""
+            print(f"{size:>5} parties {label:>5}: {timings[label] / len(sellers) * 1e6:8.0f}us per seller{extra}, "
+                  f"top-1 {top1:.1%}, top-3 {top3:.1%}")
+        # Ties may order differently; agreement compares the best confidence
+        agree = sum([c for _, c in a[:1]] == [c for _, c in b[:1]]
+                    for a, b in zip(results["naive"], results["index"])) / len(sellers)
+        print(f"{size:>5} parties: index top-1 agrees with naive for {agree:.1%} of sellers, "
+              f"{timings['naive'] / timings['index']:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
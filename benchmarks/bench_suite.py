@@ -0,0 +1,240 @@
+"""End-to-end benchmark suite on a seeded synthetic workload, with JSON results for comparing commits.
+
+Usage:
+    python benchmarks/bench_suite.py [--parties 700] [--rows-per-party 30] [--zipf 1.1] [--formats vendor legacy]
+                                     [--repeat 3] [--output results.json] [--compare baseline.json --tolerance 0.25]
+
+For each workbook format (single-sheet vendor export with summary header
+rows, legacy "Payment Details"/"Debit Notes" workbook) the suite generates a
+workbook and a matching ``party_emails.json``, then times the stages the
+dashboard runs: load_excel, validate_frames, match_data, generate_email_body,
+the party-wise export and the send (a pooled SMTP run against the local
+sink). Each stage runs ``--repeat`` times and reports its best time,
+throughput, the process's peak RSS while it ran and how far that peak rose
+above the RSS the stage started with (the kernel's high-water mark is reset
+before every run where Linux allows it; elsewhere the peak is the process
+peak so far). Memory freed by one format is reused by the next, so run one
+format per invocation when comparing their RSS.
+
+Results are written as JSON (default ``benchmarks/results/<time>-<commit>.json``).
+``--compare`` prints the change per stage against an earlier result and exits
+with status 1 when a stage got slower by more than ``--tolerance``.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.compose import prepare_party_message  # noqa: E402
+from payment_mail_sender.directory import PartyStore, get_party_directory  # noqa: E402
+from payment_mail_sender.export import party_frames, write_partywise_workbook  # noqa: E402
+from payment_mail_sender.ingest import STREAM_CHUNK_ROWS, load_excel  # noqa: E402
+from payment_mail_sender.matching import match_data  # noqa: E402
+from payment_mail_sender.transport import SMTPPool  # noqa: E402
+from payment_mail_sender.validation import validate_frames  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+from workload import write_legacy_workbook, write_party_emails, write_vendor_workbook  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+_CLEAR_REFS = Path("/proc/self/clear_refs")
+_STATUS = Path("/proc/self/status")
+
+
+def _reset_peak():
+    # Writing 5 to clear_refs resets VmHWM (Linux 4.0+); without it the peak is the process peak so far
+    try:
+        _CLEAR_REFS.write_text("5")
+    except OSError:
+        pass
+
+
+def _status_mb(field):
+    try:
+        for line in _STATUS.read_text().splitlines():
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _peak_mb():
+    peak = _status_mb("VmHWM:")
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    return peak
+
+
+def _commit():
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return proc.stdout.strip() or None
+
+
+class Recorder:
+    def __init__(self, workbook_format, repeat):
+        self.format = workbook_format
+        self.repeat = repeat
+        self.results = []
+
+    def stage(self, name, unit, run):
+        """Run ``run()`` ``repeat`` times; it returns ``(value, items)``. Returns the last value."""
+        best = None
+        peak = growth = 0.0
+        for _ in range(self.repeat):
+            # Garbage from the previous run is collected outside the timed region
+            gc.collect()
+            _reset_peak()
+            start_rss = _status_mb("VmRSS:") or _peak_mb()
+            start = time.perf_counter()
+            value, items = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            peak = max(peak, _peak_mb())
+            growth = max(growth, _peak_mb() - start_rss)
+        record = {
+            "format": self.format, "stage": name, "unit": unit, "items": items, "seconds": round(best, 4),
+            "throughput": round(items / best, 1) if best else None,
+            "peak_rss_mb": round(peak, 1), "stage_rss_mb": round(growth, 1),
+        }
+        self.results.append(record)
+        print(f"{self.format:>7} {name:>20}: {best:8.3f}s  {items:>8} {unit:<8}"
+              f"{record['throughput'] or 0:>12,.1f} {unit}/s  peak {peak:7.1f} MB (+{growth:.1f})")
+        return value
+
+
+def run_format(workbook_format, args, tmp, sink):
+    tmp = Path(tmp) / workbook_format
+    tmp.mkdir()
+    rows = args.parties * args.rows_per_party
+    options = dict(seed=args.seed, dr_ratio=args.dr_ratio, cr_ratio=args.cr_ratio, zipf=args.zipf)
+    start = time.perf_counter()
+    if workbook_format == "vendor":
+        path = write_vendor_workbook(tmp / "vendor.xlsx", rows, args.parties,
+                                     summary_header=not args.no_summary_header, **options)
+    else:
+        path = write_legacy_workbook(tmp / "legacy.xlsx", rows, args.parties, **options)
+    json_path = write_party_emails(tmp / "party_emails.json", args.parties, seed=args.seed)
+    print(f"{workbook_format:>7} {'workload':>20}: {rows} rows / {args.parties} parties generated in "
+          f"{time.perf_counter() - start:.1f}s ({path.stat().st_size / 1024 / 1024:.1f} MB)")
+
+    recorder = Recorder(workbook_format, args.repeat)
+    payment_df, debit_df = recorder.stage("load_excel", "rows", lambda: _counted(
+        load_excel(path, chunk_rows=STREAM_CHUNK_ROWS), lambda frames: len(frames[0]) + len(frames[1])))
+    assert len(payment_df) == rows, (len(payment_df), rows)
+    frame_rows = len(payment_df) + len(debit_df)
+
+    recorder.stage("validate_frames", "rows", lambda: (validate_frames(payment_df, debit_df), frame_rows))
+
+    directory = get_party_directory(PartyStore(tmp / "party_emails.db", json_path=json_path))
+    matched_results, _, _ = recorder.stage("match_data", "parties", lambda: _counted(
+        match_data(payment_df, debit_df, directory.entries), lambda matched: len(matched[0])))
+
+    jobs = recorder.stage("generate_email_body", "messages", lambda: _counted(
+        [prepare_party_message(entry, directory, "bench@example.com")[:2] for entry in matched_results], len))
+
+    recorder.stage("export", "rows", lambda: (write_partywise_workbook(
+        tmp / "partywise.xlsx", party_frames(matched_results)), frame_rows))
+
+    jobs = jobs[:args.send_limit] if args.send_limit else jobs
+
+    def send():
+        before = sink.messages
+        with SMTPPool("bench", "secret", host="127.0.0.1", port=sink.port, size=args.pool_size, use_ssl=False) as pool:
+            errors = [error for _, error in pool.imap(
+                ("bench@example.com", recipients, message, i) for i, (recipients, message) in enumerate(jobs))
+                if error is not None]
+        assert not errors and sink.messages - before == len(jobs), (errors[:3], sink.messages - before)
+        return None, len(jobs)
+
+    recorder.stage("send", "messages", send)
+    return recorder.results
+
+
+def _counted(value, count):
+    return value, count(value)
+
+
+def compare(results, baseline_path, tolerance):
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    if baseline["config"] != results["config"]:
+        print(f"warning: {baseline_path} was run with a different workload config; timings may not be comparable")
+    old = {(r["format"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nvs. {baseline_path} (commit {baseline.get('commit')}):")
+    for record in results["results"]:
+        before = old.get((record["format"], record["stage"]))
+        if before is None or not before["seconds"]:
+            continue
+        change = record["seconds"] / before["seconds"] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{record['format']:>7} {record['stage']:>20}: {before['seconds']:8.3f}s -> {record['seconds']:8.3f}s "
+              f"({change * 100:+6.1f}%)  stage RSS {before['stage_rss_mb']:6.1f} -> {record['stage_rss_mb']:6.1f} MB{flag}")
+        if flag:
+            regressions.append(record["stage"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parties", type=int, default=700)
+    parser.add_argument("--rows-per-party", type=int, default=30, help="mean rows per party")
+    parser.add_argument("--zipf", type=float, default=1.1,
+                        help="Zipf exponent for rows per party (0 spreads rows uniformly)")
+    parser.add_argument("--dr-ratio", type=float, default=0.3, help="share of rows with a DR amount")
+    parser.add_argument("--cr-ratio", type=float, default=0.9, help="share of rows paid (CR)")
+    parser.add_argument("--no-summary-header", action="store_true", help="vendor export without the summary rows")
+    parser.add_argument("--formats", nargs="+", choices=["vendor", "legacy"], default=["vendor", "legacy"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pool-size", type=int, default=4, help="SMTP connections for the send stage")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="sink delay per SMTP reply")
+    parser.add_argument("--send-limit", type=int, default=0, help="send only this many messages (0: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best time is reported")
+    parser.add_argument("--output", type=Path, help="results JSON (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per stage for --compare")
+    args = parser.parse_args(argv)
+
+    config = {key: getattr(args, key) for key in ("parties", "rows_per_party", "zipf", "dr_ratio", "cr_ratio",
+                                                  "no_summary_header", "seed", "pool_size", "latency_ms",
+                                                  "send_limit")}
+    results = {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp, SMTPSink(latency=args.latency_ms / 1000.0) as sink:
+        for workbook_format in args.formats:
+            results["results"].extend(run_format(workbook_format, args, tmp, sink))
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{results['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=1), encoding="utf-8")
+    print(f"Results written to {output}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than the {args.tolerance:.0%} tolerance")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
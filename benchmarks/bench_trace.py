@@ -0,0 +1,84 @@
+"""Cost of the stage spans: the render stage uninstrumented, with tracing off, and with tracing on.
+
+Usage:
+    python benchmarks/bench_trace.py [--parties 700] [--rows-per-party 30] [--repeat 5]
+
+Each party's message is rendered inside a ``generate_email_body`` span, as in
+the CLI and the dashboard; messages are checked identical in all three modes.
+Also reports the bare cost of one span, disabled and enabled.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.compose import prepare_party_message  # noqa: E402
+from payment_mail_sender.directory import PartyDirectory  # noqa: E402
+from payment_mail_sender.ingest import normalize_vendor_frame  # noqa: E402
+from payment_mail_sender.matching import match_data  # noqa: E402
+from payment_mail_sender.trace import NULL_TRACE, Trace  # noqa: E402
+from workload import VENDOR_HEADERS, party_names, vendor_rows  # noqa: E402
+
+SPAN_LOOPS = 200000
+
+
+def render_all(matched_results, directory, trace=None):
+    messages = []
+    for entry in matched_results:
+        if trace is None:
+            _, message, _, _ = prepare_party_message(entry, directory, "bench@example.com")
+        else:
+            with trace.span("generate_email_body") as span:
+                _, message, _, _ = prepare_party_message(entry, directory, "bench@example.com")
+                span.add("message_bytes", len(message))
+        messages.append(message)
+    return messages
+
+
+def span_cost(trace):
+    start = time.perf_counter()
+    for _ in range(SPAN_LOOPS):
+        with trace.span("x") as span:
+            span.add("n")
+    return (time.perf_counter() - start) / SPAN_LOOPS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parties", type=int, default=700)
+    parser.add_argument("--rows-per-party", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    raw = pd.DataFrame(list(vendor_rows(args.parties * args.rows_per_party, args.parties)), columns=VENDOR_HEADERS)
+    for column in ("Invoice Date", "Payment Date"):
+        raw[column] = pd.to_datetime(raw[column])
+    payment_df, debit_df = normalize_vendor_frame(raw)
+    directory = PartyDirectory([{"PartyCode": "", "PartyName": name, "Email": "ap@example.com", "CC": ""}
+                                for name in party_names(args.parties)])
+    matched_results, _, _ = match_data(payment_df, debit_df, directory.entries)
+
+    expected = render_all(matched_results, directory)
+    modes = (("uninstrumented", lambda: None), ("tracing off", lambda: NULL_TRACE), ("tracing on", lambda: Trace("bench")))
+    best = {label: float("inf") for label, _ in modes}
+    # Modes are interleaved so drift (warm-up, other load) hits each one alike
+    for _ in range(args.repeat):
+        for label, make_trace in modes:
+            trace = make_trace()
+            start = time.perf_counter()
+            messages = render_all(matched_results, directory, trace)
+            best[label] = min(best[label], time.perf_counter() - start)
+            assert messages == expected, label
+    assert len(trace.spans) == len(matched_results)
+
+    base = best["uninstrumented"]
+    for label, elapsed in best.items():
+        print(f"{label:>15}: {elapsed:6.3f}s for {len(matched_results)} parties ({(elapsed / base - 1) * 100:+5.1f}%)")
+    print(f"{'one span':>15}: {span_cost(NULL_TRACE) * 1e6:.2f}us off, {span_cost(Trace('bench')) * 1e6:.2f}us on")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Messages per second through SMTPPool for pool sizes 1-8 against a local sink.
+
+Usage:
+    python benchmarks/bench_transport.py [--messages 200] [--latency-ms 5]
+
+The first line is the old behaviour (new connection + login per message, no
+sleep) for reference. ``--latency-ms`` delays every server reply to stand in
+for the round trip to smtp.gmail.com.
+"""
+import argparse
+import smtplib
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.transport import SMTPPool  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+
+def build_message(i):
+    msg = MIMEMultipart('alternative')
+    msg['From'] = "bench@example.com"
+    msg['To'] = f"party{i}@example.com"
+    msg['Subject'] = f"Payment Reconciliation for {i}"
+    msg.attach(MIMEText("<html><body>" + "<tr><td>row</td></tr>" * 200 + "</body></html>", 'html'))
+    return msg.as_string()
+
+
+def connect_per_message(port, messages):
+    for i, message in enumerate(messages):
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.login("bench", "secret")
+            server.sendmail("bench@example.com", [f"party{i}@example.com"], message)
+
+
+def pooled(port, messages, size):
+    jobs = [("bench@example.com", [f"party{i}@example.com"], m, i) for i, m in enumerate(messages)]
+    with SMTPPool("bench", "secret", host="127.0.0.1", port=port, size=size, use_ssl=False) as pool:
+        for _, error in pool.imap(jobs):
+            if error:
+                raise error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    messages = [build_message(i) for i in range(args.messages)]
+
+    with SMTPSink(latency=args.latency_ms / 1000.0) as sink:
+        start = time.perf_counter()
+        connect_per_message(sink.port, messages)
+        elapsed = time.perf_counter() - start
+        print(f"{'per-message connect':>20}: {args.messages / elapsed:8.1f} msg/s")
+        for size in range(1, 9):
+            start = time.perf_counter()
+            pooled(sink.port, messages, size)
+            elapsed = time.perf_counter() - start
+            print(f"{f'pool size {size}':>20}: {args.messages / elapsed:8.1f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Time validate_frames against the old row-by-row date-mixing guard.
+
+Usage:
+    python benchmarks/bench_validation.py [--rows 10000 100000] [--parties 700]
+
+Frames come straight from normalize_vendor_frame (no xlsx round trip). The old
+guard only checked invoice date == payment date and raised on the first hit;
+validate_frames runs every check and must agree with it on that one.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payment_mail_sender.ingest import normalize_vendor_frame  # noqa: E402
+from payment_mail_sender.validation import validate_frames  # noqa: E402
+from workload import VENDOR_HEADERS, vendor_rows  # noqa: E402
+
+
+def legacy_check_date_mixing(payment_df):
+    # Verbatim copy of the guard mail.py ran after load_excel, kept as the baseline
+    for _, row in payment_df.iterrows():
+        inv_date = row.get('Pur. Date', '')
+        pay_date = row.get('Payment Date', '')
+        if inv_date and pay_date and str(inv_date).strip() == str(pay_date).strip():
+            raise ValueError("Invoice Date and Payment Date must not be the same for row: " + str(row))
+
+
+def make_frames(rows, parties, seed=42):
+    raw = pd.DataFrame(list(vendor_rows(rows, parties, seed=seed)), columns=VENDOR_HEADERS)
+    for column in ("Invoice Date", "Payment Date"):
+        raw[column] = pd.to_datetime(raw[column])
+    return normalize_vendor_frame(raw)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--parties", type=int, default=700)
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        payment_df, debit_df = make_frames(rows, args.parties)
+        # One bad row at the end: the old guard has to walk the whole sheet to find it
+        payment_df.loc[payment_df.index[-1], "Payment Date"] = payment_df["Pur. Date"].iloc[-1]
+
+        start = time.perf_counter()
+        try:
+            legacy_check_date_mixing(payment_df)
+        except ValueError:
+            legacy_hits = 1
+        else:
+            legacy_hits = 0
+        legacy_t = time.perf_counter() - start
+
+        start = time.perf_counter()
+        violations = validate_frames(payment_df, debit_df)
+        new_t = time.perf_counter() - start
+
+        date_hits = int((violations["Check"] == "Invoice date equals payment date").sum())
+        assert date_hits == legacy_hits == 1, (date_hits, legacy_hits)
+        print(f"{rows:>8} rows: iterrows guard {legacy_t:.3f}s (date check only), "
+              f"validate_frames {new_t:.3f}s ({len(violations)} issues, {violations['Check'].nunique()} checks hit)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Minimal local SMTP stand-in for exercising the sender without Gmail.
+
+Speaks just enough ESMTP for ``smtplib`` (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT), discards message bodies and can add a fixed delay per
+command to mimic network round trips. ``drop_after`` closes the socket after
+that many messages on a connection to exercise reconnects. ``quota`` and
+``recipient_quota`` cap the messages and recipients each login may send (over
+the sink's lifetime, like a daily quota; a number, or a dict per login); DATA
+past either is refused with Gmail's "550 5.4.5" reply. With ``password`` set,
+AUTH with any other password is refused like Gmail's bad-credentials reply.
+RCPT to an address in ``refuse`` gets a permanent "550 5.1.1" (no such user).
+"""
+import base64
+import socketserver
+import threading
+import time
+
+
+QUOTA_REPLY = "550 5.4.5 Daily user sending limit exceeded."
+AUTH_REPLY = "535 5.7.8 Username and Password not accepted."
+UNKNOWN_USER_REPLY = "550 5.1.1 The email account that you tried to reach does not exist."
+
+
+def _auth_user(line):
+    # "AUTH PLAIN <base64 of \0user\0password>", as smtplib sends it; returns (user, password)
+    parts = line.split()
+    if len(parts) < 3 or parts[1].upper() != "PLAIN":
+        return "", ""
+    try:
+        _, user, password = base64.b64decode(parts[2]).split(b"\0")[:3]
+        return user.decode(), password.decode()
+    except (ValueError, IndexError):
+        return "", ""
+
+
+def _limit(limit, user):
+    return limit.get(user) if isinstance(limit, dict) else limit
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        sent_here = 0
+        user = ""
+        recipients = 0
+        self.reply("220 sink ESMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-sink\r\n250-AUTH PLAIN LOGIN\r\n")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 sink")
+            elif verb == "AUTH":
+                user, password = _auth_user(line.decode(errors="replace"))
+                if sink.password is not None and password != sink.password:
+                    user = ""
+                    self.reply(AUTH_REPLY)
+                    continue
+                with sink.lock:
+                    sink.logins += 1
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb in ("MAIL", "RSET"):
+                recipients = 0
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = line.decode(errors="replace").partition(":")[2].strip().strip("<>").lower()
+                if address in sink.refuse:
+                    self.reply(UNKNOWN_USER_REPLY)
+                    continue
+                recipients += 1
+                self.reply("250 OK")
+            elif verb == "DATA":
+                with sink.lock:
+                    messages, sent_to = sink.usage.get(user, (0, 0))
+                    quota, recipient_quota = _limit(sink.quota, user), _limit(sink.recipient_quota, user)
+                    over = ((quota is not None and messages + 1 > quota)
+                            or (recipient_quota is not None and sent_to + recipients > recipient_quota))
+                    if over:
+                        sink.rejected += 1
+                    else:
+                        sink.usage[user] = (messages + 1, sent_to + recipients)
+                if over:
+                    self.reply(QUOTA_REPLY)
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    size += len(data_line)
+                with sink.lock:
+                    sink.messages += 1
+                    sink.bytes_received += size
+                sent_here += 1
+                self.reply("250 2.0.0 OK queued")
+                if sink.drop_after and sent_here >= sink.drop_after:
+                    return
+            elif verb == "QUIT":
+                self.reply("221 2.0.0 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, drop_after=None, quota=None, recipient_quota=None,
+                 password=None, refuse=()):
+        super().__init__((host, port), _SinkHandler)
+        self.latency = latency
+        self.drop_after = drop_after
+        self.quota = quota
+        self.recipient_quota = recipient_quota
+        self.password = password
+        self.refuse = {address.lower() for address in refuse}
+        self.usage = {}  # login -> (messages, recipients) accepted
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = 0
+        self.messages = 0
+        self.bytes_received = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,127 @@
+"""Synthetic, seeded payment workbooks shaped like the vendor exports we receive."""
+import json
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+
+from openpyxl import Workbook
+
+VENDOR_HEADERS = [
+    "Seller Name", "Channel", "Transaction Type", "Category", "Bill No", "Invoice Date", "Quantity",
+    "Total Without Tax", "Total Tax", "Total With Tax", "Zoho Total Without Tax", "Zoho Total Tax",
+    "Zoho Total With Tax", "Balance Due", "Zoho Status", "CR", "DR", "Balance",
+    "Main Advised No", "Seller Advised No", "Payment Date",
+]
+LEGACY_PAYMENT_HEADERS = [
+    "Party Name", "Inv. No.", "Pur. Date", "Total Inv. Amount", "Debit Amount", "Net Amount", "Bank Payment",
+    "Payment Date",
+]
+LEGACY_DEBIT_HEADERS = ["Party Name", "Date", "Return Invoice No.", "Amount"]
+
+
+def party_names(parties, channel="Amazon"):
+    return [f"{100 + i}-VENDOR {i}-{channel}" for i in range(parties)]
+
+
+def party_picker(rng, names, zipf=None):
+    """Return a function drawing a party name: uniformly, or Zipf-skewed with exponent ``zipf``.
+
+    With ``zipf=1.1`` and 700 parties the first party gets about 14% of the
+    rows and the last few a handful each, like a real channel's long tail.
+    """
+    if not zipf:
+        return lambda: rng.choice(names)
+    cum_weights = list(accumulate(1 / rank ** zipf for rank in range(1, len(names) + 1)))
+    return lambda: rng.choices(names, cum_weights=cum_weights)[0]
+
+
+def vendor_rows(rows, parties, seed=42, dr_ratio=0.3, cr_ratio=0.9, channel="Amazon", bill_prefix="BILL", zipf=None):
+    """Yield single-sheet vendor rows (lists in VENDOR_HEADERS order)."""
+    rng = random.Random(seed)
+    pick = party_picker(rng, party_names(parties, channel), zipf)
+    start = date(2025, 1, 1)
+    for i in range(rows):
+        name = pick()
+        total = round(rng.uniform(100, 5000), 2)
+        dr = round(rng.uniform(10, 500), 2) if rng.random() < dr_ratio else None
+        cr = total if rng.random() < cr_ratio else None
+        inv_date = start + timedelta(days=rng.randrange(60))
+        yield [
+            name, channel, rng.choice(["Sale", "Return", "Adjustment"]), "Apparel", f"{bill_prefix}{i:07d}", inv_date,
+            rng.randint(1, 20), round(total / 1.18, 2), round(total - total / 1.18, 2), total,
+            round(total / 1.18, 2), round(total - total / 1.18, 2), total, 0, "Paid",
+            cr, dr, (cr or 0) - (dr or 0), f"ADV{i // 50:05d}", f"SADV{i // 10:06d}",
+            inv_date + timedelta(days=30),
+        ]
+
+
+def write_vendor_workbook(path, rows, parties, seed=42, summary_header=True, **row_options):
+    """Write a single-sheet vendor export, optionally with the merged summary rows on top."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Payment Details")
+    if summary_header:
+        ws.append(["Seller Name: ALL SELLERS    Advised No: ADV-2025-01"])
+        ws.append([])
+    ws.append(VENDOR_HEADERS)
+    for row in vendor_rows(rows, parties, seed=seed, **row_options):
+        ws.append(row)
+    ws.append([None, None, None, None, "Total"])
+    wb.save(path)
+    return path
+
+
+def legacy_rows(rows, parties, seed=42, dr_ratio=0.3, cr_ratio=0.9, channel="Amazon", bill_prefix="INV", zipf=None):
+    """Yield ``(payment_row, debit_row)`` pairs for the legacy two-sheet workbook.
+
+    ``debit_row`` is None unless the payment carries a DR amount, in which
+    case it is the matching "Debit Notes" row.
+    """
+    rng = random.Random(seed)
+    pick = party_picker(rng, party_names(parties, channel), zipf)
+    start = date(2025, 1, 1)
+    for i in range(rows):
+        name = pick()
+        total = round(rng.uniform(100, 5000), 2)
+        dr = round(rng.uniform(10, min(500, total)), 2) if rng.random() < dr_ratio else None
+        net = round(total - (dr or 0), 2)
+        paid = net if rng.random() < cr_ratio else None
+        pur_date = start + timedelta(days=rng.randrange(60))
+        payment = [name, f"{bill_prefix}{i:07d}", pur_date, total, dr, net, paid, pur_date + timedelta(days=30)]
+        debit = [name, pur_date + timedelta(days=rng.randrange(1, 20)), f"DN{i:07d}", dr] if dr else None
+        yield payment, debit
+
+
+def write_legacy_workbook(path, rows, parties, seed=42, **row_options):
+    """Write the legacy workbook: "Payment Details" and "Debit Notes" sheets with plain headers."""
+    wb = Workbook(write_only=True)
+    payments = wb.create_sheet("Payment Details")
+    debits = wb.create_sheet("Debit Notes")
+    payments.append(LEGACY_PAYMENT_HEADERS)
+    debits.append(LEGACY_DEBIT_HEADERS)
+    for payment, debit in legacy_rows(rows, parties, seed=seed, **row_options):
+        payments.append(payment)
+        if debit:
+            debits.append(debit)
+    wb.save(path)
+    return path
+
+
+def party_emails(parties, seed=42, channel="Amazon", missing_ratio=0.05, cc_ratio=0.3):
+    """``party_emails.json`` entries for ``party_names(parties, channel)``.
+
+    About ``missing_ratio`` of the parties have no email (they land in
+    "Parties Without Email Addresses") and ``cc_ratio`` have CC addresses.
+    """
+    rng = random.Random(seed)
+    entries = []
+    for i, name in enumerate(party_names(parties, channel)):
+        email = "" if rng.random() < missing_ratio else f"vendor{i}@example.com"
+        cc = f"accounts{i}@example.com,ops@example.com" if rng.random() < cc_ratio else ""
+        entries.append({"Party Code": 100 + i, "Party Name": name, "Email": email, "CC": cc})
+    return entries
+
+
+def write_party_emails(path, parties, **options):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(party_emails(parties, **options), f, indent=2)
+    return path
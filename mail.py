@@ -1,26 +1,53 @@
 import pandas as pd
 import streamlit as st
+import streamlit.components.v1 as components
 import os
 import json
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from pathlib import Path
-import xlsxwriter
 import hashlib
-import zipfile
+import asyncio
 import pyodbc
 import webbrowser
 from io import BytesIO
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
 from datetime import datetime
-import time  # For SMTP throttling!
-import random
+from email import message_from_bytes
+from payment_mail_sender.ingest import STREAM_CHUNK_ROWS, load_excel, load_many
+from payment_mail_sender.delta import reconcile
+from payment_mail_sender.validation import validate_frames
+from payment_mail_sender.compose import build_message, generate_email_body as compose_email_body
+from payment_mail_sender.accounts import (GMAIL_DAILY_MESSAGES, GMAIL_DAILY_RECIPIENTS, QuotaExhausted, QuotaScheduler,
+                                          SendingAccount, is_quota_rejection, load_accounts)
+from payment_mail_sender.bulk import bulk_send, open_connection
+from payment_mail_sender.cache import IngestCache, content_digest
+from payment_mail_sender.directory import PartyStore, get_party_directory
+from payment_mail_sender.export import party_frames, write_partywise_workbook, write_partywise_zip
+from payment_mail_sender.outbox import Outbox, build_outbox
+from payment_mail_sender.suggest import alias_entry, suggest_matches
+from payment_mail_sender.summary import party_summary
+from payment_mail_sender.trace import STAGE_COLUMNS, Trace
+from payment_mail_sender.journal import JournalReport, ResumableRun, SendJournal, report_frame, write_report
+from payment_mail_sender.datasource import ConnectionPool, build_payment_query, load_database, sqlite_connector, sqlserver_connector
 
 # Constants
 JSON_PATH = Path("party_emails.json")
+DB_PATH = Path("party_emails.db")
 EXCEL_PATH = Path("Invoices.xlsx")
+SEND_JOURNAL_PATH = Path("send_journal.db")
+INGEST_CACHE_MAX_MB = 512
+SNAPSHOT_DIR = Path(".snapshots")
+UPLOAD_DIR = Path(".uploads")
+EXPORT_DIR = Path(".exports")
+OUTBOX_DIR = Path(".outbox")
+# Optional JSON list of more sending accounts (see payment_mail_sender.accounts.load_accounts)
+SENDING_ACCOUNTS_PATH = Path("sending_accounts.json")
+TRACE_DIR = Path(".traces")
+# Per-stage timings for each rerun and send run; PAYMENT_MAIL_TRACE=0 turns the spans into no-ops
+TRACE_ENABLED = os.environ.get("PAYMENT_MAIL_TRACE", "1") != "0"
+# Point at a SQLite file with the PaymentDetails schema to try the database source without SQL Server
+EASYSELL_STANDIN = os.environ.get("EASYSELL_SQLITE")
 EMAIL_UPLOAD_PASSWORD = "Payment Mail Sender Dashboard"
 
 connection_string = (
@@ -30,15 +57,6 @@ connection_string = (
     "Trusted_Connection=yes;"
 )
 
-def safe_date_format(date_val):
-    if pd.isna(date_val) or date_val == '' or date_val is None:
-        return ''
-    try:
-        dt = pd.to_datetime(date_val)
-        return dt.strftime('%d/%m/%Y')
-    except:
-        return ''
-
 def create_sample_excel():
     sample_payment = pd.DataFrame({
         "Party Name": ["Alpha Corp", "Beta Ltd"],
@@ -75,67 +93,61 @@ def create_sample_mail_excel():
     output.seek(0)
     return output
 
-EMAIL_TEMPLATE = """
-<html>
-  <body style="font-family: Arial, sans-serif; color: #333;">
-    <p>Dear [Party Name],</p>
-    <p>Please find below the summary of your recent transactions with us:</p>
-    <h3>Purchase & Payment Details</h3>
-    <table style="border-collapse: collapse;  width: 100%; margin-bottom: 20px;">
-      <thead>
-        <tr style="background-color: #f2f2f2; border: 2px solid #333;">
-          <th style="border: 1px solid #333; padding: 8px; ">Purchase Bill</th>
-          <th style="border:1px solid #ddd; padding: 8px; ">Main Advised No.</th>
-          <th style="border:1px solid #ddd; padding: 8px; ">Seller Advised No.</th>
-          <th style="border:1px solid #ddd; padding: 8px; ">Transaction Type</th>
-          <th style="border:1px solid #ddd; padding: 8px; ">Pur. Date</th>
-          <th style="border:1px solid #ddd; padding: 8px; ">Credit (CR)</th>
-          <th style="border:1px solid #ddd; padding: 8px; ">Debit (DR)</th>
-          <th style="border:1px solid #ddd; padding: 8px; ">Balance</th>
-        </tr>
-      </thead>
-      <tbody>
-        <!-- Dynamic payment rows inserted here -->
-      </tbody>
-    </table>
-  </body>
-</html>
-"""
-
-
-def load_party_emails():
-    if not JSON_PATH.exists():
-        sample = [
-            {"PartyName": "Alpha Corp", "Email": "alpha@example.com"},
-            {"PartyName": "Beta Ltd", "Email": "beta@example.com"}
-        ]
-        with open(JSON_PATH, 'w') as f:
-            json.dump(sample, f, indent=2)
-    with open(JSON_PATH, 'r') as f:
-        raw = json.load(f)
-
-    # Normalize keys so the rest of the app can always rely on:
-    # PartyCode, PartyName, Email, CC
-    normalized = []
-    for entry in raw:
-        if not isinstance(entry, dict):
-            continue
-        party_code = entry.get("PartyCode", entry.get("Party Code", ""))
-        party_name = entry.get("PartyName", entry.get("Party Name", ""))
-        email = entry.get("Email", "")
-        cc = entry.get("CC", entry.get("Cc", ""))
-
-        normalized.append({
-            "PartyCode": str(party_code).strip() if party_code is not None else "",
-            "PartyName": str(party_name).strip() if party_name is not None else "",
-            "Email": str(email).strip() if email is not None else "",
-            "CC": str(cc).strip() if cc is not None else "",
-        })
-    return normalized
-
-def save_party_emails(data):
-    with open(JSON_PATH, 'w') as f:
-        json.dump(data, f, indent=2)
+@st.cache_resource
+def get_party_store():
+    # party_emails.json is imported once into the database; the JSON is kept only as an export format
+    return PartyStore(DB_PATH, json_path=JSON_PATH)
+
+@st.cache_resource
+def get_ingest_cache():
+    # Shared across reruns and sessions; keyed on upload content, not file name
+    return IngestCache(max_bytes=INGEST_CACHE_MAX_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_send_journal():
+    # One connection shared by all sessions; appends are committed in batches
+    return SendJournal(SEND_JOURNAL_PATH)
+
+@st.cache_resource
+def get_journal_report():
+    # Keeps the records already read, so each rerun only fetches rows appended since
+    return JournalReport(get_send_journal())
+
+@st.cache_resource
+def get_easysell_pool():
+    connect = sqlite_connector(EASYSELL_STANDIN) if EASYSELL_STANDIN else sqlserver_connector(connection_string)
+    return ConnectionPool(connect, size=2)
+
+def show_paginated(frame, key, page_sizes=(25, 50, 100)):
+    # One table showing one page: the browser gets the same amount of data however many parties there are
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    page_size = col_size.selectbox("Rows per page", page_sizes, key=f"{key}_page_size")
+    pages = max(1, -(-len(frame) // page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = col_page.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    page_df = frame.iloc[start:start + page_size]
+    col_info.caption(f"Showing {start + 1 if len(frame) else 0}–{start + len(page_df)} of {len(frame)} · page {page} of {pages}")
+    with rerun_trace.span(f"streamlit.{key}_table", rows=len(page_df)):
+        st.dataframe(page_df, use_container_width=True, hide_index=True)
+    return page_df
+
+def traced_compute(stage, key, compute):
+    # A cached pipeline stage timed on this rerun's trace; a cache hit shows up as a near-zero span
+    cache = get_ingest_cache()
+    hits = cache.hits
+    with rerun_trace.span(stage) as span:
+        value = cache.get_or_compute(key, compute)
+        span.add("cache_hits", cache.hits - hits)
+    return value
+
+def show_trace(trace):
+    stages = pd.DataFrame(trace["stages"], columns=STAGE_COLUMNS)
+    st.dataframe(stages, use_container_width=True, hide_index=True)
+    if trace["counters"]:
+        st.caption(" · ".join(f"{counter}: {n:,}" if isinstance(n, int) else f"{counter}: {n:.3g}"
+                              for counter, n in trace["counters"].items()))
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -143,429 +155,17 @@ def hash_password(password):
 def check_password(input_pwd):
     return hash_password(input_pwd) == hash_password("Password")
 
-def load_excel(file_path):
-    wb = pd.ExcelFile(file_path)
-    sheet_names = [s.strip() for s in wb.sheet_names]
-
-    # Legacy two-sheet format: keep existing behavior
-    if "Payment Details" in sheet_names and "Debit Notes" in sheet_names:
-        payment_df = wb.parse("Payment Details")
-        debit_df = wb.parse("Debit Notes")
-        payment_df.columns = payment_df.columns.str.strip()
-        debit_df.columns = debit_df.columns.str.strip()
-        return payment_df, debit_df
-
-    # New single-sheet format with columns highlighted in yellow
-    # Expected headers (case-insensitive): Seller Name, Channel, Transaction Type, Category,
-    # Bill No, Invoice Date, Quantity, Total Without Tax, Total Tax, Total With Tax,
-    # Zoho Total Without Tax, Zoho Total Tax, Zoho Total With Tax, Balance Due,
-    # Zoho Status, CR, DR, Balance
-    sheet_name = sheet_names[0]
-
-    # Detect merged summary rows and offset header (seen in vendor Payment Details.xlsx)
-    raw_df_preview = wb.parse(sheet_name, header=None, nrows=5)
-    header_row = 0
-    first_cell = str(raw_df_preview.iloc[0, 0]) if not pd.isna(raw_df_preview.iloc[0, 0]) else ""
-    if "Seller Name:" in first_cell and "Advised No" in first_cell:
-        header_row = 2  # actual headers at row index 2 (0-based)
-
-    raw_df = wb.parse(sheet_name, header=header_row)
-    raw_df.columns = raw_df.columns.str.strip()
-
-    def pick(col_candidates):
-        # Some columns may be NaN or non-string; always cast to string for matching
-        lower_map = {str(c).lower(): c for c in raw_df.columns}
-        for cand in col_candidates:
-            if cand.lower() in lower_map:
-                return lower_map[cand.lower()]
-        return None
-
-    col_seller = pick(["Seller Name", "Party Name"])
-    col_bill = pick(["Bill No", "Invoice No", "Inv. No."])
-    col_date = pick(["Invoice Date", "Date"])
-    col_payment_date = pick(["Payment Date"])
-    col_total_with_tax = pick(["Total With Tax", "Total With Tax ", "Total_with_tax"])
-    col_total_with_tax_alt = pick(["Zoho Total With Tax", "Zoho total with tax"])
-    col_main_advise_no = pick(["Main Advised No", "Main Advise No"])
-    col_seller_advised_no = pick(["Seller Advised No", "Seller Advise No"])
-    col_dr = pick(["DR", "Debit", "Debit Amount"])
-    col_cr = pick(["CR", "Credit", "Credit Amount"])
-    col_category = pick(["Category"])
-    col_channel = pick(["Channel"])
-    col_txn_type = pick(["Transaction Type", "Transaction", "Transacation Type"])
-    col_quantity = pick(["Quantity", "Qty"])
-    col_total_wo_tax = pick(["Total Without Tax", "Total Without Tax "])
-    col_total_tax = pick(["Total Tax"])
-    col_zoho_wo_tax = pick(["Zoho Total Without Tax"])
-    col_zoho_tax = pick(["Zoho Total Tax"])
-    col_zoho_with_tax = pick(["Zoho Total With Tax"])
-    col_balance_due = pick(["Balance Due"])
-    col_zoho_status = pick(["Zoho Status"])
-    col_balance = pick(["Balance"])
-
-    # Basic required columns
-    missing_cols = []
-    if col_seller is None:
-        missing_cols.append("Seller Name")
-    if col_bill is None:
-        missing_cols.append("Bill No")
-    if col_date is None:
-        missing_cols.append("Invoice Date")
-    if col_main_advise_no is None:
-        missing_cols.append("Main Advised No")
-    if col_seller_advised_no is None:
-        missing_cols.append("Seller Advised No")
-    # For amounts we allow fallbacks; collect missing for messaging only
-    amt_missing = []
-    if col_total_with_tax is None and col_total_with_tax_alt is None:
-        amt_missing.append("Total With Tax")
-    if col_dr is None:
-        amt_missing.append("DR")
-    if col_cr is None:
-        amt_missing.append("CR")
-    if missing_cols:
-        raise ValueError(f"Missing required columns in the uploaded sheet: {', '.join(missing_cols)}. Expected at least Seller Name, Bill No, Invoice Date.")
-
-    # Normalize numeric columns
-    def num(series):
-        return pd.to_numeric(series, errors="coerce").fillna(0)
-
-    # Drop summary/empty rows
-    raw_df = raw_df.dropna(how="all")
-    if col_seller:
-        raw_df = raw_df[~raw_df[col_seller].isna()]
-
-    # Fallback order for totals
-    if col_total_with_tax:
-        total_with_tax_series = num(raw_df[col_total_with_tax])
-    elif col_total_with_tax_alt:
-        total_with_tax_series = num(raw_df[col_total_with_tax_alt])
-    elif col_total_wo_tax:
-        total_with_tax_series = num(raw_df[col_total_wo_tax])
-    else:
-        total_with_tax_series = pd.Series([0] * len(raw_df))
-
-    dr_series = num(raw_df[col_dr]) if col_dr else pd.Series([0] * len(raw_df))
-    cr_series = num(raw_df[col_cr]) if col_cr else pd.Series([0] * len(raw_df))
-
-    # If there is no explicit total column but we do have CR/DR, derive a pseudo total
-    if (col_total_with_tax is None and col_total_with_tax_alt is None and col_total_wo_tax is None) and (col_cr or col_dr):
-        total_with_tax_series = cr_series + dr_series
-
-    # Base series for seller/bill/date
-    seller_series = raw_df[col_seller].fillna("").astype(str).str.strip()
-    bill_series = raw_df[col_bill].fillna("").astype(str).str.strip()
-    date_series = raw_df[col_date]
-    payment_date_series = raw_df[col_payment_date] if col_payment_date else pd.Series([None] * len(raw_df))
-
-    # Filter out only total/blank rows (keep all rows with valid seller name)
-    filtered_idx = ~(
-        (bill_series.str.lower().isin(["", "total", "nan"])) 
-        & (seller_series.str.strip() == "")
-    )
-    seller_series = seller_series[filtered_idx]
-    bill_series = bill_series[filtered_idx]
-    date_series = date_series[filtered_idx]
-    raw_df = raw_df.loc[filtered_idx]
-
-    # Derive Party Code from seller name where possible (e.g. "731-AUROMIN-Amazon" -> "731", "731s-AUROMIN-demo" -> "731")
-    import re
-    def derive_code(val: str) -> str:
-        if not val:
-            return ""
-        m = re.match(r"(\d+)", val.strip())
-        if m:
-            return m.group(1)
-        # fallback to chunk before first dash
-        return val.split("-")[0].strip() if "-" in val else val.strip()
-    party_code_series = seller_series.apply(derive_code)
-    party_code_series = party_code_series.where(party_code_series != "", seller_series)
-
-    payment_df = pd.DataFrame({
-        "Party Name": seller_series,
-        "Party Code": party_code_series,
-        "Inv. No.": bill_series,
-        "Main Advised No.": raw_df[col_main_advise_no] if col_main_advise_no else "",
-        "Seller Advised No.": raw_df[col_seller_advised_no] if col_seller_advised_no else "",
-        "Pur. Date": date_series,
-        "Total Inv. Amount": total_with_tax_series,
-        "Debit Amount": dr_series,
-        # Net = Total - DR - CR (treat CR as credit note)
-        "Net Amount": total_with_tax_series - dr_series - cr_series,
-        # Bank Payment shows CR so existing email layout still reflects reduction
-        "Bank Payment": cr_series,
-        "Payment Date": payment_date_series,
-        # Provide a debit/credit note reference when present
-        "Debit Note": bill_series.where(dr_series > 0, "").fillna(""),
-        "Transaction Type": raw_df[col_txn_type] if col_txn_type else ""
-    })
-
-    # Trim to only the needed columns for mail logic
-    keep_cols = [
-        "Party Name",
-        "Party Code",
-        "Inv. No.",
-        "Main Advised No.",
-        "Seller Advised No.",
-        "Pur. Date",
-        "Total Inv. Amount",
-        "Debit Amount",
-        "Net Amount",
-        "Bank Payment",
-        "Payment Date",
-        "Debit Note",
-        "Transaction Type",
-    ]
-    payment_df = payment_df[keep_cols]
-
-    # Build a synthetic Debit Notes sheet from DR amounts
-    debit_rows = []
-    for _, row in raw_df.iterrows():
-        seller_val = str(row[col_seller]).strip() if pd.notna(row[col_seller]) else ""
-        party_code_val = derive_code(seller_val)
-        party_code_val = party_code_val or seller_val
-        party_name_val = seller_val
-        bill_no = str(row[col_bill]).strip() if pd.notna(row[col_bill]) else ""
-        inv_date = row[col_date]
-        dr_amt = pd.to_numeric(row[col_dr], errors="coerce")
-        if pd.notna(dr_amt) and dr_amt > 0:
-            debit_rows.append({
-                "Party Name": party_name_val,
-                "Party Code": party_code_val,
-                "Date": inv_date,
-                "Return Invoice No.": bill_no,
-                "Amount": float(dr_amt),
-            })
-        cr_amt = pd.to_numeric(row[col_cr], errors="coerce") if col_cr else 0
-        if pd.notna(cr_amt) and cr_amt > 0:
-            debit_rows.append({
-                "Party Name": party_name_val,
-                "Party Code": party_code_val,
-                "Date": inv_date,
-                "Return Invoice No.": f"{bill_no} (CR)",
-                "Amount": float(cr_amt) * -1.0,  # credit note reduces balance
-            })
-    debit_df = pd.DataFrame(debit_rows) if debit_rows else pd.DataFrame(columns=["Party Code", "Party Name", "Date", "Return Invoice No.", "Amount"])
-    debit_df.columns = debit_df.columns.str.strip()
-    return payment_df, debit_df
-
-def match_data(payment_df, debit_df, party_emails):
-    # Helper to normalize names for matching:
-    # - strip leading/trailing spaces
-    # - ignore case
-    # - ignore internal whitespace (so \"123 - Sample - Amazon\" == \"123-Sample-Amazon\")
-    import re
-
-    def normalize_name(name: str) -> str:
-        if name is None:
-            return ""
-        # collapse all whitespace and remove it
-        collapsed = re.sub(r"\s+", "", str(name))
-        return collapsed.strip().lower()
-
-    # Match on Party Name (Seller Name), case-insensitive and whitespace-insensitive
-    email_map = {}
-    for e in party_emails:
-        name = str(e.get("PartyName", "")).strip()
-        if not name:
-            continue
-        key = normalize_name(name)
-        email_map[key] = {
-            "to": [email.strip() for email in str(e.get("Email", "")).split(",")],
-            "cc": [cc.strip() for cc in str(e.get("CC", "")).split(",")] if "CC" in e and pd.notna(e["CC"]) else [],
-            "display_name": name,
-        }
-    payment_df.columns = payment_df.columns.str.strip()
-    debit_df.columns = debit_df.columns.str.strip()
-    result = []
-    mismatch_log_lines = []
-    skip_log_lines = []
-    parties_without_email = []
-    
-    # Prefer matching by Party Name (Seller Name)
-    payment_party_col = None
-    if 'Party Name' in payment_df.columns:
-        payment_party_col = 'Party Name'
-    elif 'Party Code' in payment_df.columns:
-        payment_party_col = 'Party Code'
-    
-    debit_party_col = None
-    if 'Party Name' in debit_df.columns:
-        debit_party_col = 'Party Name'
-    elif 'Party Code' in debit_df.columns:
-        debit_party_col = 'Party Code'
-    
-    # First, identify parties in payment sheet that have no email
-    parties_without_email = []
-    if payment_party_col:
-        payment_party_names = set(payment_df[payment_party_col].astype(str).str.strip())
-        for party_name_val in payment_party_names:
-            key = normalize_name(party_name_val)
-            if key not in email_map or not email_map[key]["to"] or all(email.strip().lower() in ['nan', 'none', ''] for email in email_map[key]["to"]):
-                party_name = party_name_val or "Unknown"
-                parties_without_email.append({
-                    "party_code": party_name_val,
-                    "party_name": party_name,
-                    "payment_count": len(payment_df[payment_df[payment_party_col].astype(str).apply(normalize_name) == key])
-                })
-    
-    for name_key, email_data in email_map.items():
-        party_code = email_data.get("display_name", name_key)
-        if payment_party_col:
-            party_payments = payment_df[payment_df[payment_party_col].astype(str).apply(normalize_name) == name_key]
-        else:
-            party_payments = pd.DataFrame()  # Empty DataFrame if no party column found
-        
-        if party_payments.empty:
-            skip_log_lines.append(f"SKIPPED: {party_code} — No payment rows found in Payment Sheet")
-            continue
-        related_debits = debit_df[debit_df[debit_party_col].astype(str).apply(normalize_name) == name_key] if debit_party_col else pd.DataFrame()
-        # Only compare positive debit notes against payment debit amounts; credits are negative and excluded from this check
-        total_debit_amount = related_debits[related_debits['Amount'] > 0]['Amount'].sum() if not related_debits.empty else 0
-        party_payments = party_payments.copy()
-        party_payments['Debit Amount'] = party_payments['Debit Amount'].fillna(0)
-        party_debit_sum = party_payments['Debit Amount'].sum()
-
-        if abs(party_debit_sum - total_debit_amount) > 0.01:
-            skip_log_lines.append(f"SKIPPED: {party_code} — Debit Amount mismatch between payment sheet and debit sheet")
-            continue
-
-        # Include ALL payment rows for this party (no filtering based on debit note matching)
-        payment_issues = []
-        for _, row in party_payments.iterrows():
-            payment_issues.append(row.to_dict())
-        if payment_issues:
-            result.append({
-                'party_code': party_code,
-                'emails': email_data["to"],
-                'cc_emails': email_data["cc"],
-                'payments': payment_issues,
-                'debits': related_debits.to_dict(orient='records') if not related_debits.empty else []
-            })
-        else:
-            skip_log_lines.append(f"SKIPPED: {party_code} — All payment rows matched with debit notes correctly.")
-
-    if skip_log_lines:
-        with open('SkippedPartiesLog.txt', 'w') as f:
-            for line in skip_log_lines:
-                f.write(line + "\n")
-    if mismatch_log_lines:
-        with open('MismatchLog.txt', 'w') as f:
-            for line in mismatch_log_lines:
-                f.write(line + "\n")
-    return result, skip_log_lines, parties_without_email
-
 def generate_email_body(party_code, payment_rows, debit_rows):
-    # party_code is actually PartyName (case-insensitive)
-    import re
-
-    def normalize_name(name: str) -> str:
-        if name is None:
-            return ""
-        collapsed = re.sub(r"\s+", "", str(name))
-        return collapsed.strip().lower()
-
-    lookup_key = normalize_name(party_code)
-    party_name = next(
-        (e['PartyName'] for e in party_emails if normalize_name(e.get('PartyName', '')) == lookup_key),
-        party_code if party_code else 'Unknown Party'
-    )
-    template = EMAIL_TEMPLATE
-    payment_html = ""
-    total_credit = 0.0
-    total_debit = 0.0
-    running_balance = 0.0
-    payment_dates = []
-    for row in payment_rows:
-        # Raw numeric values for CR / DR
-        debit_val_num = row.get('Debit Amount', 0)
-        credit_val_num = row.get('Bank Payment', 0)
-        try:
-            dr = float(debit_val_num) if not pd.isna(debit_val_num) and debit_val_num != '' else 0.0
-        except (ValueError, TypeError):
-            dr = 0.0
-        try:
-            cr = float(credit_val_num) if not pd.isna(credit_val_num) and credit_val_num != '' else 0.0
-        except (ValueError, TypeError):
-            cr = 0.0
-
-        total_credit += cr
-        total_debit += dr
-        running_balance += cr - dr
-
-        # Handle NaN and missing values for display
-        inv_no = row.get('Inv. No.', '')
-        main_adv = row.get('Main Advised No.', '')
-        seller_adv = row.get('Seller Advised No.', '')
-        pur_date = safe_date_format(row.get('Pur. Date', ''))
-        txn_type = row.get('Transaction Type', '')
-        
-        inv_no = '-' if pd.isna(inv_no) or inv_no == '' else str(inv_no)
-        main_adv_display = '-' if pd.isna(main_adv) or main_adv == '' else str(main_adv)
-        seller_adv_display = '-' if pd.isna(seller_adv) or seller_adv == '' else str(seller_adv)
-        pur_date_display = pur_date or '-'
-        debit_val_display = '-' if pd.isna(dr) or dr == '' else f"{dr:.2f}"
-        credit_val_display = '-' if pd.isna(cr) or cr == '' else f"{cr:.2f}"
-        txn_type_display = '-' if pd.isna(txn_type) or txn_type == '' else str(txn_type)
-        balance_display = f"{running_balance:.2f}"
-        
-        payment_html += f"""
-        <tr style="text-align:center; border:1px solid #ccc;">
-          <td style="border:1px solid #ccc;">{inv_no}</td>
-          <td style="border:1px solid #ccc;">{main_adv_display}</td>
-          <td style="border:1px solid #ccc;">{seller_adv_display}</td>
-          <td style="border:1px solid #ccc;">{txn_type_display}</td>
-          <td style="border:1px solid #ccc;">{pur_date_display}</td>
-          <td style="border:1px solid #ccc;">{credit_val_display}</td>
-          <td style="border:1px solid #ccc;">{debit_val_display}</td>
-          <td style="border:1px solid #ccc;">{balance_display}</td>
-        </tr>"""
-        if row.get('Payment Date') and not pd.isna(row.get('Payment Date')):
-            payment_dates.append(row['Payment Date'])
-
-    # Final balance = total credit - total debit (as in sheet Balance column)
-    final_balance = total_credit - total_debit
-    # First show Total row with CR, DR, and Balance totals
-    payment_html += f"""
-    <tr style="text-align:center; font-weight:bold; background-color:#f9f9f9;">
-      <td colspan="5" style="border:1px solid #ccc;">Total</td>
-      <td style="border:1px solid #ccc;">{total_credit:.2f}</td>
-      <td style="border:1px solid #ccc;">{total_debit:.2f}</td>
-      <td style="border:1px solid #ccc;">{final_balance:.2f}</td>
-    </tr>"""
-    # Then show Bank Final Amount row with just the final balance
-    payment_html += f"""
-    <tr style="text-align:center; font-weight:bold; background-color:#f9f9f9;">
-      <td colspan="7" style="border:1px solid #ccc; text-align:right;">Bank Final Amount</td>
-      <td style="border:1px solid #ccc;">{final_balance:.2f}</td>
-    </tr>"""
-    html_body = template.replace("[Party Name]", party_name)
-    html_body = html_body.replace("<!-- Dynamic payment rows inserted here -->", payment_html)
-    # Payment summary after table
-    latest_payment_date = safe_date_format(max(pd.to_datetime(payment_dates, errors='coerce')) if payment_dates else None) or 'N/A'
-    html_body = html_body.replace("</table>", f"</table>\n<p><strong>Bank Payment Date:</strong> {latest_payment_date}</p>")
-    closing_note = """
-    <br><br>
-    <p><strong>🔔 Important Note:</strong> If you have any discrepancies or concerns regarding the above payment summary, please raise the issue within 7 days. No changes or claims will be entertained after this period.</p>
-    <p>Thank you for your continued partnership.</p>
-    <p>Best regards,<br><strong>Easy Sell Service Pvt. Ltd.</strong></p>
-        """
-    html_body = html_body.replace("</body>", f"{closing_note}</body>")
-    return html_body
-
-
-def send_email(gmail_user, app_password, to_emails, subject, html_body, cc=None):
-    msg = MIMEMultipart('alternative')
-    msg['From'] = gmail_user
-    msg['To'] = ", ".join(to_emails)
-    if cc:
-        msg['Cc'] = ", ".join(cc)
-    msg['Subject'] = subject
-    msg.attach(MIMEText(html_body, 'html'))
-    recipients = to_emails + (cc if cc else [])
+    return compose_email_body(party_code, payment_rows, debit_rows, party_directory)
+
+def send_email(gmail_user, app_password, to_emails, subject, html_body, cc=None, pool=None):
+    recipients, message = build_message(gmail_user, to_emails, subject, html_body, cc=cc)
+    if pool is not None:
+        pool.send(gmail_user, recipients, message)
+        return
     with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
         server.login(gmail_user, app_password)
-        server.sendmail(gmail_user, recipients, msg.as_string())
+        server.sendmail(gmail_user, recipients, message)
 
 st.set_page_config(page_title="Payment Reconciliation", layout="wide")
 
@@ -581,6 +181,7 @@ if not st.session_state.auth:
             st.error("Invalid password")
     st.stop()
 
+rerun_trace = Trace("dashboard rerun", enabled=TRACE_ENABLED)
 st.title("📧 Payment Mail Sender Dashboard")
 col1, col3 = st.columns(2)
 with col1:
@@ -607,18 +208,22 @@ with st.expander("🔑 Protected Upload", expanded=False):
             try:
                 email_df = pd.read_excel(email_upload)
                 if "Party Code" in email_df.columns and "Email" in email_df.columns:
-                    updated_json = []
-                    missing_emails = []
-                    for _, row in email_df.iterrows():
-                        party = str(row["Party Name"]).strip()
-                        code = str(row['Party Code']).strip()
-                        emails = str(row['Email']).strip()
-                        cc = str(row['CC']).strip() if 'CC' in row else ''
-                        updated_json.append({"PartyCode": code, "Email": emails, "PartyName": party, "CC": cc})
-                        if not emails or emails.lower() in ['nan', 'none', '']:
-                            missing_emails.append(f"{party} ({code})")
-                    save_party_emails(updated_json)
-                    st.success("✅ Party email list updated from Excel!")
+                    parties = [str(v).strip() for v in email_df["Party Name"].tolist()]
+                    codes = [str(v).strip() for v in email_df['Party Code'].tolist()]
+                    emails = [str(v).strip() for v in email_df['Email'].tolist()]
+                    ccs = [str(v).strip() for v in email_df['CC'].tolist()] if 'CC' in email_df.columns else [''] * len(email_df)
+                    updated_rows = [
+                        {"PartyCode": code, "Email": email, "PartyName": party, "CC": cc}
+                        for party, code, email, cc in zip(parties, codes, emails, ccs)
+                    ]
+                    missing_emails = [
+                        f"{party} ({code})"
+                        for party, code, email in zip(parties, codes, emails)
+                        if not email or email.lower() in ['nan', 'none', '']
+                    ]
+                    # One transaction: new parties are added, existing ones (by Party Name) updated
+                    upserted = get_party_store().upsert_many(updated_rows)
+                    st.success(f"✅ Party email list updated from Excel! ({upserted} parties)")
                     if missing_emails:
                         st.warning(
                             "⚠️ The following vendors have no email addresses in your file:\n" +
@@ -628,40 +233,136 @@ with st.expander("🔑 Protected Upload", expanded=False):
                     st.error("Excel must contain 'Party Code' 'Party Name' 'CC' and 'Email' columns.")
             except Exception as e:
                 st.error(f"Error reading Excel: {e}")
+        st.download_button(
+            label="📥 Export Party Emails (JSON)",
+            data=get_party_store().export_json(),
+            file_name="party_emails.json",
+            mime="application/json"
+        )
     elif upload_pass:
         st.error("❌ Incorrect password!")
 
-st.subheader("📁 Upload Payment Details Excel")
-uploaded_file = st.file_uploader("Upload Excel File", type=["xlsx"])
-if uploaded_file:
-    with open(EXCEL_PATH, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    st.success("Excel uploaded. Processing...")
-
-    payment_df, debit_df = load_excel(EXCEL_PATH)
-    # Guard against date mixing
-    for _, row in payment_df.iterrows():
-        inv_date = row.get('Pur. Date', '')
-        pay_date = row.get('Payment Date', '')
-        if inv_date and pay_date and str(inv_date).strip() == str(pay_date).strip():
-            raise ValueError("Invoice Date and Payment Date must not be the same for row: " + str(row))
+st.subheader("📁 Payment Details")
+payment_source = st.radio("Payment data source", ["Excel upload", "Excel batch (one file per channel)", "EasySell database"],
+                          horizontal=True)
+uploaded_file = None
+uploaded_files = []
+db_frames = None
+if payment_source == "Excel upload":
+    uploaded_file = st.file_uploader("Upload Excel File", type=["xlsx"])
+elif payment_source == "Excel batch (one file per channel)":
+    uploaded_files = st.file_uploader("Upload Excel Files", type=["xlsx"], accept_multiple_files=True)
+else:
+    db_advised_no = st.text_input("Main Advised No (optional)")
+    db_filter_dates = st.checkbox("Filter by payment date")
+    db_paid_from = db_paid_to = None
+    if db_filter_dates:
+        col_from, col_to = st.columns(2)
+        db_paid_from = col_from.date_input("Payment date from")
+        db_paid_to = col_to.date_input("Payment date to")
+    if st.button("Load from EasySell"):
+        query, params = build_payment_query(db_advised_no.strip() or None, db_paid_from, db_paid_to)
+        try:
+            with rerun_trace.span("load_database") as span:
+                frames = load_database(get_easysell_pool(), query, params)
+                span.add("rows_parsed", len(frames[0]) + len(frames[1]))
+        except Exception as e:
+            st.error(f"Could not load payment data from EasySell: {e}")
+        else:
+            # Each load is a fresh read of the database, so it gets its own cache key
+            load_key = content_digest(f"{query}|{params}|{datetime.now().isoformat()}".encode())
+            st.session_state.db_frames = (frames, load_key)
+    db_frames = st.session_state.get("db_frames")
+
+if uploaded_file or uploaded_files or db_frames:
+    ingest_cache = get_ingest_cache()
+    if uploaded_file:
+        source_label = uploaded_file.name
+        upload_bytes = uploaded_file.getvalue()
+        upload_digest = content_digest(upload_bytes)
+
+        def ingest_upload():
+            # Only runs when these exact bytes have not been parsed yet
+            with open(EXCEL_PATH, "wb") as f:
+                f.write(upload_bytes)
+            # Falls through to an Arrow snapshot when this content was parsed before (pyarrow installed);
+            # otherwise the sheet is streamed in fixed-size chunks to bound memory on quarter-end files
+            payment_df, debit_df = load_excel(EXCEL_PATH, snapshot_dir=SNAPSHOT_DIR, digest=upload_digest,
+                                              chunk_rows=STREAM_CHUNK_ROWS)
+            rerun_trace.count("rows_parsed", len(payment_df) + len(debit_df))
+            return payment_df, debit_df
+
+        payment_df, debit_df = traced_compute("load_excel", ("excel", upload_digest), ingest_upload)
+        st.success("Excel uploaded. Processing...")
+        st.caption(
+            f"Ingest cache: {ingest_cache.hits} hits / {ingest_cache.misses} misses · "
+            f"{len(ingest_cache)} entries · {ingest_cache.current_bytes / 1024 / 1024:.1f} MB"
+        )
+    elif uploaded_files:
+        source_label = ", ".join(f.name for f in uploaded_files)
+        batch_bytes = [f.getvalue() for f in uploaded_files]
+        batch_digests = [content_digest(data) for data in batch_bytes]
+        # File order decides which copy of a duplicated bill is kept, so it is part of the key
+        upload_digest = content_digest("|".join(batch_digests).encode())
+
+        def ingest_batch():
+            UPLOAD_DIR.mkdir(exist_ok=True)
+            paths = []
+            for upload, data, digest in zip(uploaded_files, batch_bytes, batch_digests):
+                path = UPLOAD_DIR / f"{digest[:16]}_{Path(upload.name).name}"
+                if not path.exists():
+                    path.write_bytes(data)
+                paths.append(path)
+            # Workbooks are parsed in parallel worker processes, then merged and de-duplicated by bill number
+            payment_df, debit_df, batch_report = load_many(paths, snapshot_dir=SNAPSHOT_DIR, chunk_rows=STREAM_CHUNK_ROWS)
+            rerun_trace.count("rows_parsed", len(payment_df) + len(debit_df))
+            return payment_df, debit_df, batch_report
+
+        payment_df, debit_df, batch_report = traced_compute("load_many", ("excel_batch", upload_digest), ingest_batch)
+        failed_files = batch_report[batch_report["Status"] == "failed"]
+        if failed_files.empty:
+            st.success(f"{len(uploaded_files)} workbooks merged: {len(payment_df)} payment rows. Processing...")
+        else:
+            st.error(f"❌ {len(failed_files)} of {len(uploaded_files)} workbooks could not be loaded; continuing with the rest")
+        with st.expander("🗂️ Batch Load Report", expanded=not failed_files.empty):
+            st.dataframe(batch_report, use_container_width=True)
+    else:
+        source_label = "EasySell"
+        (payment_df, debit_df), upload_digest = db_frames
+        st.success(f"Loaded {len(payment_df)} payment rows from EasySell. Processing...")
+
+    # Every check runs over the whole sheet; problems are listed instead of stopping the page
+    violations = traced_compute("validate_frames", ("validate", upload_digest), lambda: validate_frames(payment_df, debit_df))
+    if not violations.empty:
+        error_count = int((violations["Severity"] == "error").sum())
+        st.warning(f"⚠️ {len(violations)} validation issues ({error_count} errors, {len(violations) - error_count} warnings)")
+        with st.expander("🔎 Validation Issues", expanded=error_count > 0):
+            st.write(violations["Check"].value_counts().rename("Rows"))
+            st.dataframe(violations, use_container_width=True)
+            st.download_button(
+                label="📥 Download Validation Issues (CSV)",
+                data=violations.to_csv(index=False),
+                file_name="validation_issues.csv",
+                mime="text/csv"
+            )
     st.subheader("Payment Details Sheet Columns")
     st.write(payment_df.columns.tolist())
     st.subheader("Debit Notes Sheet Columns")
     st.write(debit_df.columns.tolist())
-    party_emails = load_party_emails()
+    party_store = get_party_store()
+    party_directory = get_party_directory(party_store)
+    party_emails = party_directory.entries
     st.subheader("📬 Party Emails")
-    party_names = [e['PartyCode'] for e in party_emails]
+    party_names = party_directory.codes()
     selected_party = st.selectbox("Select Party to Edit Emails", [""] + party_names)
     if selected_party:
-        idx = next((i for i, e in enumerate(party_emails) if e['PartyCode'] == selected_party), None)
-        if idx is not None:
-            new_email = st.text_input(f"Emails for {selected_party}", party_emails[idx]['Email'])
+        record = party_directory.find_by_code(selected_party)
+        if record is not None:
+            new_email = st.text_input(f"Emails for {selected_party}", record.email)
             pwd_confirm = st.text_input(f"Confirm Password to Update Emails for {selected_party}", type="password")
             if st.button("Update Emails"):
                 if pwd_confirm == "password":
-                    party_emails[idx]['Email'] = new_email
-                    save_party_emails(party_emails)
+                    party_store.upsert({"PartyCode": record.code, "PartyName": record.name, "Email": new_email, "CC": record.cc})
                     st.success(f"Emails updated for {selected_party}")
                 else:
                     st.error("Incorrect password. Emails not updated.")
@@ -669,9 +370,55 @@ if uploaded_file:
     st.subheader("📧 Gmail Settings")
     gmail_user = st.text_input("Your Gmail")
     gmail_pwd = st.text_input("App Password (Use Gmail App Password)", type="password")
+    with st.expander("⚙️ Sending Options", expanded=False):
+        smtp_pool_size = st.number_input("SMTP connections", min_value=1, max_value=8, value=2)
+        smtp_rate = st.number_input("Max messages per second (all connections)", min_value=0.1, value=1.0, step=0.1)
+        smtp_conn_rate = st.number_input("Max messages per second (per connection)", min_value=0.1, value=0.5, step=0.1)
+        daily_messages = st.number_input("Messages this account may send per 24 hours", min_value=1,
+                                         value=GMAIL_DAILY_MESSAGES)
+        daily_recipients = st.number_input("Recipients this account may send to per 24 hours", min_value=1,
+                                           value=GMAIL_DAILY_RECIPIENTS)
+        accounts_file = st.text_input("More sending accounts (JSON file)",
+                                      value=str(SENDING_ACCOUNTS_PATH) if SENDING_ACCOUNTS_PATH.exists() else "")
+        bulk_mode = st.checkbox("Bulk mode (async sending with a single progress bar)", value=False,
+                                help="Sends from this account only, within its daily quota")
+        resume_run = st.checkbox("Skip statements already delivered (resume an interrupted run)", value=True)
+        # Statements are spread over the accounts within each one's quota; the rest wait for a later send
+        sending_accounts = []
+        if gmail_user and gmail_pwd:
+            try:
+                sending_accounts = load_accounts(accounts_file) if accounts_file else []
+            except (OSError, ValueError) as e:
+                st.error(f"Sending accounts not loaded: {e}")
+            if gmail_user not in {account.user for account in sending_accounts}:
+                sending_accounts.insert(0, SendingAccount(
+                    gmail_user, gmail_pwd, daily_messages=int(daily_messages), daily_recipients=int(daily_recipients),
+                    pool_size=int(smtp_pool_size), rate=smtp_rate, per_connection_rate=smtp_conn_rate))
+            quota_view = pd.DataFrame(QuotaScheduler(sending_accounts, get_send_journal(), None).capacity())
+            st.dataframe(quota_view, hide_index=True, use_container_width=True)
 
     if gmail_user and gmail_pwd:
-        matched_results, skips, parties_without_email = match_data(payment_df, debit_df, party_emails)
+        # Parties whose rows and directory entry are unchanged since the previous upload keep their match entries
+        reconciliation = traced_compute(
+            "match_data",
+            ("match", upload_digest, party_directory.digest),
+            lambda: reconcile(payment_df, debit_df, party_emails, previous=st.session_state.get("last_reconciliation")),
+        )
+        st.session_state.last_reconciliation = reconciliation
+        matched_results, skips = reconciliation.matched_results, reconciliation.skips
+        parties_without_email = reconciliation.parties_without_email
+        rerun_trace.count("parties_matched", len(matched_results))
+
+        delta = reconciliation.delta
+        if delta.changed or delta.unchanged or delta.removed:
+            st.subheader("🔄 Changes Since the Previous Upload")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Added", len(delta.added))
+            col2.metric("Changed", len(delta.changed))
+            col3.metric("Unchanged", len(delta.unchanged))
+            col4.metric("Removed", len(delta.removed))
+            st.caption("Only added and changed parties are matched and rendered again; unchanged statements keep "
+                       "their message, so a run that already delivered them skips them.")
         
         # Display parties without email addresses in card format
         if parties_without_email:
@@ -690,48 +437,13 @@ if uploaded_file:
             
             st.markdown("---")
             
-            # Show parties without email in card format
             st.subheader("📋 Parties Requiring Email Setup")
-            
-            # Create columns for better layout
-            cols_per_row = 2
-            email_columns = st.columns(cols_per_row)
-            
-            for i, party in enumerate(parties_without_email):
-                col_idx = i % cols_per_row
-                
-                with email_columns[col_idx]:
-                    # Create a card-like container
-                    with st.container():
-                        st.markdown(f"""
-                        <div style="
-                            background-color: #fff3cd; 
-                            border: 1px solid #ffeaa7; 
-                            border-radius: 8px; 
-                            padding: 15px; 
-                            margin: 5px 0;
-                            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                        ">
-                            <h4 style="color: #856404; margin: 0 0 8px 0;">🏢 {party['party_name']}</h4>
-                            <p style="margin: 2px 0; color: #6c757d;"><strong>Code:</strong> {party['party_code']}</p>
-                            <p style="margin: 2px 0; color: #6c757d;"><strong>Payment Records:</strong> {party['payment_count']}</p>
-                            <div style="
-                                background-color: #f8d7da; 
-                                color: #721c24; 
-                                padding: 5px 10px; 
-                                border-radius: 4px; 
-                                font-size: 0.85em; 
-                                margin-top: 8px;
-                                text-align: center;
-                            ">
-                                ⚠️ Email Required
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                
-                # Add new row after every cols_per_row items
-                if (i + 1) % cols_per_row == 0 and i < len(parties_without_email) - 1:
-                    st.markdown("---")
+            missing_view = pd.DataFrame(parties_without_email, columns=["party_name", "party_code", "payment_count"]).rename(
+                columns={"party_name": "Party Name", "party_code": "Party Code", "payment_count": "Payment Records"})
+            missing_filter = st.text_input("Filter parties", key="no_email_filter")
+            if missing_filter:
+                missing_view = missing_view[missing_view["Party Name"].astype(str).str.contains(missing_filter, case=False, regex=False)]
+            show_paginated(missing_view, "no_email")
             
             # Add download option for parties without email
             email_missing_df = pd.DataFrame(parties_without_email)
@@ -742,6 +454,25 @@ if uploaded_file:
                 file_name="parties_without_email.csv",
                 mime="text/csv"
             )
+
+            st.subheader("🔎 Suggested Matches")
+            # Directory parties whose spelling or party code is close to each seller's, from a trigram/code index
+            suggestions = traced_compute(
+                "suggest_matches",
+                ("suggest", upload_digest, party_directory.digest),
+                lambda: suggest_matches(parties_without_email, party_directory),
+            )
+            if suggestions.empty:
+                st.caption("No party in the directory looks like these sellers.")
+            else:
+                st.caption("Accepting a suggestion adds the seller's spelling to the party directory with the "
+                           "suggested party's code and emails, so it is matched from the next rerun on.")
+                suggestion_page = show_paginated(suggestions, "suggestions")
+                for row in suggestion_page.to_dict("records"):
+                    seller, suggested = row["Seller"], row["Suggested Party"]
+                    if st.button(f"✅ {seller} → {suggested} ({row['Confidence']:.0%})", key=f"accept_{seller}_{suggested}"):
+                        party_store.upsert(alias_entry(seller, party_directory.find_exact_name(suggested)))
+                        st.rerun()
             
             st.markdown("---")
             
@@ -749,15 +480,36 @@ if uploaded_file:
             st.subheader("🔧 Next Steps")
             st.info("""
             **To enable email sending for these parties:**
-            1. Update the party email list via the protected upload section above
+            1. Accept a suggested match above, or update the party email list via the protected upload section
             2. Ensure each party has a valid email address
             3. Re-upload the payment Excel file to reprocess
             """)
         
         st.subheader("✅ Ready to Email")
-        for entry in matched_results:
-            with st.expander(entry['party_code']):
-                st.json(entry)
+        # Per-party aggregates in one paginated table; payment rows are only sent for the party picked below
+        ready_summary = traced_compute(
+            "party_summary",
+            ("party_summary", upload_digest, party_directory.digest),
+            lambda: party_summary(payment_df, debit_df, matched_results),
+        )
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Parties", len(ready_summary))
+        col2.metric("Payment Rows", int(ready_summary["Rows"].sum()))
+        col3.metric("Total Balance", f"{ready_summary['Balance'].sum():,.2f}" if "Balance" in ready_summary else "—")
+        ready_filter = st.text_input("Filter parties", key="ready_filter")
+        ready_view = ready_summary
+        if ready_filter:
+            ready_view = ready_summary[ready_summary["Party"].astype(str).str.contains(ready_filter, case=False, regex=False)]
+        ready_page = show_paginated(ready_view, "ready")
+        detail_party = st.selectbox("Show payment rows for", [""] + ready_page["Party"].tolist(), key="ready_detail")
+        if detail_party:
+            entry = next(e for e in matched_results if e['party_code'] == detail_party)
+            st.caption(f"To: {', '.join(entry['emails'])}" + (f" · CC: {', '.join(c for c in entry['cc_emails'] if c)}"
+                                                              if any(entry['cc_emails']) else ""))
+            st.dataframe(entry['payments'].plain(), use_container_width=True, hide_index=True)
+            if len(entry['debits']):
+                st.write("Debit / credit notes")
+                st.dataframe(entry['debits'].plain(), use_container_width=True, hide_index=True)
         # Display skipped parties (minimal format)
         if skips:
             st.subheader("⏭️ Skipped Parties")
@@ -799,6 +551,45 @@ if uploaded_file:
                     mime="text/csv"
                 )
 
+        st.subheader("📦 Outbox")
+        # Every statement rendered and spooled to disk in a process pool, one spool per sender; the send
+        # below only streams the spooled bytes, so it can be reviewed before the send window
+        outbox_key = ("outbox", upload_digest, party_directory.digest, gmail_user)
+        outbox_dir = OUTBOX_DIR / content_digest(gmail_user.encode())[:16]
+
+        def get_outbox(trace):
+            with trace.span("build_outbox") as span:
+                outbox = Outbox.open(outbox_dir)
+                # A spool from another upload is rebuilt, keeping the messages of unchanged parties
+                if outbox is None or outbox.from_addr != gmail_user or outbox.fingerprints != reconciliation.fingerprints:
+                    outbox = build_outbox(outbox_dir, matched_results, party_directory, gmail_user, source=source_label,
+                                          fingerprints=reconciliation.fingerprints)
+                    span.add("messages_rendered", len(outbox) - outbox.reused)
+                span.add("messages", len(outbox))
+            return outbox
+
+        if st.button("Build Outbox"):
+            st.session_state.outbox_key = outbox_key
+        if st.session_state.get("outbox_key") == outbox_key:
+            outbox = get_outbox(rerun_trace)
+            st.caption(f"{len(outbox)} messages ({outbox.reused} unchanged, kept) · "
+                       f"{outbox.total_bytes / 1024 / 1024:.1f} MB · built {outbox.manifest['created_at']} · {outbox_dir}")
+            outbox_view = pd.DataFrame(outbox.messages, columns=["party_code", "party_name", "recipients", "bytes"])
+            outbox_view["recipients"] = outbox_view["recipients"].str.join(", ")
+            outbox_view.insert(2, "status", [delta.status(code) for code in outbox_view["party_code"]])
+            outbox_view.columns = ["Party Code", "Party Name", "Status", "Recipients", "Bytes"]
+            outbox_page = show_paginated(outbox_view, "outbox")
+            preview_party = st.selectbox("Preview statement", [""] + outbox_page["Party Code"].tolist(), key="outbox_preview")
+            if preview_party:
+                preview = next(m for m in outbox.messages if m['party_code'] == preview_party)
+                spooled = message_from_bytes(outbox.read(preview))
+                st.caption(f"Subject: {spooled['Subject']} · To: {spooled['To']}" + (f" · CC: {spooled['Cc']}" if spooled['Cc'] else ""))
+                html_part = next(part for part in spooled.walk() if part.get_content_type() == "text/html")
+                components.html(html_part.get_payload(decode=True).decode(html_part.get_content_charset() or "utf-8"),
+                                height=400, scrolling=True)
+        else:
+            st.caption("Statements are rendered when the outbox is built, or when sending starts.")
+
         # ------------- SMTP FIXED EMAIL LOOP ------------
         if st.button("Send Emails"):
             log_lines = []
@@ -806,30 +597,142 @@ if uploaded_file:
             failed_count = 0
             skips = []
             log_lines.append("=== Emails Sent Successfully ===")
-            for entry in matched_results:
-                party_code = entry['party_code']  # This is actually PartyName since we match by name
-                party_name = next((e['PartyName'] for e in party_emails if e['PartyName'] == party_code), party_code if party_code else 'Unknown Party')
-                cc_str = next((e.get('CC', '') for e in party_emails if e['PartyName'] == party_code), '')
-                cc_emails = [email.strip() for email in cc_str.split(',')] if cc_str else []
-                invoice_list = list({item['InvoiceNo'] for item in entry['payments'] + entry['debits'] if 'InvoiceNo' in item})
-                html_body = generate_email_body(party_code, entry['payments'], entry['debits'])
-                try:
-                    send_email(
-                        gmail_user,
-                        gmail_pwd,
-                        entry['emails'],
-                        f"Payment Reconciliation for {party_code} - {party_name}",
-                        html_body,
-                        cc=cc_emails
-                    )
-                    st.success(f"✅ Email sent to {party_name} ({party_code})")
-                    log_lines.append(f"Party Code: {party_code} | Party Name: {party_name} | Emails: {', '.join(entry['emails'])} | CC: {', '.join(cc_emails)}")
-                    sent_count += 1
-                except Exception as e:
-                    st.error(f"❌ Failed for {party_code}: {e}")
-                    log_lines.append(f"FAILED: {party_code} | Error: {e}")
-                    failed_count += 1
-                time.sleep(random.uniform(1, 5))  # Random delay to avoid SMTP connection refused errors
+            # Each attempt is journalled before and after SMTP under its message key; statements
+            # delivered in an earlier (interrupted) run are skipped, failed or in-flight ones are retried
+            journal = get_send_journal()
+            run_id = journal.start_run(source=source_label)
+            already_sent = []
+            deferred = []
+
+            # Stage timings for this run; with PAYMENT_MAIL_PROFILE set the run is also profiled into TRACE_DIR
+            send_trace = Trace(f"send {run_id}", enabled=TRACE_ENABLED)
+            with send_trace.profile(TRACE_DIR / run_id):
+                # Reuses the outbox built above, or builds it now
+                st.session_state.outbox_key = outbox_key
+                outbox = get_outbox(send_trace)
+                send_run = ResumableRun(journal, run_id, [message['key'] for message in outbox.messages], resume=resume_run)
+                todo = []
+                for message in outbox.messages:
+                    if send_run.is_delivered(message['key']):
+                        send_run.skip(message['key'], message['party_code'], message['party_name'], message['recipients'])
+                        already_sent.append(message['sent_line'])
+                    else:
+                        todo.append(message)
+
+                # Each account takes what fits its remaining daily quota; what none has room for is deferred
+                scheduler = QuotaScheduler(sending_accounts, journal, run_id, trace=send_trace)
+                if bulk_mode:
+                    # Bulk mode sends from the main account only, so only its quota is allotted
+                    todo, over_quota = scheduler.allot(gmail_user, [(message['recipients'], message) for message in todo])
+                    for message, error in over_quota:
+                        send_run.defer(message['key'], message['party_code'], message['party_name'],
+                                       message['recipients'], str(error))
+                        deferred.append(f"DEFERRED: {message['party_code']} | {error}")
+                    payloads = {}
+                    failures = []
+                    progress = st.progress(0.0)
+                    throughput = st.empty()
+
+                    def read_spooled(message):
+                        payloads[message['key']] = data = outbox.read(message)
+                        return gmail_user, message['recipients'], data
+
+                    def on_send(message):
+                        with send_trace.span("journal.begin"):
+                            send_run.begin([(message['key'], message['party_code'], message['party_name'],
+                                             message['recipients'], payloads[message['key']])])
+
+                    def show_progress(done, total, elapsed):
+                        progress.progress(done / total)
+                        throughput.text(f"{done}/{total} processed · {done / elapsed:.1f} msg/s · {len(failures)} failed")
+
+                    def on_result(message, error, done, total, elapsed, latency):
+                        party_code = message['party_code']
+                        data = payloads.pop(message['key'], None)
+                        if is_quota_rejection(error):
+                            # Journalled like the scheduler's refusals, so the next run treats the account as used up
+                            journal.append(run_id, "QUOTA", recipients=message['recipients'], latency=latency,
+                                           error=error, message=data, account=gmail_user, durable=True)
+                        if is_quota_rejection(error) or isinstance(error, QuotaExhausted):
+                            send_run.defer(message['key'], party_code, message['party_name'], message['recipients'],
+                                           str(error))
+                            deferred.append(f"DEFERRED: {party_code} | {error}")
+                        else:
+                            if data is not None:
+                                with send_trace.span("journal.finish"):
+                                    send_run.finish(message['key'], party_code, message['party_name'],
+                                                    message['recipients'], error, latency, data, account=gmail_user)
+                            if error is None:
+                                log_lines.append(message['sent_line'])
+                            else:
+                                failures.append(f"FAILED: {party_code} | Error: {error}")
+                        show_progress(done, total, elapsed)
+
+                    new_sent, failed_count = asyncio.run(bulk_send(
+                        todo,
+                        read_spooled,
+                        lambda: open_connection(gmail_user, gmail_pwd, trace=send_trace),
+                        concurrency=int(smtp_pool_size),
+                        rate=smtp_rate,
+                        on_result=on_result,
+                        on_send=on_send,
+                        on_skip=lambda message, *counts: show_progress(*counts),
+                    ))
+                    sent_count += new_sent
+                    progress.progress(1.0)
+                    log_lines.extend(failures)
+                    if failures:
+                        with st.expander(f"❌ {len(failures)} failed"):
+                            st.text("\n".join(failures))
+                else:
+                    payloads = {message['key']: outbox.read(message) for message in todo}
+                    # PENDING for the whole batch in one commit before the first SMTP transaction
+                    with send_trace.span("journal.begin", statements=len(todo)):
+                        send_run.begin([(message['key'], message['party_code'], message['party_name'],
+                                         message['recipients'], payloads[message['key']]) for message in todo])
+                    # One pool of logged-in connections per account, throttled by its token buckets
+                    send_jobs = ((gmail_user, message['recipients'], payloads[message['key']], message) for message in todo)
+                    for message, account, error, latency in scheduler.imap(send_jobs, timed=True):
+                        party_code, party_name = message['party_code'], message['party_name']
+                        if isinstance(error, QuotaExhausted):
+                            send_run.defer(message['key'], party_code, party_name, message['recipients'], str(error))
+                            payloads.pop(message['key'])
+                            deferred.append(f"DEFERRED: {party_code} | {error}")
+                            continue
+                        with send_trace.span("journal.finish"):
+                            send_run.finish(message['key'], party_code, party_name, message['recipients'], error,
+                                            latency, payloads.pop(message['key']), account=account)
+                        if error is None:
+                            with send_trace.span("streamlit.status"):
+                                st.success(f"✅ Email sent to {party_name} ({party_code}) from {account}")
+                            log_lines.append(message['sent_line'])
+                            sent_count += 1
+                        else:
+                            with send_trace.span("streamlit.status"):
+                                st.error(f"❌ Failed for {party_code}: {error}")
+                            log_lines.append(f"FAILED: {party_code} | Error: {error}")
+                            failed_count += 1
+                if deferred:
+                    when = scheduler.next_window()
+                    st.warning(f"⏳ {len(deferred)} statements deferred: the daily sending quota is used up"
+                               + (f" until {when:%Y-%m-%d %H:%M} UTC" if when else "")
+                               + ". Send again then; delivered statements are skipped.")
+                journal.append_skips(run_id, skips)
+                journal.flush()
+            send_trace.count("emails_sent", sent_count)
+            send_trace.count("emails_failed", failed_count)
+            if send_trace.enabled:
+                send_trace.write_json(TRACE_DIR / f"{run_id}.json")
+                st.session_state.last_send_trace = send_trace.to_dict()
+            if deferred:
+                log_lines.append("\n=== Deferred (sending quota used up) ===")
+                log_lines.extend(deferred)
+            if already_sent:
+                # Delivered by an earlier run; listed so the log still covers every party
+                log_lines.append("\n=== Already Sent (earlier run) ===")
+                log_lines.extend(already_sent)
+            if send_run.in_doubt:
+                st.info(f"{len(send_run.in_doubt)} statements were in flight when an earlier run stopped; they were sent again")
             log_lines.append("\n=== Skipped Parties ===")
             if skips:
                 for line in skips:
@@ -839,31 +742,45 @@ if uploaded_file:
             with open("FinalEmailLog.txt", "w", encoding="utf-8") as log_file:
                 for line in log_lines:
                     log_file.write(line + "\n")
-            st.success(f"✅ Emails sent: {sent_count}, Failed: {failed_count}, Skipped: {len(skips)}")
+            st.success(f"✅ Emails sent: {sent_count}, Failed: {failed_count}, Already sent: {len(already_sent)}, "
+                       f"Deferred: {len(deferred)}, Skipped: {len(skips)}")
         # ----------- END SMTP SENDING LOOP ------------
 
         st.subheader("📂 Download All Party-wise Sheets in One Excel File")
         if 'matched_results' in locals() and matched_results:
-            partywise_output = BytesIO()
-            with pd.ExcelWriter(partywise_output, engine='xlsxwriter') as writer:
-                for party in matched_results:
-                    party_code = party['party_code']
-                    df = pd.DataFrame(party['payments'])
-                    df_debit = pd.DataFrame(party['debits'])
-                    sheet_name_payment = f"{party_code[:28]}_Pay"
-                    sheet_name_debit = f"{party_code[:28]}_Debit"
-                    df.to_excel(writer, index=False, sheet_name=sheet_name_payment)
-                    if not df_debit.empty:
-                        df_debit.to_excel(writer, index=False, sheet_name=sheet_name_debit)
-            partywise_output.seek(0)
+            export_key = (upload_digest, party_directory.digest)
+
+            def export_path(kind, write):
+                # Written once per upload + directory; the cache only holds the path on disk
+                def build():
+                    EXPORT_DIR.mkdir(exist_ok=True)
+                    path = EXPORT_DIR / f"{kind}_{upload_digest[:16]}_{party_directory.digest[:16]}"
+                    return write(path, party_frames(matched_results))
+                path = traced_compute(kind, (kind,) + export_key, build)
+                return path if path.exists() else build()
+
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            filename = f"All_Partywise_Payments_{timestamp}.xlsx"
-            st.download_button(
-                label="📥 Download All Party-wise Payments (Excel)",
-                data=partywise_output,
-                file_name=filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            partywise_path = export_path("partywise_xlsx", lambda path, parties: write_partywise_workbook(
+                path.with_suffix(".xlsx"), parties))
+            with open(partywise_path, "rb") as partywise_file:
+                st.download_button(
+                    label="📥 Download All Party-wise Payments (Excel)",
+                    data=partywise_file,
+                    file_name=f"All_Partywise_Payments_{timestamp}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+            if st.button("Build Party-wise Workbooks (ZIP)"):
+                st.session_state.partywise_zip_key = export_key
+            if st.session_state.get("partywise_zip_key") == export_key:
+                zip_path = export_path("partywise_zip", lambda path, parties: write_partywise_zip(
+                    path.with_suffix(".zip"), parties))
+                with open(zip_path, "rb") as zip_file:
+                    st.download_button(
+                        label="📥 Download Party-wise Workbooks (ZIP)",
+                        data=zip_file,
+                        file_name=f"Partywise_Payments_{timestamp}.zip",
+                        mime="application/zip"
+                    )
         with open("FinalEmailLog.txt", "rb") as log_file:
             st.download_button(
                 label="📄 Download Final Email Log",
@@ -871,57 +788,72 @@ if uploaded_file:
                 file_name="FinalEmailLog.txt",
                 mime="text/plain"
             )
-st.subheader("📊 Convert Final Email Log to Excel")
-if os.path.exists("FinalEmailLog.txt"):
-    with open("FinalEmailLog.txt", "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    output = BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    worksheet = workbook.add_worksheet("Email Log")
-    headers = ["Status", "Party Code", "Party Name", "Emails / Error"]
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header)
-    row_num = 1
-    for line in lines:
-        line = line.strip()
-        if line.startswith("Party Code:"):
-            parts = line.replace("Party Code:", "").split("|")
-            party_code = parts[0].strip()
-            party_name = parts[1].replace("Party Name:", "").strip() if len(parts) > 1 else ""
-            emails = parts[2].replace("Emails:", "").strip() if len(parts) > 2 else ""
-            worksheet.write_row(row_num, 0, ["SENT", party_code, party_name, emails])
-            row_num += 1
-        elif line.startswith("FAILED:"):
-            parts = line.replace("FAILED:", "").split("|")
-            party_code = parts[0].strip()
-            error = parts[1].replace("Error:", "").strip() if len(parts) > 1 else ""
-            worksheet.write_row(row_num, 0, ["FAILED", party_code, "", error])
-            row_num += 1
-        elif line.startswith("SKIPPED:"):
-            worksheet.write_row(row_num, 0, ["SKIPPED", "", "", line])
-            row_num += 1
-    workbook.close()
-    output.seek(0)
+st.subheader("📊 Email Log Report")
+journal_report = get_journal_report()
+journal_report.refresh()
+if journal_report.last_id:
+    runs = journal_report.journal.runs()
+    run_labels = {"All runs": None}
+    for run in runs.itertuples(index=False):
+        mode = "dry run" if run.dry_run else f"{run.sent} sent, {run.failed} failed"
+        run_labels[f"{run.started_at[:19].replace('T', ' ')} UTC · {run.source} · {mode}"] = run.run_id
+    col_run, col_since, col_until = st.columns([2, 1, 1])
+    report_run = run_labels[col_run.selectbox("Run", list(run_labels), index=1 if len(run_labels) > 1 else 0)]
+    report_since = col_since.date_input("From", value=None)
+    report_until = col_until.date_input("To (inclusive)", value=None)
+    report_until_exclusive = report_until + pd.Timedelta(days=1) if report_until else None
+    records = journal_report.select(run_id=report_run, since=report_since, until=report_until_exclusive)
+    st.write(records["status"].value_counts().rename("Records"))
+    # Built from the structured records and cached until new rows are appended
+    report_key = ("journal_report", report_run, str(report_since), str(report_until), journal_report.last_id)
+
+    def build_report():
+        EXPORT_DIR.mkdir(exist_ok=True)
+        return write_report(EXPORT_DIR / f"email_log_{content_digest(repr(report_key).encode())[:16]}.xlsx", records)
+
+    report_path = get_ingest_cache().get_or_compute(report_key, build_report)
+    if not report_path.exists():
+        report_path = build_report()
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"FinalEmailLog_{timestamp}.xlsx"
-    st.download_button(
-        label="📥 Download Log as Excel",
-        data=output,
-        file_name=filename,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    col_xlsx, col_csv = st.columns(2)
+    with open(report_path, "rb") as report_file:
+        col_xlsx.download_button(
+            label="📥 Download Log as Excel",
+            data=report_file,
+            file_name=f"FinalEmailLog_{timestamp}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+    col_csv.download_button(
+        label="📥 Download Log as CSV",
+        data=report_frame(records).to_csv(index=False),
+        file_name=f"FinalEmailLog_{timestamp}.csv",
+        mime="text/csv"
     )
+else:
+    st.info("No sends journalled yet.")
 
-def create_partywise_zip(send_data):
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for party in send_data:
-            party_code = str(party['party_code']).strip()
-            df = pd.DataFrame(party['payments'])
-            excel_buffer = BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name="Payments")
-                writer.save()
-            excel_buffer.seek(0)
-            zip_file.writestr(f"{party_code}.xlsx", excel_buffer.read())
-    zip_buffer.seek(0)
-    return zip_buffer
+with st.expander("⏱️ Performance", expanded=False):
+    if not TRACE_ENABLED:
+        st.info("Tracing is off (PAYMENT_MAIL_TRACE=0).")
+    else:
+        rerun = rerun_trace.to_dict()
+        st.write(f"This rerun: {rerun['wall_seconds']:.2f}s")
+        show_trace(rerun)
+        st.download_button(
+            label="📥 Download Rerun Trace (JSON)",
+            data=json.dumps(rerun, indent=1, default=str),
+            file_name=f"trace_{rerun['trace_id']}.json",
+            mime="application/json"
+        )
+        last_send = st.session_state.get("last_send_trace")
+        if last_send:
+            st.write(f"Last send run ({last_send['name']}): {last_send['wall_seconds']:.2f}s")
+            show_trace(last_send)
+            if last_send["profile"]:
+                st.caption(f"Profile saved to {last_send['profile']}")
+            st.download_button(
+                label="📥 Download Send Trace (JSON)",
+                data=json.dumps(last_send, indent=1, default=str),
+                file_name=f"trace_{last_send['trace_id']}.json",
+                mime="application/json"
+            )
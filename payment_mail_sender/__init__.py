@@ -0,0 +1,5 @@
+"""Core (non-UI) building blocks for the Payment Mail Sender dashboard.
+
+Keep this module free of heavy imports: ``mail.py`` and the benchmarks pull
+individual submodules in as they need them.
+"""
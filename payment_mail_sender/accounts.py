@@ -0,0 +1,297 @@
+"""Several sending accounts behind one send loop, each within its own daily quota.
+
+Gmail caps the messages and recipients one account may send in a rolling 24
+hours. ``QuotaScheduler`` spreads a run over a pool of ``SendingAccount``s:
+every account sends on its own ``SMTPPool`` (its own connections and rate
+limits) and takes the next message that still fits its remaining quota, so
+faster accounts take more of the run. Usage comes from the SENT records the
+send journal holds per account, and a server's quota refusal is journalled
+too, so consumption carries across runs; messages no account has room for
+are deferred to a later run.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from .journal import smtp_reply
+from .trace import NULL_TRACE
+from .transport import SMTPPool
+
+# Gmail's limits for a personal account (Google Workspace allows 2000 messages and 10000 recipients)
+GMAIL_DAILY_MESSAGES = 500
+GMAIL_DAILY_RECIPIENTS = 500
+QUOTA_WINDOW = timedelta(days=1)
+_QUOTA_MARKERS = ("5.4.5", "quota", "sending limit")
+
+
+class QuotaExhausted(Exception):
+    """No sending account has quota left for a message; it is deferred to a later run."""
+
+
+def is_quota_rejection(error):
+    """Whether a send was refused because the account's sending quota is used up (Gmail: 550 5.4.5)."""
+    if error is None or isinstance(error, QuotaExhausted):
+        return False
+    code, reply = smtp_reply(error)
+    text = (reply or "").lower()
+    return code is not None and code >= 400 and any(marker in text for marker in _QUOTA_MARKERS)
+
+
+def with_sender(message, from_addr, reply_to=None):
+    """Spooled message bytes with the From header set to ``from_addr`` (and Reply-To to ``reply_to``)."""
+    head, sep, body = message.partition(b"\r\n\r\n")
+    lines = []
+    dropping = False
+    for line in head.split(b"\r\n"):
+        # Folded continuation lines go with the header above them
+        if line[:1] not in (b" ", b"\t"):
+            name = line.split(b":", 1)[0].strip().lower()
+            dropping = name == b"from" or (reply_to is not None and name == b"reply-to")
+        if not dropping:
+            lines.append(line)
+    headers = [b"From: " + from_addr.encode("utf-8")] + ([b"Reply-To: " + reply_to.encode("utf-8")] if reply_to else [])
+    return b"\r\n".join(headers + lines) + sep + body
+
+
+class SendingAccount:
+    """One sender login with its daily quota (``None``: unlimited) and ``SMTPPool`` settings."""
+
+    def __init__(self, user, password, daily_messages=GMAIL_DAILY_MESSAGES, daily_recipients=GMAIL_DAILY_RECIPIENTS,
+                 pool_size=1, rate=None, per_connection_rate=None, host="smtp.gmail.com", port=465, use_ssl=True):
+        self.user = user
+        self.password = password
+        self.daily_messages = daily_messages
+        self.daily_recipients = daily_recipients
+        self.pool_size = pool_size
+        self.rate = rate
+        self.per_connection_rate = per_connection_rate
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+
+    def open_pool(self, trace=NULL_TRACE):
+        return SMTPPool(self.user, self.password, host=self.host, port=self.port, size=self.pool_size,
+                        use_ssl=self.use_ssl, rate=self.rate, per_connection_rate=self.per_connection_rate, trace=trace)
+
+    def __repr__(self):
+        return f"SendingAccount({self.user!r}, daily_messages={self.daily_messages}, daily_recipients={self.daily_recipients})"
+
+
+_ACCOUNT_FIELDS = ("daily_messages", "daily_recipients", "pool_size", "rate", "per_connection_rate", "host", "port",
+                   "use_ssl")
+
+
+def load_accounts(path, environ=os.environ):
+    """``SendingAccount``s from a JSON list of ``{"user", "password_env" (or "password"), ...}`` objects.
+
+    The other keys are ``SendingAccount`` arguments; ``password_env`` names
+    the environment variable holding the app password, so the file itself
+    can be kept without secrets.
+    """
+    with open(path, encoding="utf-8") as f:
+        items = json.load(f)
+    accounts = []
+    for i, item in enumerate(items):
+        user = item.get("user")
+        password = environ.get(item["password_env"]) if item.get("password_env") else item.get("password")
+        if not user or not password:
+            missing = "user" if not user else (f"${item['password_env']}" if item.get("password_env") else "password")
+            raise ValueError(f"{path}: account {i + 1} has no {missing}")
+        accounts.append(SendingAccount(user, password, **{key: item[key] for key in _ACCOUNT_FIELDS if key in item}))
+    return accounts
+
+
+def _remaining(limit, used):
+    return None if limit is None else max(limit - used, 0)
+
+
+class AccountQuota:
+    """What an account may still send in the current window; reserved per message while sending."""
+
+    def __init__(self, account, messages_used=0, recipients_used=0):
+        self.account = account
+        self.messages_used = messages_used
+        self.recipients_used = recipients_used
+        self.messages = _remaining(account.daily_messages, messages_used)
+        self.recipients = _remaining(account.daily_recipients, recipients_used)
+        self.resets_at = None
+        self.exhausted = False
+
+    def fits(self, recipients):
+        return (not self.exhausted and (self.messages is None or self.messages >= 1)
+                and (self.recipients is None or self.recipients >= recipients))
+
+    def reserve(self, recipients):
+        if not self.fits(recipients):
+            return False
+        if self.messages is not None:
+            self.messages -= 1
+        if self.recipients is not None:
+            self.recipients -= recipients
+        return True
+
+    def release(self, recipients):
+        if self.messages is not None:
+            self.messages += 1
+        if self.recipients is not None:
+            self.recipients += recipients
+
+    def exhaust(self, resets_at):
+        self.exhausted = True
+        self.resets_at = resets_at
+
+
+class QuotaScheduler:
+    """Sends through a pool of ``SendingAccount``s without exceeding any account's quota.
+
+    An account's remaining quota is its daily limit minus the SENT records
+    ``journal`` holds for it in the last ``window``. An account the server
+    refused for quota (a QUOTA record, written under ``run_id``) counts as
+    exhausted for a whole window after the refusal, since its usage outside
+    this journal is unknown.
+    """
+
+    def __init__(self, accounts, journal, run_id, window=QUOTA_WINDOW, now=None, trace=NULL_TRACE):
+        if not accounts:
+            raise ValueError("at least one sending account is required")
+        users = [account.user for account in accounts]
+        if len(set(users)) != len(users):
+            raise ValueError("each sending account may only be listed once")
+        self.journal = journal
+        self.run_id = run_id
+        self.window = window
+        self.trace = trace
+        now = now or datetime.now(timezone.utc)
+        usage = journal.account_usage(now - window)
+        self.quotas = []
+        for account in accounts:
+            messages, recipients, first_sent, last_rejected = usage.get(account.user, (0, 0, None, None))
+            quota = AccountQuota(account, messages, recipients)
+            if last_rejected is not None:
+                quota.exhaust(datetime.fromisoformat(last_rejected) + window)
+            elif first_sent is not None and not quota.fits(1):
+                # The oldest send in the window ages out first
+                quota.resets_at = datetime.fromisoformat(first_sent) + window
+            self.quotas.append(quota)
+
+    def capacity(self):
+        """One row per account: messages and recipients left (None: unlimited) and when a used-up one frees up."""
+        return [{"Account": quota.account.user, "Messages Sent": quota.messages_used,
+                 "Messages Left": 0 if quota.exhausted else quota.messages,
+                 "Recipients Left": 0 if quota.exhausted else quota.recipients,
+                 "Available Again": quota.resets_at} for quota in self.quotas]
+
+    def next_window(self):
+        """When the earliest used-up account frees up (None if none has a known reset)."""
+        times = [quota.resets_at for quota in self.quotas if quota.resets_at is not None]
+        return min(times) if times else None
+
+    def allot(self, user, jobs):
+        """Reserve ``user``'s remaining quota for ``(recipients, tag)`` jobs in order.
+
+        For sends that bypass ``imap`` (bulk mode's single account). Returns
+        ``(fits, deferred)``: the tags the quota covers, and ``(tag, error)``
+        pairs with a ``QuotaExhausted`` error for the rest.
+        """
+        quota = next(quota for quota in self.quotas if quota.account.user == user)
+        fits, deferred = [], []
+        for recipients, tag in jobs:
+            if quota.reserve(len(recipients)):
+                fits.append(tag)
+            else:
+                deferred.append((tag, self._exhausted(recipients, quota.resets_at)))
+        return fits, deferred
+
+    def _exhausted(self, recipients, next_window):
+        self.trace.count("messages_deferred")
+        return QuotaExhausted(f"no sending account has quota left for {len(recipients)} recipient(s)"
+                              + (f"; capacity frees up from {next_window:%Y-%m-%d %H:%M} UTC" if next_window else ""))
+
+    def imap(self, jobs, timed=False):
+        """Send ``(from_addr, recipients, message, tag)`` jobs on every account at once.
+
+        ``message`` is spooled bytes; an account other than ``from_addr``
+        sends it under its own From header, with ``from_addr`` as Reply-To.
+        Yields ``(tag, account, error)`` in completion order, ``account``
+        being the user that sent it (``(tag, account, error, seconds)`` with
+        ``timed=True``). A message an account's server refuses for quota goes
+        back to the queue for the other accounts; the jobs no account has room
+        for come last, with ``account=None`` and a ``QuotaExhausted`` error.
+        """
+        pending = list(jobs)
+        done = queue.Queue()
+        cond = threading.Condition()
+        state = {"in_flight": 0}
+
+        def next_job(quota):
+            # Called with ``cond`` held: the first pending job that fits, None once none ever will
+            while not quota.exhausted:
+                for i, job in enumerate(pending):
+                    if quota.reserve(len(job[1])):
+                        state["in_flight"] += 1
+                        return pending.pop(i)
+                if not state["in_flight"]:
+                    return None
+                # An in-flight job may come back refused by another account's server
+                cond.wait()
+            return None
+
+        def worker(quota, pool):
+            sender = quota.account.user
+            while True:
+                with cond:
+                    job = next_job(quota)
+                if job is None:
+                    return
+                from_addr, recipients, message, tag = job
+                data = message if from_addr == sender else with_sender(message, sender, reply_to=from_addr)
+                start = time.perf_counter()
+                try:
+                    pool.send(sender, recipients, data)
+                    error = None
+                except Exception as e:
+                    error = e
+                seconds = time.perf_counter() - start
+                rejected = is_quota_rejection(error)
+                with cond:
+                    state["in_flight"] -= 1
+                    if rejected:
+                        quota.exhaust(datetime.now(timezone.utc) + self.window)
+                        pending.insert(0, job)
+                    elif error is not None:
+                        quota.release(len(recipients))
+                    cond.notify_all()
+                if rejected:
+                    self.trace.count("quota_rejections")
+                    self.journal.append(self.run_id, "QUOTA", recipients=recipients, latency=seconds, error=error,
+                                        message=data, account=sender, durable=True)
+                    continue
+                done.put((tag, sender, error, seconds) if timed else (tag, sender, error))
+
+        pools = [quota.account.open_pool(self.trace) for quota in self.quotas]
+        threads = [threading.Thread(target=worker, args=(quota, pool), daemon=True)
+                   for quota, pool in zip(self.quotas, pools) for _ in range(min(pool.size, len(pending)))]
+
+        def finished():
+            for t in threads:
+                t.join()
+            done.put(None)
+
+        try:
+            for t in threads + [threading.Thread(target=finished, daemon=True)]:
+                t.start()
+            while True:
+                result = done.get()
+                if result is None:
+                    break
+                yield result
+        finally:
+            for pool in pools:
+                pool.close()
+        next_window = self.next_window()
+        for _, recipients, _, tag in pending:
+            error = self._exhausted(recipients, next_window)
+            yield (tag, None, error, 0.0) if timed else (tag, None, error)
@@ -0,0 +1,173 @@
+"""Asyncio bulk-send mode: a render stage feeding N concurrent SMTP senders.
+
+``aiosmtplib`` is used when installed; otherwise each sender drives a blocking
+``smtplib`` connection from a worker thread so the mode still works.
+"""
+import asyncio
+import time
+
+from .accounts import QuotaExhausted, is_quota_rejection
+from .trace import NULL_TRACE
+from .transport import SMTPPool, TokenBucket
+
+try:
+    import aiosmtplib
+except ImportError:  # optional dependency
+    aiosmtplib = None
+
+
+class _AioConnection:
+    def __init__(self, user, password, host, port, use_ssl, timeout, trace):
+        self._args = dict(hostname=host, port=port, use_tls=use_ssl, timeout=timeout)
+        self._auth = (user, password)
+        self._client = None
+        self._trace = trace
+
+    async def _connect(self):
+        self._client = aiosmtplib.SMTP(**self._args)
+        with self._trace.span("smtp.connect"):
+            await self._client.connect()
+        if self._auth[0] and self._auth[1]:
+            with self._trace.span("smtp.login"):
+                await self._client.login(*self._auth)
+
+    async def send(self, from_addr, recipients, message):
+        for attempt in range(2):
+            if self._client is None:
+                await self._connect()
+            try:
+                with self._trace.span("smtp.send") as span:
+                    result = await self._client.sendmail(from_addr, recipients, message)
+                    span.add("bytes_sent", len(message))
+                return result
+            except aiosmtplib.SMTPServerDisconnected:
+                self._client = None
+                if attempt:
+                    raise
+                self._trace.count("smtp_retries")
+
+    async def close(self):
+        if self._client is not None:
+            try:
+                await self._client.quit()
+            except aiosmtplib.SMTPException:
+                pass
+            self._client = None
+
+
+class _ThreadedConnection:
+    def __init__(self, user, password, host, port, use_ssl, timeout, trace):
+        self._pool = SMTPPool(user, password, host=host, port=port, size=1, use_ssl=use_ssl, timeout=timeout,
+                              trace=trace)
+
+    async def send(self, from_addr, recipients, message):
+        return await asyncio.to_thread(self._pool.send, from_addr, recipients, message)
+
+    async def close(self):
+        await asyncio.to_thread(self._pool.close)
+
+
+def open_connection(user, password, host="smtp.gmail.com", port=465, use_ssl=True, timeout=30, trace=NULL_TRACE):
+    factory = _AioConnection if aiosmtplib is not None else _ThreadedConnection
+    return factory(user, password, host, port, use_ssl, timeout, trace)
+
+
+async def bulk_send(entries, render, connect, concurrency=4, rate=None, on_result=None, skip=(), on_send=None,
+                    on_skip=None):
+    """Render ``entries`` ahead of time and send them on ``concurrency`` connections.
+
+    ``render(entry)`` returns ``(from_addr, recipients, message)``, or ``None``
+    to leave the entry out, and runs in a worker thread; ``connect()`` returns
+    a connection from ``open_connection``. ``on_send(entry)`` is called on the
+    event loop thread right before the entry's SMTP transaction.
+    ``on_result(entry, error, done, total, elapsed, latency)`` is called on
+    the event loop thread after every message, ``latency`` being the SMTP
+    transaction's seconds (``None`` if it never started);
+    ``on_skip(entry, done, total, elapsed)`` is called instead for entries
+    ``render`` left out, so ``done`` still reaches ``total``. Entries whose
+    ``party_code`` is in ``skip`` are not rendered or sent.
+
+    Once the server refuses a send for quota (``is_quota_rejection``), that
+    entry is reported with the refusal and every entry after it with a
+    ``QuotaExhausted`` error, without sending; neither counts as failed.
+    If a sender raises (``connect()`` itself, say), the other tasks are
+    cancelled and the error propagates. Returns ``(sent, failed)``.
+    """
+    todo = [entry for entry in entries if entry['party_code'] not in skip]
+    total = len(todo)
+    workers = max(1, min(concurrency, total))
+    bucket = TokenBucket(rate)
+    rendered = asyncio.Queue(maxsize=workers * 2)
+    counts = {"sent": 0, "failed": 0, "skipped": 0, "deferred": 0}
+    state = {"refused": None}
+    started = time.perf_counter()
+
+    async def produce():
+        for entry in todo:
+            try:
+                job = await asyncio.to_thread(render, entry)
+            except Exception as e:
+                job = e
+            await rendered.put((entry, job))
+        for _ in range(workers):
+            await rendered.put(None)
+
+    def done():
+        return sum(counts.values())
+
+    async def report(entry, error, latency=None):
+        if error is None:
+            counts["sent"] += 1
+        elif isinstance(error, QuotaExhausted) or is_quota_rejection(error):
+            counts["deferred"] += 1
+        else:
+            counts["failed"] += 1
+        if on_result is not None:
+            on_result(entry, error, done(), total, time.perf_counter() - started, latency)
+
+    async def send_loop():
+        conn = connect()
+        try:
+            while True:
+                item = await rendered.get()
+                if item is None:
+                    return
+                entry, job = item
+                if job is None:
+                    counts["skipped"] += 1
+                    if on_skip is not None:
+                        on_skip(entry, done(), total, time.perf_counter() - started)
+                    continue
+                if isinstance(job, Exception):
+                    await report(entry, job)
+                    continue
+                if state["refused"] is not None:
+                    # The account's quota is used up: sending the rest would only be refused too
+                    await report(entry, QuotaExhausted(f"sending quota used up ({state['refused']})"))
+                    continue
+                if on_send is not None:
+                    on_send(entry)
+                await asyncio.sleep(bucket.reserve())
+                sent_at = time.perf_counter()
+                try:
+                    await conn.send(*job)
+                    error = None
+                except Exception as e:
+                    error = e
+                if is_quota_rejection(error) and state["refused"] is None:
+                    state["refused"] = error
+                await report(entry, error, time.perf_counter() - sent_at)
+        finally:
+            await conn.close()
+
+    if total:
+        tasks = [asyncio.ensure_future(produce())] + [asyncio.ensure_future(send_loop()) for _ in range(workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed sender would leave produce() blocked on the full queue
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    return counts["sent"], counts["failed"]
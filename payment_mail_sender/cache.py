@@ -0,0 +1,93 @@
+"""Content-addressed LRU cache for parsed uploads and match results."""
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def party_emails_digest(party_emails) -> str:
+    # Stable fingerprint of the email directory so edits invalidate cached matches
+    return content_digest(json.dumps(party_emails, sort_keys=True, default=str).encode())
+
+
+def approx_size(value, _seen=None) -> int:
+    """Approximate bytes ``value`` keeps alive, for the cache's eviction budget.
+
+    Frames count their ``memory_usage(deep=True)`` and objects reporting an
+    ``nbytes`` (a ``Ledger``, numpy arrays) count that; containers and plain
+    objects are walked, counting an object shared between them once, so the
+    party views of one ``Ledger`` add up to the ledger. Nothing is pickled.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v, seen) for v in value)
+    elif hasattr(value, "__dict__"):
+        size += approx_size(vars(value), seen)
+    elif hasattr(type(value), "__slots__"):
+        size += sum(approx_size(getattr(value, name, None), seen) for name in type(value).__slots__)
+    return size
+
+
+class IngestCache:
+    """Thread-safe LRU keyed by content hashes, evicting by approximate byte size.
+
+    ``get_or_compute`` returns the cached value for ``key`` or stores the
+    result of ``compute()``. Exceptions from ``compute`` are not cached.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = compute()
+        size = approx_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
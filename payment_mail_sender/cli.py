@@ -0,0 +1,368 @@
+"""Headless batch runner for scheduled reconciliation runs (cron, CI).
+
+    python -m payment_mail_sender run --input Invoices.xlsx --dry-run
+    GMAIL_USER=me@example.com GMAIL_APP_PASSWORD=... python -m payment_mail_sender run --input Invoices.xlsx
+    GMAIL_USER=me@example.com python -m payment_mail_sender run --input Invoices.xlsx --dry-run --spool .outbox
+    GMAIL_USER=me@example.com GMAIL_APP_PASSWORD=... python -m payment_mail_sender send --spool .outbox
+    GMAIL_USER=me@example.com python -m payment_mail_sender send --spool .outbox --accounts accounts.json
+    python -m payment_mail_sender journal --since 2026-01-01 --output sends.xlsx
+
+Only the standard library is imported at module level; pandas and the rest of
+the pipeline are loaded inside the command, so ``--help`` stays instant. This
+module must never import Streamlit.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+DRY_RUN_SENDER = "dry-run@localhost"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m payment_mail_sender",
+                                     description="Payment reconciliation mailer without the dashboard.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="match a payment workbook against the party directory and send the emails")
+    run.add_argument("--input", required=True, nargs="+",
+                     help="payment workbook(s) (.xlsx); several (e.g. one per channel) are loaded in parallel and merged")
+    run.add_argument("--workers", type=int,
+                     help="processes for loading several workbooks and rendering the outbox (default: CPU count)")
+    run.add_argument("--dry-run", action="store_true",
+                     help="render every message into the outbox but do not connect to SMTP")
+    run.add_argument("--party-db", default="party_emails.db", help="party directory database (default: party_emails.db)")
+    run.add_argument("--party-json", default="party_emails.json",
+                     help="JSON imported into --party-db the first time it is created (default: party_emails.json)")
+    run.add_argument("--snapshot-dir", default=".snapshots",
+                     help="reuse/write Arrow snapshots of the parsed workbook here, like the dashboard (default: .snapshots)")
+    run.add_argument("--no-snapshots", dest="snapshot_dir", action="store_const", const=None,
+                     help="always parse the workbook")
+    run.add_argument("--chunk-rows", type=int, default=20000,
+                     help="stream the sheet this many rows at a time (default: 20000; 0 reads it in one go)")
+    run.add_argument("--violations", help="write the validation issues to this CSV file")
+    _add_send_options(run)
+
+    send = commands.add_parser("send", help="send an outbox built earlier by run (e.g. with --dry-run)")
+    _add_send_options(send)
+
+    journal = commands.add_parser("journal", help="list runs or export send records from the journal")
+    journal.add_argument("--journal", default="send_journal.db", help="journal database (default: send_journal.db)")
+    journal.add_argument("--run", dest="run_id", help="only this run")
+    journal.add_argument("--since", type=_parse_date, help="records on or after this date (YYYY-MM-DD, local time)")
+    journal.add_argument("--until", type=_parse_date, help="records before this date (YYYY-MM-DD, local time)")
+    journal.add_argument("--output", help="write the records to this .xlsx or .csv file instead of listing runs")
+    return parser
+
+
+def _add_send_options(command):
+    command.add_argument("--spool", default=".outbox",
+                         help="outbox directory: run renders every message here (.eml files + manifest.json) "
+                              "before sending, send delivers it (default: .outbox)")
+    command.add_argument("--gmail-user", default=os.environ.get("GMAIL_USER"),
+                         help="sender address (default: $GMAIL_USER); the app password is read from $GMAIL_APP_PASSWORD")
+    command.add_argument("--pool-size", type=int, default=2, help="SMTP connections (default: 2)")
+    command.add_argument("--rate", type=float, default=1.0, help="max messages per second, all connections (default: 1.0)")
+    command.add_argument("--conn-rate", type=float, default=0.5, help="max messages per second, per connection (default: 0.5)")
+    command.add_argument("--daily-messages", type=int,
+                         help="messages --gmail-user may send per 24 hours (default: 500, Gmail's personal limit)")
+    command.add_argument("--daily-recipients", type=int,
+                         help="recipients --gmail-user may send to per 24 hours (default: 500, Gmail's personal limit)")
+    command.add_argument("--accounts",
+                         help="JSON list of more sending accounts ({\"user\", \"password_env\", \"daily_messages\", "
+                              "\"daily_recipients\", \"rate\", ...}); messages are spread over them within each "
+                              "account's quota, and what none has room for is deferred to a later run")
+    command.add_argument("--log", default="FinalEmailLog.txt", help="run log file (default: FinalEmailLog.txt)")
+    command.add_argument("--journal", default="send_journal.db",
+                         help="append every send attempt to this SQLite journal (default: send_journal.db)")
+    command.add_argument("--resend", action="store_true",
+                         help="send every statement again, even those the journal shows as already delivered")
+    command.add_argument("--trace", help="write per-stage timings and counters to this JSON file; with "
+                                         "$PAYMENT_MAIL_PROFILE=cprofile|pyinstrument the profile is saved next to it")
+
+
+def _parse_date(value):
+    from datetime import date
+
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {value!r}")
+
+
+def run_command(args, out=sys.stdout):
+    gmail_pwd = os.environ.get("GMAIL_APP_PASSWORD")
+    if not args.dry_run and not (args.gmail_user and (gmail_pwd or args.accounts)):
+        print("error: set --gmail-user (or GMAIL_USER) and GMAIL_APP_PASSWORD (or --accounts), or pass --dry-run",
+              file=sys.stderr)
+        return 2
+    gmail_user = args.gmail_user or DRY_RUN_SENDER
+    accounts = None
+    if not args.dry_run:
+        accounts = _load_accounts(args, gmail_user, gmail_pwd)
+        if accounts is None:
+            return 2
+    return _traced(args, out, lambda trace: _run(args, gmail_user, accounts, trace, out))
+
+
+def send_command(args, out=sys.stdout):
+    from .outbox import Outbox
+
+    outbox = Outbox.open(args.spool)
+    if outbox is None:
+        print(f"error: no outbox at {args.spool}; build one with: run --input ... --dry-run --spool {args.spool}",
+              file=sys.stderr)
+        return 2
+    gmail_pwd = os.environ.get("GMAIL_APP_PASSWORD")
+    gmail_user = args.gmail_user or outbox.from_addr
+    if not gmail_pwd and not args.accounts:
+        print("error: set GMAIL_APP_PASSWORD (or --accounts)", file=sys.stderr)
+        return 2
+    if outbox.from_addr == DRY_RUN_SENDER:
+        print("error: the outbox was rendered without a sender; rebuild it with --gmail-user (or GMAIL_USER)",
+              file=sys.stderr)
+        return 2
+    if gmail_user != outbox.from_addr:
+        print(f"error: the outbox was rendered for {outbox.from_addr}; rebuild it to send as {gmail_user}",
+              file=sys.stderr)
+        return 2
+    args.dry_run = False
+    accounts = _load_accounts(args, gmail_user, gmail_pwd)
+    if accounts is None:
+        return 2
+    print(f"Outbox {args.spool}: {len(outbox)} messages ({outbox.total_bytes / 1024 / 1024:.1f} MB) "
+          f"built {outbox.manifest['created_at']} from {outbox.source}", file=out)
+    return _traced(args, out, lambda trace: _deliver(args, outbox, [], gmail_user, accounts, trace, out))
+
+
+def _traced(args, out, command):
+    from .trace import NULL_TRACE, PROFILE_ENV, Trace
+
+    profiling = bool(os.environ.get(PROFILE_ENV))
+    trace = Trace(args.command) if args.trace or profiling else NULL_TRACE
+    trace_path = Path(args.trace) if args.trace else Path(".traces") / f"{trace.trace_id}.json"
+    with trace.profile(trace_path.with_suffix("")):
+        status = command(trace)
+    if trace.enabled:
+        for stage in trace.stages():
+            print(f"{stage['Stage']:>20} {stage['Calls']:6d} x {stage['Mean (ms)']:9.2f}ms = {stage['Total (s)']:8.3f}s"
+                  f"  {stage['Counters']}", file=out)
+        trace.write_json(trace_path)
+        print(f"Trace written to {trace_path}" + (f", profile to {trace.profile_path}" if trace.profile_path else ""),
+              file=out)
+    return status
+
+
+def _run(args, gmail_user, accounts, trace, out):
+    # Heavy imports happen here, after argument parsing
+    from .delta import reconcile
+    from .directory import PartyStore, get_party_directory
+    from .ingest import load_excel, load_many
+    from .outbox import Outbox, build_outbox
+    from .validation import validate_frames
+
+    with trace.span("load_excel", files=len(args.input)) as span:
+        if len(args.input) == 1:
+            payment_df, debit_df = load_excel(args.input[0], snapshot_dir=args.snapshot_dir,
+                                              chunk_rows=args.chunk_rows or None)
+        else:
+            payment_df, debit_df, batch_report = load_many(args.input, workers=args.workers,
+                                                           snapshot_dir=args.snapshot_dir,
+                                                           chunk_rows=args.chunk_rows or None)
+        span.add("rows_parsed", len(payment_df) + len(debit_df))
+    if len(args.input) > 1:
+        for row in batch_report.to_dict("records"):
+            detail = row["Error"] if row["Status"] == "failed" else (
+                f"{row['Payment Rows']} payment rows, {row['Debit Rows']} debit notes, "
+                f"{row['Duplicates Dropped']} duplicate bills dropped")
+            print(f"{row['Status'].upper():7s} {row['File']} ({row['Seconds']:.2f}s): {detail}", file=out)
+    with trace.span("validate_frames") as span:
+        violations = validate_frames(payment_df, debit_df)
+        span.add("violations", len(violations))
+    for (check, severity), count in violations.groupby(["Check", "Severity"], sort=False).size().items():
+        print(f"{severity.upper():7s} {check}: {count}", file=out)
+    if args.violations:
+        violations.to_csv(args.violations, index=False)
+    with trace.span("party_directory"):
+        party_directory = get_party_directory(PartyStore(args.party_db, json_path=args.party_json))
+    # The spool's manifest holds the previous run's party fingerprints
+    previous = Outbox.open(args.spool)
+    with trace.span("match_data") as span:
+        reconciliation = reconcile(payment_df, debit_df, party_directory.entries,
+                                   fingerprints=previous.fingerprints if previous is not None else None)
+        matched_results, skips = reconciliation.matched_results, reconciliation.skips
+        span.add("parties_matched", len(matched_results))
+    print(f"{len(payment_df)} payment rows, {len(matched_results)} parties to email, "
+          f"{len(reconciliation.parties_without_email)} without email, {len(skips)} skipped", file=out)
+    if previous is not None:
+        print(f"Since the last run: {reconciliation.delta}", file=out)
+
+    # Every message is rendered and spooled before the first SMTP connection, in a process pool;
+    # unchanged parties keep the message spooled by the last run
+    with trace.span("build_outbox") as span:
+        outbox = build_outbox(args.spool, matched_results, party_directory, gmail_user, workers=args.workers,
+                              source=", ".join(args.input), fingerprints=reconciliation.fingerprints)
+        span.add("messages", len(outbox))
+        span.add("messages_reused", outbox.reused)
+        span.add("message_bytes", outbox.total_bytes)
+    print(f"Outbox {args.spool}: {len(outbox)} messages ({outbox.reused} unchanged, kept), "
+          f"{outbox.total_bytes / 1024 / 1024:.1f} MB", file=out)
+    return _deliver(args, outbox, skips, gmail_user, accounts, trace, out)
+
+
+def _sending_accounts(args, gmail_user, gmail_pwd):
+    from .accounts import GMAIL_DAILY_MESSAGES, GMAIL_DAILY_RECIPIENTS, SendingAccount, load_accounts
+
+    accounts = load_accounts(args.accounts) if args.accounts else []
+    # The --gmail-user login sends too, unless it has no password here or the accounts file lists it
+    if gmail_pwd and gmail_user not in {account.user for account in accounts}:
+        accounts.insert(0, SendingAccount(
+            gmail_user, gmail_pwd,
+            daily_messages=GMAIL_DAILY_MESSAGES if args.daily_messages is None else args.daily_messages,
+            daily_recipients=GMAIL_DAILY_RECIPIENTS if args.daily_recipients is None else args.daily_recipients,
+            pool_size=args.pool_size, rate=args.rate, per_connection_rate=args.conn_rate))
+    if not accounts:
+        raise ValueError(f"{args.accounts}: no sending accounts")
+    return accounts
+
+
+def _load_accounts(args, gmail_user, gmail_pwd):
+    # None (after printing why) when the accounts file is missing or invalid
+    try:
+        return _sending_accounts(args, gmail_user, gmail_pwd)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return None
+
+
+def _deliver(args, outbox, skips, gmail_user, accounts, trace, out):
+    from .journal import ResumableRun, SendJournal
+
+    log_lines = []
+    sent_count = 0
+    failed_count = 0
+    already_sent = []
+    deferred = []
+    # Every attempt is journalled as it happens; the text log is still written at the end
+    journal = SendJournal(args.journal)
+    run_id = journal.start_run(source=outbox.source, dry_run=args.dry_run)
+    try:
+        if args.dry_run:
+            log_lines.append("=== Dry Run: Emails Not Sent ===")
+            for message in outbox.messages:
+                print(f"DRY RUN {message['party_code']}: {len(message['recipients'])} recipients, "
+                      f"{message['bytes']} bytes", file=out)
+                journal.append(run_id, "DRY_RUN", message['party_code'], message['party_name'], message['recipients'],
+                               message=outbox.read(message), key=message['key'])
+                log_lines.append(message['sent_line'])
+        else:
+            from .accounts import QuotaExhausted, QuotaScheduler
+
+            # Statements an earlier run delivered are skipped; failed and in-flight ones are sent again
+            send_run = ResumableRun(journal, run_id, [message['key'] for message in outbox.messages],
+                                    resume=not args.resend)
+            todo = {}
+            for message in outbox.messages:
+                if send_run.is_delivered(message['key']):
+                    send_run.skip(message['key'], message['party_code'], message['party_name'], message['recipients'])
+                    already_sent.append(message['sent_line'])
+                else:
+                    todo[message['key']] = (message, outbox.read(message))
+            if already_sent:
+                print(f"Resuming: {len(already_sent)} statements already delivered, "
+                      f"{len(send_run.in_doubt)} in flight when the last run stopped", file=out)
+            with trace.span("journal.begin", statements=len(todo)):
+                send_run.begin([(key, message['party_code'], message['party_name'], message['recipients'], data)
+                                for key, (message, data) in todo.items()])
+
+            # Each account takes what fits its remaining daily quota; what none has room for is deferred
+            scheduler = QuotaScheduler(accounts, journal, run_id, trace=trace)
+            for account in scheduler.capacity():
+                left = ", ".join(f"{account[column]} {label}" for column, label in
+                                 (("Messages Left", "messages"), ("Recipients Left", "recipients"))
+                                 if account[column] is not None) or "no limit"
+                print(f"Account {account['Account']}: {left} left in the quota window", file=out)
+            log_lines.append("=== Emails Sent Successfully ===")
+            jobs = ((gmail_user, message['recipients'], data, key) for key, (message, data) in todo.items())
+            for key, account, error, latency in scheduler.imap(jobs, timed=True):
+                message, data = todo[key]
+                party_code = message['party_code']
+                if isinstance(error, QuotaExhausted):
+                    send_run.defer(key, party_code, message['party_name'], message['recipients'], str(error))
+                    deferred.append(f"DEFERRED: {party_code} | {error}")
+                    continue
+                with trace.span("journal.finish"):
+                    send_run.finish(key, party_code, message['party_name'], message['recipients'], error,
+                                    latency, data, account=account)
+                if error is None:
+                    print(f"SENT    {message['party_name']} ({party_code})", file=out)
+                    log_lines.append(message['sent_line'])
+                    sent_count += 1
+                else:
+                    print(f"FAILED  {party_code}: {error}", file=out)
+                    log_lines.append(f"FAILED: {party_code} | Error: {error}")
+                    failed_count += 1
+            if deferred:
+                when = scheduler.next_window()
+                print(f"DEFERRED {len(deferred)} statements: every account's quota is used up"
+                      + (f" until {when:%Y-%m-%d %H:%M} UTC" if when else "") + f"; run send --spool {args.spool} "
+                      "again then to deliver them", file=out)
+            trace.count("emails_sent", sent_count)
+            trace.count("emails_failed", failed_count)
+        journal.append_skips(run_id, skips)
+    finally:
+        journal.close()
+    if deferred:
+        log_lines.append("\n=== Deferred (sending quota used up) ===")
+        log_lines.extend(deferred)
+    if already_sent:
+        log_lines.append("\n=== Already Sent (earlier run) ===")
+        log_lines.extend(already_sent)
+    log_lines.append("\n=== Skipped Parties ===")
+    log_lines.extend(skips or ["None"])
+    with open(args.log, "w", encoding="utf-8") as log_file:
+        for line in log_lines:
+            log_file.write(line + "\n")
+
+    if args.dry_run:
+        print(f"Dry run: {len(outbox)} emails rendered to {args.spool}, Skipped: {len(skips)}", file=out)
+    else:
+        print(f"Emails sent: {sent_count}, Failed: {failed_count}, Already sent: {len(already_sent)}, "
+              f"Deferred: {len(deferred)}, Skipped: {len(skips)}", file=out)
+    print(f"Run {run_id} journalled to {args.journal}", file=out)
+    return 1 if failed_count else 0
+
+
+def journal_command(args, out=sys.stdout):
+    if not os.path.exists(args.journal):
+        print(f"error: no journal at {args.journal}", file=sys.stderr)
+        return 2
+    from .journal import SendJournal, write_report
+
+    with SendJournal(args.journal) as journal:
+        if args.output:
+            records = journal.records(run_id=args.run_id, since=args.since, until=args.until)
+            write_report(args.output, records)
+            print(f"{len(records)} records written to {args.output}", file=out)
+            return 0
+        runs = journal.runs(since=args.since, until=args.until)
+        if args.run_id:
+            runs = runs[runs["run_id"] == args.run_id]
+    for run in runs.itertuples(index=False):
+        if run.dry_run:
+            counts = f"dry run  rendered {run.records - run.skipped}"
+        else:
+            counts = f"sent {run.sent}  failed {run.failed}" + (f"  deferred {run.deferred}" if run.deferred else "")
+        print(f"{run.run_id}  {run.started_at}  {counts}  skipped {run.skipped}  {run.source}", file=out)
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run_command(args)
+    if args.command == "send":
+        return send_command(args)
+    if args.command == "journal":
+        return journal_command(args)
+    return 2
@@ -0,0 +1,70 @@
+"""Outgoing message assembly shared by the dashboard and the batch runner."""
+import hashlib
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pandas as pd
+
+from .ledger import PartyLedger
+from .render import render_email_body
+
+
+def build_message(gmail_user, to_emails, subject, html_body, cc=None):
+    msg = MIMEMultipart('alternative')
+    msg['From'] = gmail_user
+    msg['To'] = ", ".join(to_emails)
+    if cc:
+        msg['Cc'] = ", ".join(cc)
+    msg['Subject'] = subject
+    msg.attach(MIMEText(html_body, 'html'))
+    # Content-derived instead of random, so re-rendering the same statement gives the same bytes (and message_key)
+    digest = hashlib.sha256("\0".join([msg['To'], msg['Cc'] or "", subject, html_body]).encode("utf-8")).hexdigest()
+    msg.set_boundary(f"==============={int(digest[:16], 16):019d}==")
+    recipients = to_emails + (cc if cc else [])
+    return recipients, msg.as_string()
+
+
+def statement_period(payment_rows):
+    """``"<first>..<last>"`` payment date of a party's rows (as text), part of its message key."""
+    if isinstance(payment_rows, PartyLedger):
+        values = payment_rows.column('Payment Date') if 'Payment Date' in payment_rows.columns else []
+        if getattr(values, 'dtype', None) is not None and values.dtype.kind == 'M':
+            values = pd.DatetimeIndex(values)  # Timestamps, whose text is what the row dicts gave
+        values = list(values)
+    else:
+        values = [row.get('Payment Date', '') for row in payment_rows]
+    dates = sorted({str(value).strip() for value in values} - {'', 'nan', 'NaT', 'None'})
+    return f"{dates[0]}..{dates[-1]}" if dates else ""
+
+
+def message_key(entry, recipients, message):
+    """Idempotency key of one party's statement: recipients + rendered message + statement period.
+
+    The same statement re-rendered in a later run gets the same key, so a
+    resumed run can tell which parties were already delivered.
+    """
+    parts = [",".join(sorted(r.strip().lower() for r in recipients)), statement_period(entry['payments']),
+             message if isinstance(message, str) else message.decode("utf-8", "replace")]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def generate_email_body(party_code, payment_rows, debit_rows, directory):
+    return render_email_body(directory.display_name(party_code), payment_rows)
+
+
+def prepare_party_message(entry, directory, gmail_user):
+    """Render and encode one matched party; returns ``(recipients, message, party_name, sent_line)``."""
+    party_code = entry['party_code']  # This is actually PartyName since we match by name
+    record = directory.find_exact_name(party_code)
+    party_name = record.name if record is not None else (party_code if party_code else 'Unknown Party')
+    cc_emails = record.cc_list if record is not None else []
+    html_body = generate_email_body(party_code, entry['payments'], entry['debits'], directory)
+    recipients, message = build_message(
+        gmail_user,
+        entry['emails'],
+        f"Payment Reconciliation for {party_code} - {party_name}",
+        html_body,
+        cc=cc_emails
+    )
+    sent_line = f"Party Code: {party_code} | Party Name: {party_name} | Emails: {', '.join(entry['emails'])} | CC: {', '.join(cc_emails)}"
+    return recipients, message, party_name, sent_line
@@ -0,0 +1,201 @@
+"""Database ingestion: stream payment rows from EasySell (or any DB-API source) into payment/debit frames.
+
+The query selects the vendor-export columns under the sheet's header names,
+so every chunk goes through the same ``normalize_vendor_frame`` as an
+uploaded workbook. Connections come from a ``connect()`` callable, which keeps
+the driver pluggable: pyodbc for SQL Server in production, sqlite3 for a
+local stand-in with the same schema.
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+import pandas as pd
+
+from .ingest import normalize_vendor_frame
+
+try:
+    import pyodbc
+except ImportError:  # optional dependency
+    pyodbc = None
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# dbo.PaymentDetails as seen by the app; also used to build the SQLite stand-in
+PAYMENT_DETAILS_SCHEMA = """
+CREATE TABLE PaymentDetails (
+    Id INTEGER PRIMARY KEY,
+    SellerName NVARCHAR(200) NOT NULL,
+    Channel NVARCHAR(50),
+    TransactionType NVARCHAR(50),
+    Category NVARCHAR(100),
+    BillNo NVARCHAR(50),
+    InvoiceDate DATE,
+    TotalWithTax DECIMAL(18, 2),
+    CR DECIMAL(18, 2),
+    DR DECIMAL(18, 2),
+    MainAdvisedNo NVARCHAR(50),
+    SellerAdvisedNo NVARCHAR(50),
+    PaymentDate DATE
+)
+"""
+
+PAYMENT_DETAILS_QUERY = """
+SELECT
+    SellerName AS [Seller Name],
+    Channel AS [Channel],
+    TransactionType AS [Transaction Type],
+    Category AS [Category],
+    BillNo AS [Bill No],
+    InvoiceDate AS [Invoice Date],
+    TotalWithTax AS [Total With Tax],
+    CR AS [CR],
+    DR AS [DR],
+    MainAdvisedNo AS [Main Advised No],
+    SellerAdvisedNo AS [Seller Advised No],
+    PaymentDate AS [Payment Date]
+FROM PaymentDetails
+"""
+
+# Drivers hand back date objects (pyodbc) or ISO strings (sqlite3); the sheet path yields datetime64
+_DATE_COLUMNS = ("Invoice Date", "Payment Date")
+
+
+def build_payment_query(advised_no=None, paid_from=None, paid_to=None, base_query=PAYMENT_DETAILS_QUERY):
+    """Return ``(sql, params)`` for one advice / payment-date window, in table order."""
+    clauses, params = [], []
+    if advised_no:
+        clauses.append("MainAdvisedNo = ?")
+        params.append(advised_no)
+    if paid_from is not None:
+        clauses.append("PaymentDate >= ?")
+        params.append(paid_from)
+    if paid_to is not None:
+        clauses.append("PaymentDate <= ?")
+        params.append(paid_to)
+    sql = base_query.rstrip()
+    if clauses:
+        sql += "\nWHERE " + " AND ".join(clauses)
+    return sql + "\nORDER BY Id", tuple(params)
+
+
+def sqlserver_connector(connection_string, timeout=30):
+    if pyodbc is None:
+        raise RuntimeError("pyodbc is required for the SQL Server source (pip install pyodbc)")
+    return partial(pyodbc.connect, connection_string, timeout=timeout, readonly=True)
+
+
+def sqlite_connector(db_path):
+    # Pooled connections may be handed to another Streamlit thread
+    return partial(sqlite3.connect, str(db_path), check_same_thread=False)
+
+
+def create_standin(db_path):
+    """Create an empty SQLite database with the PaymentDetails schema."""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        with conn:
+            conn.execute(PAYMENT_DETAILS_SCHEMA)
+    finally:
+        conn.close()
+    return db_path
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections created lazily by ``connect()``.
+
+    At most ``size`` connections are checked out at once; idle ones are reused
+    most-recently-returned first. A connection that raised while checked out
+    is closed instead of being returned to the pool.
+    """
+
+    def __init__(self, connect, size=2):
+        self._connect = connect
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self.opened = 0
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                self.opened += 1
+            try:
+                yield conn
+                conn.rollback()  # end the read transaction before the connection is reused
+            except Exception:
+                _close_quietly(conn)
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                _close_quietly(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def iter_raw_chunks(pool, query=PAYMENT_DETAILS_QUERY, params=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the query result as DataFrames of at most ``chunk_size`` rows.
+
+    Rows are pulled with ``fetchmany`` from a forward-only cursor (SQL Server
+    streams these server-side), so only one chunk is held in memory at a time.
+    Chunk indexes continue where the previous chunk stopped, like one sheet.
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.arraysize = chunk_size
+            cursor.execute(query, params)
+            columns = [d[0] for d in cursor.description]
+            offset = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows and offset:
+                    break
+                chunk = pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns,
+                                                 index=pd.RangeIndex(offset, offset + len(rows)))
+                for col in _DATE_COLUMNS:
+                    if col in chunk.columns:
+                        chunk[col] = pd.to_datetime(chunk[col], errors="coerce")
+                yield chunk
+                if not rows:  # empty result: one empty chunk keeps the columns
+                    break
+                offset += len(rows)
+        finally:
+            cursor.close()
+
+
+def load_database(pool, query=PAYMENT_DETAILS_QUERY, params=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """Load ``(payment_df, debit_df)`` from the database in the same shape as ``load_excel``."""
+    payment_parts, debit_parts = [], []
+    for chunk in iter_raw_chunks(pool, query, params, chunk_size):
+        payment_chunk, debit_chunk = normalize_vendor_frame(chunk)
+        payment_parts.append(payment_chunk)
+        debit_parts.append(debit_chunk)
+    payment_df = pd.concat(payment_parts)
+    non_empty = [part for part in debit_parts if not part.empty]
+    debit_df = pd.concat(non_empty, ignore_index=True) if non_empty else debit_parts[0]
+    return payment_df, debit_df
@@ -0,0 +1,122 @@
+"""Per-party fingerprints, so a corrected upload only re-checks and re-renders the parties that changed.
+
+A party's fingerprint hashes its payment rows, its debit rows (all columns,
+in sheet order) and its directory entry. ``reconcile`` diffs an upload's
+fingerprints against the previous run's and tells ``match_data`` which
+matched parties are unchanged, so their checks are not redone; the outbox
+keeps the fingerprint of every spooled message, so ``build_outbox`` reuses
+those messages and their message keys (and delivery state) stay the same.
+"""
+import hashlib
+import json
+
+import pandas as pd
+
+from .matching import build_email_map, group_party_rows, match_data, normalize_name, party_column
+
+ADDED, CHANGED, UNCHANGED = "added", "changed", "unchanged"
+# Dicts, lists and short strings kept per party besides its ledger rows (about 450 bytes measured)
+_PARTY_OVERHEAD = 512
+
+
+def _row_hashes(frame):
+    # One uint64 per row over every column; the column names go into the fingerprint separately
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def party_fingerprints(payment_df, debit_df, party_emails):
+    """``{normalized party key: hex digest}`` for every party with payment rows."""
+    payment_df = payment_df.rename(columns=str.strip)
+    debit_df = debit_df.rename(columns=str.strip)
+    payment_col = party_column(payment_df)
+    if payment_col is None:
+        return {}
+    debit_col = party_column(debit_df)
+    email_map = build_email_map(party_emails)
+    payment_groups, _ = group_party_rows(payment_df[payment_col])
+    debit_groups, _ = group_party_rows(debit_df[debit_col]) if debit_col else ({}, [])
+    payment_hashes = _row_hashes(payment_df)
+    debit_hashes = _row_hashes(debit_df) if debit_col else None
+    columns = json.dumps([list(map(str, payment_df.columns)), list(map(str, debit_df.columns))]).encode()
+
+    fingerprints = {}
+    for key, positions in payment_groups.items():
+        digest = hashlib.sha256(columns)
+        digest.update(payment_hashes[positions].tobytes())
+        digest.update(b"\0")
+        if key in debit_groups:
+            digest.update(debit_hashes[debit_groups[key]].tobytes())
+        digest.update(b"\0")
+        digest.update(json.dumps(email_map.get(key), sort_keys=True, default=str).encode())
+        fingerprints[key] = digest.hexdigest()
+    return fingerprints
+
+
+class PartyDelta:
+    """Parties added, changed, unchanged and removed between two sets of fingerprints."""
+
+    def __init__(self, previous, current):
+        previous = previous or {}
+        self.added = [key for key in current if key not in previous]
+        self.changed = [key for key in current if key in previous and previous[key] != current[key]]
+        self.unchanged = [key for key in current if previous.get(key) == current[key]]
+        self.removed = [key for key in previous if key not in current]
+        self._status = dict.fromkeys(self.added, ADDED)
+        self._status.update(dict.fromkeys(self.changed, CHANGED))
+        self._status.update(dict.fromkeys(self.unchanged, UNCHANGED))
+
+    def status(self, party):
+        """``"added"``, ``"changed"`` or ``"unchanged"`` for a party name (None if not in the upload)."""
+        return self._status.get(normalize_name(party))
+
+    def counts(self):
+        return {"added": len(self.added), "changed": len(self.changed), "unchanged": len(self.unchanged),
+                "removed": len(self.removed)}
+
+    def __str__(self):
+        return ", ".join(f"{n} {label}" for label, n in self.counts().items())
+
+
+class Reconciliation:
+    """One upload's match results, fingerprints and delta against the previous run."""
+
+    def __init__(self, matched_results, skips, parties_without_email, fingerprints, delta):
+        self.matched_results = matched_results
+        self.skips = skips
+        self.parties_without_email = parties_without_email
+        self.fingerprints = fingerprints
+        self.delta = delta
+
+    @property
+    def nbytes(self):
+        """Approximate bytes kept alive, for the ingest cache: the shared ledgers plus a flat per-party overhead."""
+        ledgers = {}
+        for entry in self.matched_results:
+            for rows in (entry['payments'], entry['debits']):
+                ledgers.setdefault(id(rows.ledger), rows.ledger)
+        parties = len(self.matched_results) + len(self.parties_without_email) + len(self.fingerprints)
+        return sum(ledger.nbytes for ledger in ledgers.values()) + parties * _PARTY_OVERHEAD
+
+    def matched_keys(self):
+        """Normalized keys of the matched parties."""
+        return {normalize_name(entry['party_code']) for entry in self.matched_results}
+
+
+def reconcile(payment_df, debit_df, party_emails, previous=None, fingerprints=None):
+    """``match_data`` that only re-checks parties whose fingerprint changed since ``previous``.
+
+    ``previous`` is the last ``Reconciliation`` (parties it matched that are
+    unchanged skip the debit check); without one, ``fingerprints`` from an
+    earlier run (e.g. an outbox manifest) still give the delta, but every
+    party is checked.
+    """
+    current = party_fingerprints(payment_df, debit_df, party_emails)
+    if previous is not None:
+        fingerprints = previous.fingerprints
+    delta = PartyDelta(fingerprints, current)
+    reuse = None
+    if previous is not None:
+        matched = previous.matched_keys()
+        reuse = {key for key in delta.unchanged if key in matched}
+    matched_results, skips, parties_without_email = match_data(payment_df, debit_df, party_emails, reuse=reuse)
+    return Reconciliation(matched_results, skips, parties_without_email, current, delta)
@@ -0,0 +1,250 @@
+"""Party email directory: SQLite/JSON persistence plus an in-memory index built once per write."""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from .matching import normalize_name
+
+
+def load_party_emails(json_path):
+    json_path = Path(json_path)
+    if not json_path.exists():
+        sample = [
+            {"PartyName": "Alpha Corp", "Email": "alpha@example.com"},
+            {"PartyName": "Beta Ltd", "Email": "beta@example.com"}
+        ]
+        with open(json_path, 'w') as f:
+            json.dump(sample, f, indent=2)
+    with open(json_path, 'r') as f:
+        raw = json.load(f)
+
+    # Normalize keys so the rest of the app can always rely on:
+    # PartyCode, PartyName, Email, CC
+    normalized = []
+    for entry in raw:
+        if not isinstance(entry, dict):
+            continue
+        party_code = entry.get("PartyCode", entry.get("Party Code", ""))
+        party_name = entry.get("PartyName", entry.get("Party Name", ""))
+        email = entry.get("Email", "")
+        cc = entry.get("CC", entry.get("Cc", ""))
+
+        normalized.append({
+            "PartyCode": str(party_code).strip() if party_code is not None else "",
+            "PartyName": str(party_name).strip() if party_name is not None else "",
+            "Email": str(email).strip() if email is not None else "",
+            "CC": str(cc).strip() if cc is not None else "",
+        })
+    return normalized
+
+
+def save_party_emails(data, json_path):
+    with open(json_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    invalidate_party_directory(json_path)
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ""
+
+
+class PartyStore:
+    """SQLite-backed party directory (WAL mode, one row per party name).
+
+    The first time a database is opened with ``json_path`` set, the existing
+    party_emails.json is imported in one transaction. Writes are single-row or
+    batched upserts keyed on the party name and bump a ``revision`` counter
+    that readers use to decide whether their cached PartyDirectory is stale.
+    Connections are opened per call, so one store can be shared across
+    Streamlit sessions/threads.
+    """
+
+    def __init__(self, db_path, json_path=None):
+        self.db_path = Path(db_path)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS parties (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    party_code TEXT NOT NULL DEFAULT '',
+                    party_name TEXT NOT NULL UNIQUE,
+                    name_key TEXT NOT NULL,
+                    email TEXT NOT NULL DEFAULT '',
+                    cc TEXT NOT NULL DEFAULT '',
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS parties_code ON parties (party_code);
+                CREATE INDEX IF NOT EXISTS parties_name_key ON parties (name_key);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', '0');
+            """)
+            imported = conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone()
+        if json_path is not None and not imported and Path(json_path).exists():
+            self.upsert_many(load_party_emails(json_path), mark_imported=str(json_path))
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call; commits on success, always closes
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def revision(self):
+        with self._connect() as conn:
+            return int(conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0])
+
+    def entries(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT party_code, party_name, email, cc FROM parties ORDER BY id").fetchall()
+        return [{"PartyCode": code, "PartyName": name, "Email": email, "CC": cc} for code, name, email, cc in rows]
+
+    def upsert(self, entry):
+        self.upsert_many([entry])
+
+    def upsert_many(self, entries, mark_imported=None):
+        """Insert or update parties by PartyName in a single transaction."""
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = []
+        for entry in entries:
+            name = _clean(entry.get("PartyName"))
+            if not name:
+                continue
+            rows.append((_clean(entry.get("PartyCode")), name, normalize_name(name),
+                         _clean(entry.get("Email")), _clean(entry.get("CC")), now))
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT INTO parties (party_code, party_name, name_key, email, cc, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (party_name) DO UPDATE SET
+                    party_code = excluded.party_code,
+                    email = excluded.email,
+                    cc = excluded.cc,
+                    updated_at = excluded.updated_at
+            """, rows)
+            conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'")
+            if mark_imported is not None:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)", (mark_imported,))
+        return len(rows)
+
+    def export_json(self, json_path=None):
+        """Dump the directory in the party_emails.json layout; returns the JSON text."""
+        text = json.dumps(self.entries(), indent=2)
+        if json_path is not None:
+            Path(json_path).write_text(text)
+        return text
+
+
+class PartyRecord:
+    __slots__ = ("index", "code", "name", "email", "cc", "key", "to_list", "cc_list")
+
+    def __init__(self, index, entry):
+        self.index = index
+        self.code = entry["PartyCode"]
+        self.name = entry["PartyName"]
+        self.email = entry["Email"]
+        self.cc = entry["CC"]
+        self.key = normalize_name(self.name)
+        self.to_list = [email.strip() for email in self.email.split(",")]
+        self.cc_list = [email.strip() for email in self.cc.split(",")] if self.cc else []
+
+
+class PartyDirectory:
+    """Read-only index over the normalized party_emails entries.
+
+    Lookups by normalized name, exact name, party code and email address are
+    dict hits; for duplicate keys the first entry wins, like the linear
+    ``next(...)`` scans this replaces. ``entries`` keeps the plain dicts for
+    code that still takes the list (``match_data``).
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.records = tuple(PartyRecord(i, e) for i, e in enumerate(entries))
+        self._by_key = {}
+        self._by_name = {}
+        self._by_code = {}
+        self._by_email = {}
+        for record in self.records:
+            self._by_key.setdefault(record.key, record)
+            self._by_name.setdefault(record.name, record)
+            self._by_code.setdefault(record.code, record)
+            for address in record.to_list + record.cc_list:
+                if address:
+                    self._by_email.setdefault(address.lower(), []).append(record)
+        self._digest = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def find_by_name(self, name):
+        """Whitespace/case-insensitive name lookup."""
+        return self._by_key.get(normalize_name(name))
+
+    def find_exact_name(self, name):
+        return self._by_name.get(name)
+
+    def find_by_code(self, code):
+        return self._by_code.get(code)
+
+    def find_by_email(self, address):
+        return self._by_email.get(address.strip().lower(), [])
+
+    def codes(self):
+        return [record.code for record in self.records]
+
+    def display_name(self, party_code):
+        # party_code is actually PartyName (case-insensitive)
+        record = self.find_by_name(party_code)
+        return record.name if record is not None else (party_code if party_code else 'Unknown Party')
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            from .cache import party_emails_digest
+
+            self._digest = party_emails_digest(self.entries)
+        return self._digest
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def get_party_directory(source):
+    """Shared PartyDirectory for a PartyStore or a party_emails.json path.
+
+    Rebuilt only after a write: a new store revision, save_party_emails, or an
+    outside edit of the JSON file (mtime/size).
+    """
+    if isinstance(source, PartyStore):
+        key = source.db_path
+        stamp = source.revision()
+        load = source.entries
+    else:
+        key = Path(source)
+        stat = key.stat() if key.exists() else None
+        stamp = (stat.st_mtime_ns, stat.st_size) if stat else None
+        load = lambda: load_party_emails(key)
+    with _directories_lock:
+        cached = _directories.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    directory = PartyDirectory(load())
+    if not isinstance(source, PartyStore):
+        stat = key.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    with _directories_lock:
+        _directories[key] = (stamp, directory)
+    return directory
+
+
+def invalidate_party_directory(source):
+    with _directories_lock:
+        _directories.pop(source.db_path if isinstance(source, PartyStore) else Path(source), None)
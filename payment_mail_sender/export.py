@@ -0,0 +1,169 @@
+"""Party-wise Excel/ZIP exports written straight to disk.
+
+Workbooks are written with xlsxwriter's ``constant_memory`` mode (each row is
+flushed as it is written), party rows are the matched parties' ledger views,
+and the per-party workbooks for the ZIP are built in a process
+pool and streamed into a ZIP file on disk.
+"""
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import xlsxwriter
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from .ledger import PartyLedger
+
+MAX_SHEET_NAME = 31
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+_INVALID_FILE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def unique_sheet_name(label, suffix, taken):
+    """Excel-safe sheet name ``<label><suffix>`` of at most 31 characters.
+
+    Names are unique case-insensitively within ``taken`` (which is updated);
+    a clash gets a ``~2``, ``~3``... tag in front of the suffix instead of
+    silently colliding like ``party_code[:28]`` did.
+    """
+    base = _INVALID_SHEET_CHARS.sub("_", str(label)).strip("'") or "Party"
+    name = base[:MAX_SHEET_NAME - len(suffix)] + suffix
+    n = 2
+    while name.lower() in taken:
+        tag = f"~{n}"
+        name = base[:MAX_SHEET_NAME - len(suffix) - len(tag)] + tag + suffix
+        n += 1
+    taken.add(name.lower())
+    return name
+
+
+def unique_file_name(label, taken, extension=".xlsx"):
+    base = _INVALID_FILE_CHARS.sub("_", str(label)).strip(" .") or "party"
+    name = base + extension
+    n = 2
+    while name.lower() in taken:
+        name = f"{base} ({n}){extension}"
+        n += 1
+    taken.add(name.lower())
+    return name
+
+
+def _rows_frame(rows):
+    # PartyLedger views are used as they are; lists of row dicts (the old layout) become a frame
+    return rows.frame if isinstance(rows, PartyLedger) else pd.DataFrame(rows)
+
+
+def party_frames(matched_results):
+    """Yield ``(party_code, payments, debits)`` frames for each matched party, in order.
+
+    The frames are views of the parties' ``PartyLedger`` rows (Debit Amount
+    already filled by ``match_data``); nothing is regrouped or copied. Entries
+    holding lists of row dicts instead are turned into frames.
+    """
+    for entry in matched_results:
+        yield entry['party_code'], _rows_frame(entry['payments']), _rows_frame(entry['debits'])
+
+
+def _column_values(series):
+    """Return ``(kind, values)``: plain Python values with every missing value as None."""
+    if is_datetime64_any_dtype(series.dtype):
+        values = series.dt.to_pydatetime().tolist() if len(series) else []
+        return "datetime", [None if v is pd.NaT or v is None else v for v in values]
+    if is_numeric_dtype(series.dtype) and series.dtype != bool:
+        return "number", [None if v != v else v for v in series.tolist()]
+    return "any", [None if v is None or v is pd.NaT or (isinstance(v, float) and v != v) else v
+                   for v in series.tolist()]
+
+
+def _write_sheet(workbook, sheet_name, frame, header_fmt, datetime_fmt):
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(c) for c in frame.columns], header_fmt)
+    kinds, columns = zip(*[_column_values(frame[c]) for c in frame.columns]) if len(frame.columns) else ((), ())
+    # Typed columns skip xlsxwriter's per-cell type dispatch
+    writers = []
+    for kind in kinds:
+        if kind == "datetime":
+            writers.append(lambda row, col, value: worksheet.write_datetime(row, col, value, datetime_fmt))
+        elif kind == "number":
+            writers.append(worksheet.write_number)
+        else:
+            writers.append(None)
+    for row_num, row in enumerate(zip(*columns), start=1):
+        for col_num, value in enumerate(row):
+            if value is None:
+                continue
+            writer = writers[col_num]
+            if writer is not None:
+                writer(row_num, col_num, value)
+            elif hasattr(value, "year") and hasattr(value, "month"):
+                worksheet.write_datetime(row_num, col_num, value, datetime_fmt)
+            else:
+                worksheet.write(row_num, col_num, value)
+
+
+def write_workbook(path, sheets):
+    """Write ``[(sheet_name, frame), ...]`` to ``path`` row by row (constant_memory)."""
+    workbook = xlsxwriter.Workbook(str(path), {"constant_memory": True, "strings_to_numbers": False,
+                                               "strings_to_formulas": False, "strings_to_urls": False})
+    # Same header look and datetime format as DataFrame.to_excel
+    header_fmt = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    datetime_fmt = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    try:
+        for sheet_name, frame in sheets:
+            _write_sheet(workbook, sheet_name, frame, header_fmt, datetime_fmt)
+    finally:
+        workbook.close()
+    return path
+
+
+def write_partywise_workbook(path, parties):
+    """One workbook with a ``_Pay`` (and, when present, ``_Debit``) sheet per party."""
+    taken = set()
+    sheets = []
+    for party_code, payments, debits in parties:
+        sheets.append((unique_sheet_name(party_code, "_Pay", taken), payments))
+        if not debits.empty:
+            sheets.append((unique_sheet_name(party_code, "_Debit", taken), debits))
+    return write_workbook(path, sheets)
+
+
+def _write_party_batch(out_dir, batch):
+    # Runs in a worker process: one small workbook per party
+    for file_name, payments, debits in batch:
+        sheets = [("Payments", payments)]
+        if not debits.empty:
+            sheets.append(("Debit Notes", debits))
+        write_workbook(Path(out_dir) / file_name, sheets)
+    return [file_name for file_name, _, _ in batch]
+
+
+def write_partywise_zip(path, parties, workers=None, batch_size=25):
+    """ZIP of one workbook per party, built in a process pool and streamed to ``path``.
+
+    ``workers=1`` (or a single batch) writes in-process; the workbooks go to a
+    temporary directory and are added to the archive in party order.
+    """
+    taken = set()
+    jobs = [(unique_file_name(party_code, taken), payments, debits) for party_code, payments, debits in parties]
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory(prefix="partywise_") as out_dir:
+        if workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                _write_party_batch(out_dir, batch)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+                list(pool.map(_write_party_batch, [out_dir] * len(batches), batches))
+        tmp_path = Path(str(path) + ".tmp")
+        # xlsx files are already deflated zips; compressing them again costs time for ~8% size
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as archive:
+            for file_name, _, _ in jobs:
+                with open(Path(out_dir) / file_name, "rb") as src, archive.open(file_name, "w") as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+        tmp_path.replace(path)
+    return path
@@ -0,0 +1,481 @@
+"""Workbook ingestion: turns uploaded payment workbooks into payment/debit frames."""
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_LEADING_DIGITS_RE = re.compile(r"(\d+)")
+
+
+# Accepted header spellings per normalized field (matched case-insensitively)
+VENDOR_COLUMNS = {
+    "seller": ["Seller Name", "Party Name"],
+    "bill": ["Bill No", "Invoice No", "Inv. No."],
+    "date": ["Invoice Date", "Date"],
+    "payment_date": ["Payment Date"],
+    "total_with_tax": ["Total With Tax", "Total With Tax ", "Total_with_tax"],
+    "total_with_tax_alt": ["Zoho Total With Tax", "Zoho total with tax"],
+    "main_advise_no": ["Main Advised No", "Main Advise No"],
+    "seller_advised_no": ["Seller Advised No", "Seller Advise No"],
+    "dr": ["DR", "Debit", "Debit Amount"],
+    "cr": ["CR", "Credit", "Credit Amount"],
+    "category": ["Category"],
+    "channel": ["Channel"],
+    "txn_type": ["Transaction Type", "Transaction", "Transacation Type"],
+    "quantity": ["Quantity", "Qty"],
+    "total_wo_tax": ["Total Without Tax", "Total Without Tax "],
+    "total_tax": ["Total Tax"],
+    "zoho_wo_tax": ["Zoho Total Without Tax"],
+    "zoho_tax": ["Zoho Total Tax"],
+    "zoho_with_tax": ["Zoho Total With Tax"],
+    "balance_due": ["Balance Due"],
+    "zoho_status": ["Zoho Status"],
+    "balance": ["Balance"],
+}
+
+
+def derive_code(val: str) -> str:
+    # Derive Party Code from seller name where possible (e.g. "731-AUROMIN-Amazon" -> "731", "731s-AUROMIN-demo" -> "731")
+    if not val:
+        return ""
+    m = _LEADING_DIGITS_RE.match(val.strip())
+    if m:
+        return m.group(1)
+    # fallback to chunk before first dash
+    return val.split("-")[0].strip() if "-" in val else val.strip()
+
+
+def derive_codes(seller_series):
+    # Columnar derive_code for a series of already-stripped seller names
+    leading_digits = seller_series.str.extract(r"^(\d+)", expand=False)
+    before_dash = seller_series.str.split("-", n=1).str[0].str.strip()
+    return leading_digits.fillna(before_dash)
+
+
+def load_excel(file_path, snapshot_dir=None, digest=None, chunk_rows=None):
+    """Parse a payment workbook into ``(payment_df, debit_df)``.
+
+    With ``snapshot_dir`` set, the normalized frames are cached as an Arrow
+    snapshot keyed by the file's SHA-256 (pass ``digest`` if already known)
+    and later loads of the same content skip the xlsx parse entirely.
+    With ``chunk_rows`` set, single-sheet exports are read by ``stream_workbook``.
+    """
+    if chunk_rows is None:
+        parse = parse_workbook
+    else:
+        def parse(path):
+            return stream_workbook(path, chunk_rows=chunk_rows)
+    if snapshot_dir is None:
+        return parse(file_path)
+    from .snapshot import file_digest, load_snapshot, save_snapshot
+
+    digest = digest or file_digest(file_path)
+    frames = load_snapshot(snapshot_dir, digest)
+    if frames is None:
+        frames = parse(file_path)
+        save_snapshot(snapshot_dir, digest, *frames)
+    return frames
+
+
+def parse_workbook(file_path):
+    wb = pd.ExcelFile(file_path)
+    sheet_names = [s.strip() for s in wb.sheet_names]
+
+    # Legacy two-sheet format: keep existing behavior
+    if "Payment Details" in sheet_names and "Debit Notes" in sheet_names:
+        payment_df = wb.parse("Payment Details")
+        debit_df = wb.parse("Debit Notes")
+        payment_df.columns = payment_df.columns.str.strip()
+        debit_df.columns = debit_df.columns.str.strip()
+        return payment_df, debit_df
+
+    # New single-sheet format with columns highlighted in yellow
+    # Expected headers (case-insensitive): Seller Name, Channel, Transaction Type, Category,
+    # Bill No, Invoice Date, Quantity, Total Without Tax, Total Tax, Total With Tax,
+    # Zoho Total Without Tax, Zoho Total Tax, Zoho Total With Tax, Balance Due,
+    # Zoho Status, CR, DR, Balance
+    sheet_name = sheet_names[0]
+
+    # Detect merged summary rows and offset header (seen in vendor Payment Details.xlsx)
+    raw_df_preview = wb.parse(sheet_name, header=None, nrows=5)
+    header_row = 0
+    first_cell = str(raw_df_preview.iloc[0, 0]) if not pd.isna(raw_df_preview.iloc[0, 0]) else ""
+    if "Seller Name:" in first_cell and "Advised No" in first_cell:
+        header_row = 2  # actual headers at row index 2 (0-based)
+
+    raw_df = wb.parse(sheet_name, header=header_row)
+    return normalize_vendor_frame(raw_df)
+
+
+def normalize_vendor_frame(raw_df):
+    """Map a single-sheet vendor export (header row already applied) to ``(payment_df, debit_df)``.
+
+    Shared by the workbook parser and the database source, which selects the
+    same columns under the sheet's header names.
+    """
+    raw_df.columns = raw_df.columns.str.strip()
+
+    def pick(col_candidates):
+        # Some columns may be NaN or non-string; always cast to string for matching
+        lower_map = {str(c).lower(): c for c in raw_df.columns}
+        for cand in col_candidates:
+            if cand.lower() in lower_map:
+                return lower_map[cand.lower()]
+        return None
+
+    col_seller = pick(VENDOR_COLUMNS["seller"])
+    col_bill = pick(VENDOR_COLUMNS["bill"])
+    col_date = pick(VENDOR_COLUMNS["date"])
+    col_payment_date = pick(VENDOR_COLUMNS["payment_date"])
+    col_total_with_tax = pick(VENDOR_COLUMNS["total_with_tax"])
+    col_total_with_tax_alt = pick(VENDOR_COLUMNS["total_with_tax_alt"])
+    col_main_advise_no = pick(VENDOR_COLUMNS["main_advise_no"])
+    col_seller_advised_no = pick(VENDOR_COLUMNS["seller_advised_no"])
+    col_dr = pick(VENDOR_COLUMNS["dr"])
+    col_cr = pick(VENDOR_COLUMNS["cr"])
+    col_txn_type = pick(VENDOR_COLUMNS["txn_type"])
+    col_total_wo_tax = pick(VENDOR_COLUMNS["total_wo_tax"])
+
+    # Basic required columns
+    missing_cols = []
+    if col_seller is None:
+        missing_cols.append("Seller Name")
+    if col_bill is None:
+        missing_cols.append("Bill No")
+    if col_date is None:
+        missing_cols.append("Invoice Date")
+    if col_main_advise_no is None:
+        missing_cols.append("Main Advised No")
+    if col_seller_advised_no is None:
+        missing_cols.append("Seller Advised No")
+    # For amounts we allow fallbacks; collect missing for messaging only
+    amt_missing = []
+    if col_total_with_tax is None and col_total_with_tax_alt is None:
+        amt_missing.append("Total With Tax")
+    if col_dr is None:
+        amt_missing.append("DR")
+    if col_cr is None:
+        amt_missing.append("CR")
+    if missing_cols:
+        raise ValueError(f"Missing required columns in the uploaded sheet: {', '.join(missing_cols)}. Expected at least Seller Name, Bill No, Invoice Date.")
+
+    # Normalize numeric columns
+    def num(series):
+        return pd.to_numeric(series, errors="coerce").fillna(0)
+
+    # Drop summary/empty rows
+    raw_df = raw_df.dropna(how="all")
+    if col_seller:
+        raw_df = raw_df[~raw_df[col_seller].isna()]
+
+    # Fallback order for totals
+    if col_total_with_tax:
+        total_with_tax_series = num(raw_df[col_total_with_tax])
+    elif col_total_with_tax_alt:
+        total_with_tax_series = num(raw_df[col_total_with_tax_alt])
+    elif col_total_wo_tax:
+        total_with_tax_series = num(raw_df[col_total_wo_tax])
+    else:
+        total_with_tax_series = pd.Series([0] * len(raw_df), index=raw_df.index)
+
+    # Placeholders share raw_df's labels: streamed chunks are indexed by sheet row, not from 0
+    dr_series = num(raw_df[col_dr]) if col_dr else pd.Series([0] * len(raw_df), index=raw_df.index)
+    cr_series = num(raw_df[col_cr]) if col_cr else pd.Series([0] * len(raw_df), index=raw_df.index)
+
+    # If there is no explicit total column but we do have CR/DR, derive a pseudo total
+    if (col_total_with_tax is None and col_total_with_tax_alt is None and col_total_wo_tax is None) and (col_cr or col_dr):
+        total_with_tax_series = cr_series + dr_series
+
+    # Base series for seller/bill/date
+    seller_series = raw_df[col_seller].fillna("").astype(str).str.strip()
+    bill_series = raw_df[col_bill].fillna("").astype(str).str.strip()
+    date_series = raw_df[col_date]
+    payment_date_series = raw_df[col_payment_date] if col_payment_date else pd.Series([None] * len(raw_df), index=raw_df.index)
+
+    # Filter out only total/blank rows (keep all rows with valid seller name)
+    filtered_idx = ~(
+        (bill_series.str.lower().isin(["", "total", "nan"])) 
+        & (seller_series.str.strip() == "")
+    )
+    seller_series = seller_series[filtered_idx]
+    bill_series = bill_series[filtered_idx]
+    date_series = date_series[filtered_idx]
+    raw_df = raw_df.loc[filtered_idx]
+
+    party_code_series = derive_codes(seller_series)
+    party_code_series = party_code_series.where(party_code_series != "", seller_series)
+
+    payment_df = pd.DataFrame({
+        "Party Name": seller_series,
+        "Party Code": party_code_series,
+        "Inv. No.": bill_series,
+        "Main Advised No.": raw_df[col_main_advise_no] if col_main_advise_no else "",
+        "Seller Advised No.": raw_df[col_seller_advised_no] if col_seller_advised_no else "",
+        "Pur. Date": date_series,
+        "Total Inv. Amount": total_with_tax_series,
+        "Debit Amount": dr_series,
+        # Net = Total - DR - CR (treat CR as credit note)
+        "Net Amount": total_with_tax_series - dr_series - cr_series,
+        # Bank Payment shows CR so existing email layout still reflects reduction
+        "Bank Payment": cr_series,
+        "Payment Date": payment_date_series,
+        # Provide a debit/credit note reference when present
+        "Debit Note": bill_series.where(dr_series > 0, "").fillna(""),
+        "Transaction Type": raw_df[col_txn_type] if col_txn_type else ""
+    })
+
+    # Trim to only the needed columns for mail logic
+    keep_cols = [
+        "Party Name",
+        "Party Code",
+        "Inv. No.",
+        "Main Advised No.",
+        "Seller Advised No.",
+        "Pur. Date",
+        "Total Inv. Amount",
+        "Debit Amount",
+        "Net Amount",
+        "Bank Payment",
+        "Payment Date",
+        "Debit Note",
+        "Transaction Type",
+    ]
+    payment_df = payment_df[keep_cols]
+
+    # Build a synthetic Debit Notes sheet from DR amounts (and CR amounts as negative credit notes).
+    # Rows keep sheet order with a row's DR note ahead of its CR note.
+    notes_base = pd.DataFrame({
+        "Party Name": seller_series,
+        "Party Code": party_code_series,
+        "Date": raw_df[col_date],
+        "Return Invoice No.": bill_series,
+    }).reset_index(drop=True)
+    missing_amounts = pd.Series(np.nan, index=raw_df.index)
+    dr_amt = pd.to_numeric(raw_df[col_dr] if col_dr else missing_amounts, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    cr_amt = pd.to_numeric(raw_df[col_cr] if col_cr else missing_amounts, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    dr_mask = dr_amt > 0
+    cr_mask = cr_amt > 0
+    dr_notes = notes_base[dr_mask].assign(Amount=dr_amt[dr_mask])
+    cr_notes = notes_base[cr_mask].assign(Amount=cr_amt[cr_mask] * -1.0)  # credit note reduces balance
+    cr_notes["Return Invoice No."] = cr_notes["Return Invoice No."] + " (CR)"
+    note_frames = [notes for notes in (dr_notes, cr_notes) if not notes.empty]
+    if not note_frames:
+        debit_df = pd.DataFrame(columns=["Party Code", "Party Name", "Date", "Return Invoice No.", "Amount"])
+    else:
+        debit_df = pd.concat(note_frames).sort_index(kind="stable").reset_index(drop=True)
+    return payment_df, debit_df
+
+
+# Fields normalize_vendor_frame reads; stream_workbook materializes only these columns
+_STREAMED_FIELDS = (
+    "seller", "bill", "date", "payment_date", "total_with_tax", "total_with_tax_alt", "total_wo_tax",
+    "main_advise_no", "seller_advised_no", "dr", "cr", "txn_type",
+)
+STREAM_CHUNK_ROWS = 20_000
+
+
+def _sheet_value(value, error_codes):
+    # Same cell conversion as pandas' openpyxl reader: blank -> "", integral floats -> int, errors -> NaN
+    if value is None:
+        return ""
+    if type(value) is float:
+        as_int = int(value)
+        return as_int if as_int == value else value
+    if type(value) is str and value in error_codes:
+        return np.nan
+    return value
+
+
+def iter_sheet_chunks(sheet, chunk_rows=STREAM_CHUNK_ROWS):
+    """Yield a single-sheet vendor export as raw DataFrames of at most ``chunk_rows`` rows.
+
+    ``sheet`` is a read-only openpyxl worksheet. The summary rows are detected
+    from the first row, and only the columns ``normalize_vendor_frame`` reads
+    are kept; rows blank in all of them are skipped. Chunks are typed by
+    pandas' own parser and indexed like one ``read_excel`` frame, so
+    normalizing them chunk by chunk gives the same rows.
+    """
+    from openpyxl.cell.cell import ERROR_CODES
+    from pandas.io.parsers import TextParser
+
+    sheet.reset_dimensions()  # don't trust the stored sheet dimensions (pandas does the same)
+    rows = sheet.iter_rows(values_only=True)
+    first_row = next(rows, None)
+    if first_row is None:
+        raise ValueError("The uploaded sheet is empty.")
+    first_cell = _sheet_value(first_row[0] if first_row else None, ERROR_CODES)
+    first_cell = str(first_cell) if first_cell != "" else ""
+    header = first_row
+    if "Seller Name:" in first_cell and "Advised No" in first_cell:
+        # actual headers at row index 2 (0-based)
+        next(rows, None)
+        header = next(rows, ())
+
+    header = [_sheet_value(v, ERROR_CODES) for v in header]
+    while header and header[-1] == "":
+        header.pop()
+    # Let pandas name the header row (Unnamed: n, duplicate mangling) exactly as read_excel would
+    names = list(TextParser([header], header=0, skip_blank_lines=False).read().columns)
+    wanted = {cand.lower() for field in _STREAMED_FIELDS for cand in VENDOR_COLUMNS[field]}
+    keep = [i for i, name in enumerate(names) if str(name).strip().lower() in wanted]
+    keep_names = [names[i] for i in keep]
+    # Seller/bill are stringified; keeping raw objects stops "1005" vs "1005.0" varying by chunk
+    as_text = {cand.lower() for field in ("seller", "bill") for cand in VENDOR_COLUMNS[field]}
+    dtypes = {name: object for name in keep_names if str(name).strip().lower() in as_text}
+    width = len(names)
+
+    position = 0
+    emitted = False
+    while True:
+        block, labels = [], []
+        for row in rows:
+            row = row[:width]
+            values = [_sheet_value(row[i], ERROR_CODES) if i < len(row) else "" for i in keep]
+            position += 1
+            if any(v != "" for v in values):  # blank rows are dropped by normalize_vendor_frame anyway
+                block.append(values)
+                labels.append(position - 1)
+                if len(block) == chunk_rows:
+                    break
+        if not block:
+            if not emitted:  # no data rows: one empty chunk keeps the columns
+                yield pd.DataFrame(columns=keep_names)
+            return
+        chunk = TextParser(block, names=keep_names, header=None, dtype=dtypes, skip_blank_lines=False).read()
+        chunk.index = pd.Index(labels)
+        emitted = True
+        yield chunk
+
+
+def _concat_chunks(parts, ignore_index=False):
+    # A chunk whose column is entirely blank gets a generic dtype; give it the dtype the other chunks
+    # agree on so the result matches parsing the whole sheet at once
+    for col in parts[0].columns:
+        typed = {part[col].dtype for part in parts if col in part.columns and part[col].notna().any()}
+        if len(typed) == 1:
+            dtype = typed.pop()
+            for part in parts:
+                if col in part.columns and part[col].dtype != dtype and not part[col].notna().any():
+                    part[col] = part[col].astype(dtype)
+    return pd.concat(parts, ignore_index=ignore_index)
+
+
+def stream_workbook(file_path, chunk_rows=STREAM_CHUNK_ROWS):
+    """Bounded-memory ``parse_workbook``: same frames, read ``chunk_rows`` rows at a time.
+
+    Peak memory is the normalized output plus one chunk, instead of the whole
+    sheet as Python objects plus a full-width raw frame. The legacy two-sheet
+    format is small and still goes through ``parse_workbook``.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet_names = [s.strip() for s in wb.sheetnames]
+        if "Payment Details" in sheet_names and "Debit Notes" in sheet_names:
+            legacy = True
+        else:
+            legacy = False
+            payment_parts, debit_parts = [], []
+            for chunk in iter_sheet_chunks(wb.worksheets[0], chunk_rows):
+                payment_chunk, debit_chunk = normalize_vendor_frame(chunk)
+                payment_parts.append(payment_chunk)
+                debit_parts.append(debit_chunk)
+    finally:
+        wb.close()
+    if legacy:
+        return parse_workbook(file_path)
+    non_empty_debits = [part for part in debit_parts if not part.empty]
+    debit_df = _concat_chunks(non_empty_debits, ignore_index=True) if non_empty_debits else debit_parts[0]
+    return _concat_chunks(payment_parts), debit_df
+
+
+BATCH_REPORT_COLUMNS = ["File", "Status", "Payment Rows", "Debit Rows", "Duplicates Dropped", "Seconds", "Error"]
+
+
+def _load_timed(file_path, snapshot_dir, chunk_rows):
+    # Runs in a worker process; failures are returned, not raised, so one bad file doesn't sink the batch
+    start = time.perf_counter()
+    try:
+        frames = load_excel(file_path, snapshot_dir=snapshot_dir, chunk_rows=chunk_rows)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+    return frames, "", time.perf_counter() - start
+
+
+def _first_file_rows(frames, key_column):
+    """Per frame, a mask of rows whose ``(party, key_column)`` was not already seen in an earlier frame.
+
+    Rows without a key are always kept, and repeats within one file are left
+    alone (validation reports those); only rows that an earlier file in the
+    batch already carried are dropped.
+    """
+    from .matching import party_column, party_keys
+
+    keys, files = [], []
+    for file_no, frame in enumerate(frames):
+        party_col = party_column(frame)
+        if party_col is None or key_column not in frame.columns:
+            keys.append(pd.Series(pd.NA, index=frame.index, dtype=object))
+        else:
+            bills = frame[key_column].astype(str).str.strip()
+            keyed = ~bills.str.lower().isin(["", "nan", "none"])
+            keys.append((party_keys(frame[party_col]) + "\0" + bills).where(keyed).astype(object))
+        files.append(np.full(len(frame), file_no))
+    if not keys:
+        return []
+    # One factorize over every file's keys; a row is dropped when its key first appeared in an earlier file
+    codes, uniques = pd.factorize(pd.concat(keys, ignore_index=True))
+    files = np.concatenate(files)
+    first_file = np.full(len(uniques), len(frames))
+    np.minimum.at(first_file, codes[codes >= 0], files[codes >= 0])
+    keep = (codes < 0) | (first_file[np.maximum(codes, 0)] == files)
+    return np.split(keep, np.cumsum([len(frame) for frame in frames])[:-1])
+
+
+def load_many(file_paths, workers=None, snapshot_dir=None, chunk_rows=None):
+    """Load several payment workbooks (one per channel) in a process pool and merge them.
+
+    Returns ``(payment_df, debit_df, report)``. The frames are concatenated in
+    ``file_paths`` order and de-duplicated by bill number per party: a bill
+    (or debit note) already loaded from an earlier file is dropped. ``report``
+    has one row per file (``BATCH_REPORT_COLUMNS``) with its parse time, row
+    counts and error, if any. ``workers=1`` loads in-process.
+    """
+    file_paths = [str(p) for p in file_paths]
+    workers = min(workers or os.cpu_count() or 1, len(file_paths)) or 1
+    args = ([snapshot_dir] * len(file_paths), [chunk_rows] * len(file_paths))
+    if workers <= 1:
+        results = list(map(_load_timed, file_paths, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_load_timed, file_paths, *args))
+
+    loaded = [(path, frames) for path, (frames, _, _) in zip(file_paths, results) if frames is not None]
+    report = pd.DataFrame([
+        {"File": Path(path).name, "Status": "failed" if frames is None else "ok",
+         "Payment Rows": 0 if frames is None else len(frames[0]),
+         "Debit Rows": 0 if frames is None else len(frames[1]),
+         "Duplicates Dropped": 0, "Seconds": round(seconds, 3), "Error": error}
+        for path, (frames, error, seconds) in zip(file_paths, results)
+    ], columns=BATCH_REPORT_COLUMNS)
+    if not loaded:
+        raise ValueError("None of the workbooks could be loaded: " + "; ".join(report["Error"]))
+
+    payment_frames = [frames[0] for _, frames in loaded]
+    debit_frames = [frames[1] for _, frames in loaded]
+    pay_masks = _first_file_rows(payment_frames, "Inv. No.")
+    debit_masks = _first_file_rows(debit_frames, "Return Invoice No.")
+    ok_rows = report.index[report["Status"] == "ok"]
+    report.loc[ok_rows, "Duplicates Dropped"] = [int((~m).sum()) for m in pay_masks]
+
+    payment_parts = [frame[mask] for frame, mask in zip(payment_frames, pay_masks)]
+    debit_parts = [frame[mask] for frame, mask in zip(debit_frames, debit_masks)]
+    non_empty_debits = [part for part in debit_parts if not part.empty]
+    payment_df = _concat_chunks(payment_parts, ignore_index=True)
+    debit_df = _concat_chunks(non_empty_debits, ignore_index=True) if non_empty_debits else debit_parts[0]
+    return payment_df, debit_df, report
@@ -0,0 +1,380 @@
+"""Append-only SQLite journal of every send attempt, plus an incrementally refreshed report.
+
+Each send appends one row (timestamp, run, party, status, latency, SMTP reply
+code, message size); rows are committed, and so fsynced, in batches. Reports
+are built from these records rather than by re-parsing ``FinalEmailLog.txt``.
+"""
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timezone
+from pathlib import Path
+
+import pandas as pd
+
+JOURNAL_COLUMNS = ["id", "run_id", "ts", "status", "party_code", "party_name", "recipients",
+                   "latency_ms", "smtp_code", "smtp_reply", "message_bytes", "detail", "message_key", "account"]
+_KEY_CHUNK = 500  # keys per IN (...) query, well under SQLite's variable limit
+REPORT_COLUMNS = {
+    "ts": "Time (UTC)", "run_id": "Run", "status": "Status", "party_code": "Party Code",
+    "party_name": "Party Name", "recipients": "Emails", "latency_ms": "Latency (ms)",
+    "smtp_code": "SMTP Code", "smtp_reply": "SMTP Reply", "message_bytes": "Bytes", "detail": "Error / Detail",
+    "account": "Sent From",
+}
+# Outcomes that carry the server's reply; QUOTA is a send the account's daily quota turned away
+_REPLY_STATUSES = ("SENT", "FAILED", "QUOTA")
+
+
+def utc_timestamp(value=None):
+    """ISO-8601 UTC text that sorts chronologically; naive datetimes/dates are taken as local time."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif isinstance(value, str):
+        return value
+    elif not isinstance(value, datetime) and isinstance(value, date):
+        value = datetime.combine(value, dt_time.min)
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def smtp_reply(error):
+    """``(code, reply)`` for a send outcome: 250 on success, the server's code when it refused."""
+    if error is None:
+        return 250, "OK"
+    if isinstance(error, smtplib.SMTPRecipientsRefused) and error.recipients:
+        code, reply = next(iter(error.recipients.values()))
+    elif isinstance(error, smtplib.SMTPResponseException):
+        code, reply = error.smtp_code, error.smtp_error
+    else:
+        # aiosmtplib errors carry .code/.message; connection errors have no SMTP reply
+        code, reply = getattr(error, "code", None), getattr(error, "message", None) or str(error)
+    if isinstance(reply, bytes):
+        reply = reply.decode("utf-8", "replace")
+    return (code if isinstance(code, int) else None), reply
+
+
+def message_size(message):
+    return len(message.encode("utf-8")) if isinstance(message, str) else len(message)
+
+
+class SendJournal:
+    """SQLite-backed, append-only send journal.
+
+    ``append`` buffers rows and commits them every ``batch_size`` rows or
+    ``max_delay`` seconds (``synchronous=FULL``, so each commit is fsynced);
+    ``flush``/``close`` commit the rest. Rows are never updated, so ``id``
+    grows monotonically and readers can fetch only what is new.
+    """
+
+    def __init__(self, db_path, batch_size=20, max_delay=2.0):
+        self.db_path = str(db_path)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    started_at TEXT NOT NULL,
+                    source TEXT NOT NULL DEFAULT '',
+                    dry_run INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS sends (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    ts TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    party_code TEXT NOT NULL DEFAULT '',
+                    party_name TEXT NOT NULL DEFAULT '',
+                    recipients TEXT NOT NULL DEFAULT '',
+                    latency_ms REAL,
+                    smtp_code INTEGER,
+                    smtp_reply TEXT,
+                    message_bytes INTEGER,
+                    detail TEXT NOT NULL DEFAULT '',
+                    message_key TEXT,
+                    account TEXT
+                );
+                CREATE INDEX IF NOT EXISTS sends_run ON sends (run_id, id);
+                CREATE INDEX IF NOT EXISTS sends_ts ON sends (ts);
+                CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sends)")}
+            if "message_key" not in columns:
+                conn.execute("ALTER TABLE sends ADD COLUMN message_key TEXT")
+            if "account" not in columns:
+                conn.execute("ALTER TABLE sends ADD COLUMN account TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS sends_account ON sends (account, ts) WHERE account IS NOT NULL")
+            conn.execute("CREATE INDEX IF NOT EXISTS sends_key ON sends (message_key, status) WHERE message_key IS NOT NULL")
+        self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA synchronous=FULL")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start_run(self, run_id=None, source="", dry_run=False):
+        """Register a run (idempotent) and return its id."""
+        run_id = run_id or new_run_id()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO runs (run_id, started_at, source, dry_run) VALUES (?, ?, ?, ?)",
+                               (run_id, utc_timestamp(), str(source), int(bool(dry_run))))
+        return run_id
+
+    def append(self, run_id, status, party_code="", party_name="", recipients=(), latency=None,
+               error=None, message=None, detail=None, key=None, durable=False, account=None):
+        """Queue one record; ``latency`` is in seconds, ``error`` the exception the send raised.
+
+        ``account`` is the sending account the SMTP transaction used.
+        ``durable=True`` commits (and fsyncs) before returning instead of waiting for the batch.
+        """
+        code, reply = smtp_reply(error) if status in _REPLY_STATUSES else (None, None)
+        if detail is None:
+            detail = str(error) if error is not None else ""
+        row = (run_id, utc_timestamp(), status, str(party_code or ""), str(party_name or ""),
+               ", ".join(recipients) if not isinstance(recipients, str) else recipients,
+               None if latency is None else round(latency * 1000, 3), code, reply,
+               None if message is None else message_size(message), detail, key, account)
+        with self._lock:
+            self._pending.append(row)
+            due = (durable or len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.max_delay)
+        if due:
+            self.flush()
+
+    def append_skips(self, run_id, skip_lines):
+        """Record ``match_data``'s ``"SKIPPED: <party> — <reason>"`` lines."""
+        for line in skip_lines:
+            party, _, reason = line.replace("SKIPPED:", "", 1).partition(" — ")
+            self.append(run_id, "SKIPPED", party_code=party.strip(), detail=reason.strip())
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if rows:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO sends (run_id, ts, status, party_code, party_name, recipients, latency_ms,"
+                        " smtp_code, smtp_reply, message_bytes, detail, message_key, account)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def records(self, run_id=None, since=None, until=None, after_id=0, status=None):
+        """Journal rows as a DataFrame (``JOURNAL_COLUMNS``), oldest first.
+
+        ``since``/``until`` bound the timestamp (``until`` is exclusive);
+        ``after_id`` returns only rows appended after that id.
+        """
+        self.flush()
+        clauses, params = ["id > ?"], [after_id]
+        if run_id is not None:
+            clauses.append("run_id = ?")
+            params.append(run_id)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(utc_timestamp(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(utc_timestamp(until))
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        sql = f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM sends WHERE {' AND '.join(clauses)} ORDER BY id"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return pd.DataFrame.from_records(rows, columns=JOURNAL_COLUMNS)
+
+    def _keyed(self, sql, keys):
+        # Run ``sql`` (with a ``{keys}`` placeholder list) over ``keys`` in chunks; ``None`` means every key
+        rows = []
+        with self._lock:
+            if keys is None:
+                return self._conn.execute(sql.format(keys="SELECT message_key FROM sends")).fetchall()
+            keys = list(keys)
+            for i in range(0, len(keys), _KEY_CHUNK):
+                chunk = keys[i:i + _KEY_CHUNK]
+                rows.extend(self._conn.execute(sql.format(keys=", ".join("?" * len(chunk))), chunk).fetchall())
+        return rows
+
+    def delivered_keys(self, keys):
+        """The subset of message ``keys`` (``None``: all keys) with a SENT record in any run."""
+        self.flush()
+        return {key for key, in self._keyed(
+            "SELECT DISTINCT message_key FROM sends WHERE status = 'SENT' AND message_key IN ({keys})", keys)}
+
+    def pending_keys(self, keys):
+        """The subset of ``keys`` whose latest record is PENDING: the SMTP outcome was never recorded."""
+        self.flush()
+        return {key for key, status in self._keyed(
+            "SELECT message_key, status FROM sends WHERE id IN"
+            " (SELECT MAX(id) FROM sends WHERE message_key IN ({keys}) GROUP BY message_key)", keys)
+            if status == "PENDING"}
+
+    def account_usage(self, since):
+        """``{account: (messages, recipients, first_sent, last_rejected)}`` over the records since ``since``.
+
+        Messages and recipients count SENT records; ``first_sent`` is the
+        oldest of them and ``last_rejected`` the latest QUOTA record (UTC
+        text, or None).
+        """
+        self.flush()
+        sql = """
+            SELECT account,
+                   SUM(status = 'SENT'),
+                   SUM(CASE WHEN status = 'SENT' AND recipients != ''
+                            THEN LENGTH(recipients) - LENGTH(REPLACE(recipients, ',', '')) + 1 ELSE 0 END),
+                   MIN(CASE WHEN status = 'SENT' THEN ts END),
+                   MAX(CASE WHEN status = 'QUOTA' THEN ts END)
+            FROM sends WHERE account IS NOT NULL AND ts >= ? GROUP BY account
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, (utc_timestamp(since),)).fetchall()
+        return {account: (messages or 0, recipients or 0, first_sent, last_rejected)
+                for account, messages, recipients, first_sent, last_rejected in rows}
+
+    def runs(self, since=None, until=None):
+        """One row per run with its status counts, newest first."""
+        self.flush()
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("r.started_at >= ?")
+            params.append(utc_timestamp(since))
+        if until is not None:
+            clauses.append("r.started_at < ?")
+            params.append(utc_timestamp(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"""
+            SELECT r.run_id, r.started_at, r.source, r.dry_run,
+                   COUNT(s.id) AS records,
+                   SUM(s.status = 'SENT') AS sent,
+                   SUM(s.status = 'FAILED') AS failed,
+                   SUM(s.status = 'SKIPPED') AS skipped,
+                   SUM(s.status = 'ALREADY_SENT') AS already_sent,
+                   SUM(s.status = 'DEFERRED') AS deferred,
+                   MAX(s.id) AS last_id
+            FROM runs r LEFT JOIN sends s ON s.run_id = r.run_id
+            {where}
+            GROUP BY r.run_id ORDER BY r.started_at DESC
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        frame = pd.DataFrame.from_records(
+            rows, columns=["run_id", "started_at", "source", "dry_run", "records", "sent", "failed", "skipped",
+                         "already_sent", "deferred", "last_id"])
+        counts = ["sent", "failed", "skipped", "already_sent", "deferred"]
+        frame[counts] = frame[counts].fillna(0).astype(int)
+        return frame
+
+
+class ResumableRun:
+    """Send each message key at most once across runs, recording state before and after SMTP.
+
+    The keys already delivered (in this or any earlier run) are looked up once
+    (``keys=None`` loads every delivered key, for callers that only learn a
+    key when rendering), so ``is_delivered`` is a set lookup per party. ``begin`` records PENDING and
+    ``finish`` records SENT/FAILED; both are committed before they return, so a
+    crash leaves at most the in-flight messages in doubt, and those (like
+    failures) are retried. ``resume=False`` sends everything again.
+    """
+
+    def __init__(self, journal, run_id, keys, resume=True):
+        self.journal = journal
+        self.run_id = run_id
+        self.delivered = journal.delivered_keys(keys) if resume else set()
+        self.in_doubt = journal.pending_keys(keys) - self.delivered
+
+    def is_delivered(self, key):
+        return key in self.delivered
+
+    def skip(self, key, party_code, party_name="", recipients=()):
+        self.journal.append(self.run_id, "ALREADY_SENT", party_code, party_name, recipients, key=key)
+
+    def begin(self, jobs):
+        """Record ``(key, party_code, party_name, recipients, message)`` jobs as PENDING in one commit."""
+        for key, party_code, party_name, recipients, message in jobs:
+            self.journal.append(self.run_id, "PENDING", party_code, party_name, recipients, message=message, key=key)
+        self.journal.flush()
+
+    def finish(self, key, party_code, party_name, recipients, error=None, latency=None, message=None, account=None):
+        self.journal.append(self.run_id, "SENT" if error is None else "FAILED", party_code, party_name, recipients,
+                            latency=latency, error=error, message=message, key=key, durable=True, account=account)
+        if error is None:
+            self.delivered.add(key)
+
+    def defer(self, key, party_code, party_name, recipients, detail=""):
+        """Record a statement left for a later run because every account's quota is used up."""
+        self.journal.append(self.run_id, "DEFERRED", party_code, party_name, recipients, detail=detail, key=key)
+
+
+class JournalReport:
+    """Journal records kept as a DataFrame and topped up with only the rows appended since the last refresh.
+
+    The journal is append-only, so ``refresh`` reads ``id > last_id`` instead of
+    the whole history; ``select`` filters the cached frame by run and date.
+    """
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.frame = pd.DataFrame(columns=JOURNAL_COLUMNS)
+        self.last_id = 0
+
+    def refresh(self):
+        new = self.journal.records(after_id=self.last_id)
+        if not new.empty:
+            self.frame = new if self.frame.empty else pd.concat([self.frame, new], ignore_index=True)
+            self.last_id = int(new["id"].iloc[-1])
+        return len(new)
+
+    def select(self, run_id=None, since=None, until=None):
+        frame = self.frame
+        mask = pd.Series(True, index=frame.index)
+        if run_id is not None:
+            mask &= frame["run_id"] == run_id
+        if since is not None:
+            mask &= frame["ts"] >= utc_timestamp(since)
+        if until is not None:
+            mask &= frame["ts"] < utc_timestamp(until)
+        return frame[mask]
+
+
+def report_frame(records):
+    """Journal records with the report's column headers."""
+    return records[list(REPORT_COLUMNS)].rename(columns=REPORT_COLUMNS).reset_index(drop=True)
+
+
+def write_report(path, records):
+    """Write journal records to ``path`` as ``.csv`` or ``.xlsx`` (constant_memory)."""
+    from .export import write_workbook
+
+    path = Path(path)
+    report = report_frame(records)
+    if path.suffix.lower() == ".csv":
+        report.to_csv(path, index=False)
+        return path
+    return write_workbook(path, [("Email Log", report)])
@@ -0,0 +1,157 @@
+"""Columnar per-party row storage for matched parties.
+
+``match_data`` used to hand every party its rows as a list of dicts (one
+Python dict and a boxed value per cell). A ``Ledger`` instead holds one
+sheet's matched rows once, reordered so each party's rows are contiguous,
+with repetitive text columns as categoricals, amounts as float64 and dates
+as datetime64 (int64 underneath). A ``PartyLedger`` is just a ``[start,
+stop)`` range into it; rendering, export and the dashboard read its
+``frame`` view directly.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+
+def compact_frame(frame, fill=None):
+    """``frame`` with text columns that repeat (at most one distinct value per two rows) as categoricals.
+
+    ``fill`` maps column -> value for missing cells, like ``fillna``.
+    """
+    columns = {}
+    for name in frame.columns:
+        column = frame[name]
+        if fill and name in fill:
+            column = column.fillna(fill[name])
+        if not (is_numeric_dtype(column.dtype) or is_datetime64_any_dtype(column.dtype)
+                or isinstance(column.dtype, pd.CategoricalDtype)):
+            if len(column) and column.nunique(dropna=True) <= len(column) // 2:
+                column = column.astype("category")
+        columns[name] = column
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def _column_arrays(column):
+    # (values, labels): categorical codes index into labels (-1, missing, hits the trailing NaN)
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        labels = np.append(column.cat.categories.to_numpy(dtype=object), np.nan)
+        return column.cat.codes.to_numpy(), labels
+    if isinstance(column.dtype, np.dtype):
+        return column.to_numpy(), None
+    # Arrow-backed text: slices convert on demand instead of keeping an object copy
+    return column.array, None
+
+
+class Ledger:
+    """One sheet's rows for ``groups`` (``(key, positions)`` pairs), each key's rows contiguous."""
+
+    def __init__(self, frame, groups, fill=None):
+        keys = [key for key, _ in groups]
+        positions = [rows for _, rows in groups]
+        order = np.concatenate(positions) if positions else np.empty(0, dtype=np.intp)
+        bounds = np.cumsum([0] + [len(rows) for rows in positions]).tolist()
+        self.frame = compact_frame(frame.take(order), fill).reset_index(drop=True)
+        self.ranges = dict(zip(keys, zip(bounds[:-1], bounds[1:])))
+        self._columns = {}
+
+    def rows(self, key):
+        """The ``PartyLedger`` of ``key`` (empty if it has no rows here)."""
+        start, stop = self.ranges.get(key, (0, 0))
+        return PartyLedger(self, start, stop)
+
+    def column(self, name, start=0, stop=None):
+        """Rows ``[start, stop)`` of column ``name`` as a numpy array, categoricals decoded.
+
+        Skips building a DataFrame view per party, which dominates rendering
+        a statement of a few dozen rows.
+        """
+        try:
+            values, labels = self._columns[name]
+        except KeyError:
+            values, labels = self._columns[name] = _column_arrays(self.frame[name])
+        values = values[start:stop]
+        if labels is not None:
+            return labels[values]
+        return values if isinstance(values, np.ndarray) else values.to_numpy()
+
+    @property
+    def nbytes(self):
+        return int(self.frame.memory_usage(index=True, deep=True).sum())
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getstate__(self):
+        # The column cache is rebuilt on demand
+        return {"frame": self.frame, "ranges": self.ranges}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._columns = {}
+
+
+class PartyLedger:
+    """One party's rows: a ``[start, stop)`` range of a shared ``Ledger``."""
+
+    __slots__ = ("ledger", "start", "stop")
+
+    def __init__(self, ledger, start, stop):
+        self.ledger = ledger
+        self.start = start
+        self.stop = stop
+
+    @classmethod
+    def from_frame(cls, frame):
+        return Ledger(frame, [(None, np.arange(len(frame)))]).rows(None)
+
+    @property
+    def frame(self):
+        """The party's rows as a DataFrame view (positional index)."""
+        return self.ledger.frame.iloc[self.start:self.stop]
+
+    @property
+    def columns(self):
+        return self.ledger.frame.columns
+
+    def column(self, name):
+        """Column ``name`` of the party's rows as a numpy array (see ``Ledger.column``)."""
+        return self.ledger.column(name, self.start, self.stop)
+
+    def plain(self):
+        """The rows with categoricals decoded to plain values.
+
+        For consumers that would otherwise ship each categorical's whole
+        dictionary with a few rows (Arrow for ``st.dataframe``).
+        """
+        frame = self.frame
+        plain = {name: object for name, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+        return frame.astype(plain).reset_index(drop=True)
+
+    def detach(self):
+        """A copy backed by a ledger of just these rows.
+
+        Pickling a ``PartyLedger`` pickles its whole shared ledger (once per
+        pickle, however many parties share it); detach entries before sending
+        a few of them to another process.
+        """
+        return PartyLedger.from_frame(self.plain())
+
+    def records(self):
+        """The rows as ``{column: value}`` dicts, the layout ``match_data`` used to return."""
+        return self.frame.to_dict(orient="records")
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def __eq__(self, other):
+        if not isinstance(other, PartyLedger):
+            return NotImplemented
+        return self.frame.reset_index(drop=True).equals(other.frame.reset_index(drop=True))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"PartyLedger({len(self)} rows)"
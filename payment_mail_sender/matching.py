@@ -0,0 +1,166 @@
+"""Party matching between the payment/debit sheets and the email directory."""
+import re
+
+import numpy as np
+import pandas as pd
+
+from .ledger import Ledger
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_name(name: str) -> str:
+    # Helper to normalize names for matching:
+    # - strip leading/trailing spaces
+    # - ignore case
+    # - ignore internal whitespace (so "123 - Sample - Amazon" == "123-Sample-Amazon")
+    if name is None:
+        return ""
+    collapsed = _WHITESPACE_RE.sub("", str(name))
+    return collapsed.strip().lower()
+
+
+def build_email_map(party_emails):
+    # Match on Party Name (Seller Name), case-insensitive and whitespace-insensitive
+    email_map = {}
+    for e in party_emails:
+        name = str(e.get("PartyName", "")).strip()
+        if not name:
+            continue
+        key = normalize_name(name)
+        email_map[key] = {
+            "to": [email.strip() for email in str(e.get("Email", "")).split(",")],
+            "cc": [cc.strip() for cc in str(e.get("CC", "")).split(",")] if "CC" in e and pd.notna(e["CC"]) else [],
+            "display_name": name,
+        }
+    return email_map
+
+
+def group_party_rows(series):
+    """Group row positions of ``series`` by their normalized party key.
+
+    Only the distinct values are normalized, so the regex work scales with the
+    number of parties instead of the number of rows. Returns ``(groups, values)``
+    where ``groups`` maps key -> ascending positional index array and ``values``
+    are the distinct string values in first-seen order.
+    """
+    codes, uniques = pd.factorize(series.astype(str), use_na_sentinel=False)
+    key_ids = {}
+    code_to_key = np.empty(len(uniques), dtype=np.intp)
+    for i, value in enumerate(uniques):
+        code_to_key[i] = key_ids.setdefault(normalize_name(value), len(key_ids))
+    row_keys = code_to_key[codes]
+    order = np.argsort(row_keys, kind="stable")
+    counts = np.bincount(row_keys, minlength=len(key_ids))
+    groups = dict(zip(key_ids, np.split(order, np.cumsum(counts)[:-1])))
+    return groups, list(uniques)
+
+
+def party_keys(series):
+    # Normalized party key per row, normalizing each distinct value once
+    codes, uniques = pd.factorize(series.astype(str), use_na_sentinel=False)
+    return pd.Series([normalize_name(value) for value in uniques], dtype=object).to_numpy()[codes]
+
+
+def party_column(df):
+    # Prefer matching by Party Name (Seller Name)
+    if 'Party Name' in df.columns:
+        return 'Party Name'
+    if 'Party Code' in df.columns:
+        return 'Party Code'
+    return None
+
+
+def _has_usable_email(email_data):
+    if email_data is None or not email_data["to"]:
+        return False
+    return not all(email.strip().lower() in ['nan', 'none', ''] for email in email_data["to"])
+
+
+def match_data(payment_df, debit_df, party_emails, reuse=None):
+    """Match both sheets against ``party_emails``.
+
+    Returns ``(matched_results, skip_log_lines, parties_without_email)``.
+    Each entry's ``payments`` and ``debits`` are ``PartyLedger`` views into
+    one ``Ledger`` per sheet, no longer lists of row dicts; callers that need
+    the old layout use ``PartyLedger.records()``. ``reuse`` holds the normalized keys of parties
+    whose rows and directory entry are unchanged since an earlier match (see
+    ``delta.reconcile``); their debit reconciliation check is not redone.
+    """
+    email_map = build_email_map(party_emails)
+    payment_df.columns = payment_df.columns.str.strip()
+    debit_df.columns = debit_df.columns.str.strip()
+    result = []
+    skip_log_lines = []
+
+    payment_party_col = party_column(payment_df)
+    debit_party_col = party_column(debit_df)
+
+    # Normalize and group each sheet once; every lookup below is a dict hit
+    payment_groups, payment_values = group_party_rows(payment_df[payment_party_col]) if payment_party_col else ({}, [])
+    debit_groups, _ = group_party_rows(debit_df[debit_party_col]) if debit_party_col else ({}, [])
+
+    # First, identify parties in payment sheet that have no email
+    parties_without_email = []
+    seen_values = set()
+    for value in payment_values:
+        party_name_val = value.strip() if isinstance(value, str) else value
+        if party_name_val in seen_values:
+            continue
+        seen_values.add(party_name_val)
+        key = normalize_name(party_name_val)
+        if not _has_usable_email(email_map.get(key)):
+            parties_without_email.append({
+                "party_code": party_name_val,
+                "party_name": party_name_val or "Unknown",
+                "payment_count": len(payment_groups[key]),
+            })
+
+    matched = []
+    payment_debits = None
+    for name_key, email_data in email_map.items():
+        party_code = email_data.get("display_name", name_key)
+        positions = payment_groups.get(name_key)
+        if positions is None:
+            skip_log_lines.append(f"SKIPPED: {party_code} — No payment rows found in Payment Sheet")
+            continue
+        if reuse and name_key in reuse:
+            matched.append((name_key, party_code, email_data))
+            continue
+
+        if payment_debits is None:
+            payment_debits = payment_df['Debit Amount'].fillna(0)
+
+        debit_positions = debit_groups.get(name_key)
+        # Only compare positive debit notes against payment debit amounts; credits are negative and excluded from this check
+        if debit_positions is not None:
+            debit_amounts = debit_df['Amount'].iloc[debit_positions]
+            total_debit_amount = debit_amounts[debit_amounts > 0].sum()
+        else:
+            total_debit_amount = 0
+        party_debit_sum = payment_debits.iloc[positions].sum()
+
+        if abs(party_debit_sum - total_debit_amount) > 0.01:
+            skip_log_lines.append(f"SKIPPED: {party_code} — Debit Amount mismatch between payment sheet and debit sheet")
+            continue
+        matched.append((name_key, party_code, email_data))
+
+    # Include ALL payment rows for this party (no filtering based on debit note matching); each party's rows
+    # are a range of one shared ledger per sheet instead of a list of row dicts
+    payment_ledger = Ledger(payment_df, [(key, payment_groups[key]) for key, _, _ in matched],
+                            fill={'Debit Amount': 0})
+    debit_ledger = Ledger(debit_df, [(key, debit_groups[key]) for key, _, _ in matched if key in debit_groups])
+    for name_key, party_code, email_data in matched:
+        result.append({
+            'party_code': party_code,
+            'emails': email_data["to"],
+            'cc_emails': email_data["cc"],
+            'payments': payment_ledger.rows(name_key),
+            'debits': debit_ledger.rows(name_key),
+        })
+
+    if skip_log_lines:
+        with open('SkippedPartiesLog.txt', 'w') as f:
+            for line in skip_log_lines:
+                f.write(line + "\n")
+    return result, skip_log_lines, parties_without_email
@@ -0,0 +1,154 @@
+"""On-disk outbox: every party's message rendered and serialized ahead of the send.
+
+``build_outbox`` renders the matched parties in a process pool and spools each
+message as a CRLF-terminated ``.eml`` file, then writes ``manifest.json``
+(recipients, message key, size, log line per message) as the commit point.
+``Outbox`` reads a spool back, so the send phase only streams bytes to SMTP and
+a spool built ahead of the send window can be reviewed first. Given the
+parties' fingerprints (``delta.party_fingerprints``), a rebuild keeps the
+messages of unchanged parties and only renders the rest.
+"""
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .compose import message_key, prepare_party_message
+from .directory import PartyDirectory
+from .matching import normalize_name
+
+MANIFEST_NAME = "manifest.json"
+_EOLS = re.compile(r"\r\n|\r|\n")
+_worker_directory = None
+
+
+def _init_worker(entries):
+    # Each worker process indexes the party directory once
+    global _worker_directory
+    _worker_directory = PartyDirectory(entries)
+
+
+def _render_batch(spool_dir, gmail_user, batch, directory=None):
+    directory = directory or _worker_directory
+    messages = []
+    for index, entry in batch:
+        recipients, message, party_name, sent_line = prepare_party_message(entry, directory, gmail_user)
+        key = message_key(entry, recipients, message)
+        # smtplib only fixes line endings of str messages; bytes go out as written, so spool them as CRLF
+        data = _EOLS.sub("\r\n", message).encode("utf-8")
+        file_name = f"{index:05d}-{key[:12]}.eml"
+        (Path(spool_dir) / file_name).write_bytes(data)
+        messages.append({
+            "party_code": entry['party_code'], "party_name": party_name, "recipients": recipients,
+            "key": key, "file": file_name, "bytes": len(data), "sent_line": sent_line,
+        })
+    return messages
+
+
+def build_outbox(spool_dir, matched_results, directory, gmail_user, workers=None, batch_size=25, source=None,
+                 fingerprints=None):
+    """Render ``matched_results`` into ``spool_dir`` and return the ``Outbox``.
+
+    ``workers=1`` (or a single batch) renders in-process. ``source`` is stored
+    in the manifest so a caller can tell which upload a spool belongs to. With
+    ``fingerprints`` (normalized party key -> digest) the messages of the
+    previous spool whose party, sender and fingerprint match are kept as they
+    are; everything else in the directory is replaced.
+    """
+    spool_dir = Path(spool_dir)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    kept = {}
+    previous = Outbox.open(spool_dir) if fingerprints is not None else None
+    if previous is not None and previous.from_addr == gmail_user:
+        for message in previous.messages:
+            fingerprint = message.get("fingerprint")
+            if (fingerprint is not None and fingerprints.get(normalize_name(message['party_code'])) == fingerprint
+                    and (spool_dir / message["file"]).exists()):
+                kept[message['party_code']] = message
+    # Without a manifest a half-built spool is never opened
+    (spool_dir / MANIFEST_NAME).unlink(missing_ok=True)
+
+    jobs = [(index, entry) for index, entry in enumerate(matched_results) if entry['party_code'] not in kept]
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(batches) <= 1:
+        rendered = [_render_batch(spool_dir, gmail_user, batch, directory) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)), initializer=_init_worker,
+                                 initargs=(directory.entries,)) as pool:
+            # Each batch carries only its parties' rows, not the shared ledgers
+            batches = [[(index, dict(entry, payments=entry['payments'].detach(), debits=entry['debits'].detach()))
+                        for index, entry in batch] for batch in batches]
+            rendered = list(pool.map(_render_batch, [spool_dir] * len(batches), [gmail_user] * len(batches), batches))
+
+    messages = {message['party_code']: message for batch in rendered for message in batch}
+    messages.update(kept)
+    messages = [messages[entry['party_code']] for entry in matched_results]
+    if fingerprints is not None:
+        for message in messages:
+            message["fingerprint"] = fingerprints.get(normalize_name(message['party_code']))
+    referenced = {message["file"] for message in messages}
+    for stale in spool_dir.glob("*.eml"):
+        if stale.name not in referenced:
+            stale.unlink()
+
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "from": gmail_user,
+        "source": source,
+        "reused": len(kept),
+        "fingerprints": fingerprints,
+        "messages": messages,
+    }
+    tmp_path = spool_dir / (MANIFEST_NAME + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    tmp_path.replace(spool_dir / MANIFEST_NAME)
+    return Outbox(spool_dir, manifest)
+
+
+class Outbox:
+    """A built spool: ``messages`` are the manifest rows, in party order."""
+
+    def __init__(self, spool_dir, manifest):
+        self.spool_dir = Path(spool_dir)
+        self.manifest = manifest
+        self.messages = manifest["messages"]
+
+    @classmethod
+    def open(cls, spool_dir):
+        """The outbox in ``spool_dir``, or None if it holds no complete spool."""
+        path = Path(spool_dir) / MANIFEST_NAME
+        if not path.exists():
+            return None
+        return cls(spool_dir, json.loads(path.read_text(encoding="utf-8")))
+
+    @property
+    def from_addr(self):
+        return self.manifest["from"]
+
+    @property
+    def source(self):
+        return self.manifest.get("source")
+
+    @property
+    def fingerprints(self):
+        """Party fingerprints the spool was built from (None if built without)."""
+        return self.manifest.get("fingerprints")
+
+    @property
+    def reused(self):
+        """Messages kept from the previous spool instead of rendered."""
+        return self.manifest.get("reused", 0)
+
+    @property
+    def total_bytes(self):
+        return sum(message["bytes"] for message in self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def read(self, message):
+        """The spooled bytes of one manifest row, ready for ``sendmail``."""
+        return (self.spool_dir / message["file"]).read_bytes()
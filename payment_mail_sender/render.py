@@ -0,0 +1,248 @@
+"""Email body rendering: EMAIL_TEMPLATE compiled once, rows formatted column-wise."""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from .ledger import PartyLedger
+
+EMAIL_TEMPLATE = """
+<html>
+  <body style="font-family: Arial, sans-serif; color: #333;">
+    <p>Dear [Party Name],</p>
+    <p>Please find below the summary of your recent transactions with us:</p>
+    <h3>Purchase & Payment Details</h3>
+    <table style="border-collapse: collapse;  width: 100%; margin-bottom: 20px;">
+      <thead>
+        <tr style="background-color: #f2f2f2; border: 2px solid #333;">
+          <th style="border: 1px solid #333; padding: 8px; ">Purchase Bill</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Main Advised No.</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Seller Advised No.</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Transaction Type</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Pur. Date</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Credit (CR)</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Debit (DR)</th>
+          <th style="border:1px solid #ddd; padding: 8px; ">Balance</th>
+        </tr>
+      </thead>
+      <tbody>
+        <!-- Dynamic payment rows inserted here -->
+      </tbody>
+    </table>
+  </body>
+</html>
+"""
+
+CLOSING_NOTE = """
+    <br><br>
+    <p><strong>🔔 Important Note:</strong> If you have any discrepancies or concerns regarding the above payment summary, please raise the issue within 7 days. No changes or claims will be entertained after this period.</p>
+    <p>Thank you for your continued partnership.</p>
+    <p>Best regards,<br><strong>Easy Sell Service Pvt. Ltd.</strong></p>
+        """
+
+_ROW_HTML = """
+        <tr style="text-align:center; border:1px solid #ccc;">
+          <td style="border:1px solid #ccc;">{}</td>
+          <td style="border:1px solid #ccc;">{}</td>
+          <td style="border:1px solid #ccc;">{}</td>
+          <td style="border:1px solid #ccc;">{}</td>
+          <td style="border:1px solid #ccc;">{}</td>
+          <td style="border:1px solid #ccc;">{}</td>
+          <td style="border:1px solid #ccc;">{}</td>
+          <td style="border:1px solid #ccc;">{}</td>
+        </tr>"""
+
+_TOTALS_HTML = """
+    <tr style="text-align:center; font-weight:bold; background-color:#f9f9f9;">
+      <td colspan="5" style="border:1px solid #ccc;">Total</td>
+      <td style="border:1px solid #ccc;">{total_credit:.2f}</td>
+      <td style="border:1px solid #ccc;">{total_debit:.2f}</td>
+      <td style="border:1px solid #ccc;">{final_balance:.2f}</td>
+    </tr>
+    <tr style="text-align:center; font-weight:bold; background-color:#f9f9f9;">
+      <td colspan="7" style="border:1px solid #ccc; text-align:right;">Bank Final Amount</td>
+      <td style="border:1px solid #ccc;">{final_balance:.2f}</td>
+    </tr>"""
+
+_NAME_SLOT = "[Party Name]"
+_ROWS_SLOT = "<!-- Dynamic payment rows inserted here -->"
+
+
+def safe_date_format(date_val):
+    """``dd/mm/yyyy`` for anything ``pd.to_datetime`` understands, ``''`` for blanks and unparseable cells."""
+    if isinstance(date_val, pd.Timestamp) and date_val is not pd.NaT:
+        return date_val.strftime('%d/%m/%Y')
+    if pd.isna(date_val) or date_val == '' or date_val is None:
+        return ''
+    try:
+        dt = pd.to_datetime(date_val)
+        return dt.strftime('%d/%m/%Y')
+    except (ValueError, TypeError):  # unparseable or out of range (NaT has no strftime either)
+        return ''
+
+
+class CompiledTemplate:
+    """A template split once into static segments around its four slots.
+
+    Slots: the party name, the payment rows, the "Bank Payment Date" paragraph
+    after ``</table>`` and the closing note before ``</body>``. Each marker must
+    appear exactly once.
+    """
+
+    __slots__ = ("segments",)
+
+    def __init__(self, template):
+        segments = []
+        rest = template
+        for marker in (_NAME_SLOT, _ROWS_SLOT, "</table>", "</body>"):
+            if rest.count(marker) != 1:
+                raise ValueError(f"Email template must contain {marker!r} exactly once")
+            head, rest = rest.split(marker)
+            segments.append(head)
+        segments.append(rest)
+        self.segments = tuple(segments)
+
+    def render(self, party_name, rows_html, payment_date_display):
+        s = self.segments
+        return "".join((
+            s[0], party_name,
+            s[1], rows_html,
+            s[2], "</table>\n<p><strong>Bank Payment Date:</strong> ", payment_date_display, "</p>",
+            s[3], CLOSING_NOTE, "</body>",
+            s[4],
+        ))
+
+
+_COMPILED = {}
+
+
+def compile_template(template=EMAIL_TEMPLATE):
+    compiled = _COMPILED.get(template)
+    if compiled is None:
+        compiled = _COMPILED[template] = CompiledTemplate(template)
+    return compiled
+
+
+def _column(rows, key, default):
+    # Ledgers and DataFrames stay columnar; row dicts become a plain list of the raw values
+    if isinstance(rows, PartyLedger):
+        return rows.column(key) if key in rows.columns else np.full(len(rows), default, dtype=object)
+    if isinstance(rows, pd.DataFrame):
+        return rows[key] if key in rows.columns else pd.Series([default] * len(rows), dtype=object)
+    return [row.get(key, default) for row in rows]
+
+
+def _object_array(values):
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=object)
+    if isinstance(values, np.ndarray):
+        return values.astype(object, copy=False)
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+def _scalar_amount(value):
+    try:
+        return float(value) if not pd.isna(value) and value != '' else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+_PLAIN_NUMBER_TYPES = (float, int, np.float64, np.int64)
+
+
+def _amounts(values):
+    # Plain numbers convert in one shot (NaN -> 0); anything else keeps the per-value rules
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'fiu':
+        plain = True
+        values = values.astype(float, copy=False)
+    elif isinstance(values, pd.Series):
+        plain = is_numeric_dtype(values.dtype) and values.dtype != bool
+        values = values.to_numpy(dtype=float, na_value=np.nan) if plain else values.tolist()
+    else:
+        plain = all(type(v) in _PLAIN_NUMBER_TYPES for v in values)
+        if plain:
+            values = np.array(values, dtype=float)
+    if plain:
+        return np.where(np.isnan(values), 0.0, values)
+    return np.fromiter((_scalar_amount(v) for v in values), dtype=float, count=len(values))
+
+
+def _text_display(values):
+    arr = _object_array(values)
+    blank = pd.isna(arr) | (arr == '')
+    return ['-' if is_blank else str(v) for v, is_blank in zip(arr.tolist(), blank.tolist())]
+
+
+def _date_display(values):
+    if isinstance(values, pd.Series) and is_datetime64_any_dtype(values.dtype) and values.dt.tz is not None:
+        formatted = values.dt.strftime('%d/%m/%Y')
+        return formatted.where(values.notna(), '-').tolist()
+    if isinstance(values, (pd.Series, np.ndarray)) and values.dtype.kind == 'M':
+        # Naive datetimes as days: datetime.date objects (None for NaT) format much faster than Timestamps
+        days = values.to_numpy(dtype='datetime64[D]') if isinstance(values, pd.Series) else values.astype('datetime64[D]')
+        return ['-' if day is None else day.strftime('%d/%m/%Y') for day in days.tolist()]
+    # Dates repeat heavily, so format each distinct value once
+    labels = {}
+    out = []
+    for v in (values.tolist() if isinstance(values, (pd.Series, np.ndarray)) else values):
+        try:
+            label = labels[v]
+        except KeyError:
+            label = labels[v] = safe_date_format(v) or '-'
+        except TypeError:  # unhashable cell
+            label = safe_date_format(v) or '-'
+        out.append(label)
+    return out
+
+
+def _amount_display(amounts):
+    return ['-' if a != a else f"{a:.2f}" for a in amounts.tolist()]
+
+
+def _latest_date(values):
+    if isinstance(values, (pd.Series, np.ndarray)):
+        values = values.tolist()
+    dates = [d for d in values if d and not pd.isna(d)]
+    if not dates:
+        return None
+    converted = pd.to_datetime(dates, errors='coerce')
+    # Python's max() over NaT is order dependent, so only take the vectorized max without NaT
+    return converted.max() if not converted.hasnans else max(converted)
+
+
+def render_email_body(party_name, payment_rows, template=EMAIL_TEMPLATE):
+    """Render the statement for ``payment_rows`` (a ``PartyLedger``, a DataFrame or a list of row dicts)."""
+    compiled = compile_template(template)
+    dr = _amounts(_column(payment_rows, 'Debit Amount', 0))
+    cr = _amounts(_column(payment_rows, 'Bank Payment', 0))
+    # Running sums are sequential (cumsum), matching a row-by-row float accumulation
+    balances = np.cumsum(cr - dr) if len(cr) else cr
+    total_credit = float(np.cumsum(cr)[-1]) if len(cr) else 0.0
+    total_debit = float(np.cumsum(dr)[-1]) if len(dr) else 0.0
+
+    rows_html = "".join([
+        _ROW_HTML.format(*cells) for cells in zip(
+            _text_display(_column(payment_rows, 'Inv. No.', '')),
+            _text_display(_column(payment_rows, 'Main Advised No.', '')),
+            _text_display(_column(payment_rows, 'Seller Advised No.', '')),
+            _text_display(_column(payment_rows, 'Transaction Type', '')),
+            _date_display(_column(payment_rows, 'Pur. Date', '')),
+            _amount_display(cr),
+            _amount_display(dr),
+            [f"{b:.2f}" for b in balances.tolist()],
+        )
+    ])
+    # Final balance = total credit - total debit (as in sheet Balance column)
+    final_balance = total_credit - total_debit
+    rows_html += _TOTALS_HTML.format(total_credit=total_credit, total_debit=total_debit, final_balance=final_balance)
+
+    payment_date_values = _column(payment_rows, 'Payment Date', None)
+    if isinstance(payment_date_values, np.ndarray) and payment_date_values.dtype.kind == 'M':
+        # Ledger dates: max over the non-NaT values, no per-row Timestamps
+        valid = payment_date_values[~np.isnat(payment_date_values)]
+        latest = pd.Timestamp(valid.max()) if len(valid) else None
+    else:
+        latest = _latest_date(payment_date_values)
+    latest_payment_date = safe_date_format(latest) or 'N/A'
+    return compiled.render(party_name, rows_html, latest_payment_date)
@@ -0,0 +1,130 @@
+"""Arrow IPC snapshots of parsed payment sheets, keyed by the source's content hash.
+
+Snapshots are uncompressed Arrow IPC files so they can be memory-mapped and
+read without re-parsing the workbook XML. ``pyarrow`` is optional: without it
+every snapshot call is a no-op and callers fall back to parsing the xlsx.
+
+Convert a directory of historical workbooks:
+
+    python -m payment_mail_sender.snapshot path/to/workbooks [--out .snapshots] [--verify]
+"""
+import argparse
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def file_digest(file_path) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def snapshot_paths(snapshot_dir, digest):
+    base = Path(snapshot_dir) / f"{digest}.v{SNAPSHOT_FORMAT_VERSION}"
+    return base.with_suffix(base.suffix + ".payments.arrow"), base.with_suffix(base.suffix + ".debits.arrow")
+
+
+def _write_table(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = path.with_suffix(".tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp_path.replace(path)  # readers never see a half-written snapshot
+
+
+def _read_table(path):
+    """The snapshot at ``path`` as a DataFrame over the memory-mapped file.
+
+    ``split_blocks`` keeps every column its own block, so numeric and date
+    columns without nulls are read-only views of the mapping instead of
+    being copied into consolidated blocks; columns with nulls (NaN/NaT) are
+    copied once. ``self_destruct`` frees the Arrow buffers as each column is
+    converted. Under copy-on-write pandas copies a view only when it is
+    modified.
+    """
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True, self_destruct=True)
+
+
+def save_snapshot(snapshot_dir, digest, payment_df, debit_df) -> bool:
+    """Persist both frames; returns False when pyarrow is missing or a column can't be stored."""
+    if pa is None:
+        return False
+    Path(snapshot_dir).mkdir(parents=True, exist_ok=True)
+    payment_path, debit_path = snapshot_paths(snapshot_dir, digest)
+    try:
+        _write_table(debit_df, debit_path)
+        _write_table(payment_df, payment_path)  # written last: its presence marks a complete snapshot
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # e.g. an object column mixing numbers and text; keep parsing xlsx for this source
+        debit_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def load_snapshot(snapshot_dir, digest):
+    """Return ``(payment_df, debit_df)`` from a snapshot, or ``None`` if there is none."""
+    if pa is None:
+        return None
+    payment_path, debit_path = snapshot_paths(snapshot_dir, digest)
+    if not payment_path.exists() or not debit_path.exists():
+        return None
+    return _read_table(payment_path), _read_table(debit_path)
+
+
+def convert_directory(source_dir, snapshot_dir, verify=False, out=sys.stdout):
+    from .ingest import parse_workbook
+
+    converted = 0
+    for path in sorted(Path(source_dir).glob("*.xlsx")):
+        if path.name.startswith("~$"):  # Excel lock files
+            continue
+        digest = file_digest(path)
+        start = time.perf_counter()
+        try:
+            payment_df, debit_df = parse_workbook(path)
+        except Exception as e:
+            print(f"FAILED  {path.name}: {e}", file=out)
+            continue
+        parse_t = time.perf_counter() - start
+        if not save_snapshot(snapshot_dir, digest, payment_df, debit_df):
+            print(f"SKIPPED {path.name}: columns not representable in Arrow", file=out)
+            continue
+        start = time.perf_counter()
+        snap_payment, snap_debit = load_snapshot(snapshot_dir, digest)
+        load_t = time.perf_counter() - start
+        if verify:
+            pd.testing.assert_frame_equal(snap_payment, payment_df)
+            pd.testing.assert_frame_equal(snap_debit, debit_df)
+        converted += 1
+        print(f"OK      {path.name}: {len(payment_df)} rows, xlsx {parse_t:.2f}s -> snapshot {load_t:.3f}s", file=out)
+    return converted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert payment workbooks into Arrow snapshots.")
+    parser.add_argument("source_dir", help="directory containing .xlsx workbooks")
+    parser.add_argument("--out", default=".snapshots", help="snapshot directory (default: .snapshots)")
+    parser.add_argument("--verify", action="store_true", help="re-read each snapshot and compare with the parsed frames")
+    args = parser.parse_args(argv)
+    if pa is None:
+        parser.error("pyarrow is required to write snapshots (pip install pyarrow)")
+    convert_directory(args.source_dir, args.out, verify=args.verify)
+
+
+if __name__ == "__main__":
+    main()
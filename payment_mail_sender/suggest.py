@@ -0,0 +1,108 @@
+"""Near-match suggestions for sellers whose name has no directory entry with an email.
+
+``SuggestionIndex`` keeps postings from character trigrams and from the
+numeric party code (``derive_code``) to directory records. A query only
+scores the records that share a code or its rarer trigrams with the seller,
+instead of comparing against the whole directory, so suggestions for every
+unmatched seller fit in a dashboard rerun.
+"""
+import re
+from collections import Counter
+
+import pandas as pd
+
+from .ingest import derive_code
+from .matching import _has_usable_email, normalize_name
+
+SUGGESTION_COLUMNS = ["Seller", "Suggested Party", "Party Code", "Email", "Confidence"]
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+# Confidence is the trigram Dice coefficient, with this share given to an equal numeric party code
+CODE_WEIGHT = 0.25
+
+
+def trigrams(name):
+    """Character trigrams of ``name`` lowercased with everything but letters and digits removed."""
+    text = _NON_ALNUM_RE.sub("", normalize_name(name))
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def numeric_code(name):
+    code = derive_code(str(name or ""))
+    return code if code.isdigit() else ""
+
+
+class SuggestionIndex:
+    """Trigram and party-code postings over the directory records that have an email.
+
+    Trigrams shared by more than ``max_postings`` records (channel suffixes
+    such as "-Amazon") don't nominate candidates but still count in the score.
+    """
+
+    def __init__(self, directory, max_postings=None):
+        self.records = [record for record in directory.records if _has_usable_email({"to": record.to_list})]
+        self.max_postings = max_postings or max(32, len(self.records) // 10)
+        self._grams = []
+        self._codes = []
+        self._by_gram = {}
+        self._by_code = {}
+        for i, record in enumerate(self.records):
+            grams = trigrams(record.name)
+            code = numeric_code(record.name)
+            self._grams.append(grams)
+            self._codes.append(code)
+            for gram in grams:
+                self._by_gram.setdefault(gram, []).append(i)
+            if code:
+                self._by_code.setdefault(code, []).append(i)
+
+    def __len__(self):
+        return len(self.records)
+
+    def candidates(self, name, limit=50):
+        """Record positions nominated by the seller's code and rare trigrams, most shared trigrams first."""
+        votes = Counter()
+        for gram in trigrams(name):
+            postings = self._by_gram.get(gram, ())
+            if len(postings) <= self.max_postings:
+                votes.update(postings)
+        code = numeric_code(name)
+        for i in self._by_code.get(code, ()) if code else ():
+            votes[i] += 1
+        return [i for i, _ in votes.most_common(limit)]
+
+    def suggest(self, name, k=3, min_confidence=0.3):
+        """Top ``k`` ``(record, confidence)`` pairs for ``name``, best first."""
+        grams = trigrams(name)
+        code = numeric_code(name)
+        scored = []
+        for i in self.candidates(name):
+            other = self._grams[i]
+            dice = 2 * len(grams & other) / (len(grams) + len(other)) if grams or other else 0.0
+            confidence = (1 - CODE_WEIGHT) * dice + (CODE_WEIGHT if code and code == self._codes[i] else 0.0)
+            if confidence >= min_confidence:
+                scored.append((confidence, i))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.records[i], round(confidence, 3)) for confidence, i in scored[:k]]
+
+
+def suggest_matches(parties_without_email, directory, k=3, min_confidence=0.3, index=None):
+    """``SUGGESTION_COLUMNS`` frame with up to ``k`` suggestions per seller, most confident sellers first."""
+    if index is None:
+        index = SuggestionIndex(directory)
+    rows = []
+    for party in parties_without_email:
+        seller = party['party_name']
+        for record, confidence in index.suggest(seller, k=k, min_confidence=min_confidence):
+            rows.append((seller, record.name, record.code, record.email, confidence))
+    frame = pd.DataFrame(rows, columns=SUGGESTION_COLUMNS)
+    best = frame.groupby("Seller", sort=False)["Confidence"].transform("max")
+    order = frame.assign(best=best).sort_values(["best", "Seller", "Confidence"], ascending=[False, True, False],
+                                                kind="stable").index
+    return frame.loc[order].reset_index(drop=True)
+
+
+def alias_entry(seller, record):
+    """Directory entry that maps ``seller`` to ``record``'s code and addresses (for ``PartyStore.upsert``)."""
+    return {"PartyCode": record.code, "PartyName": seller, "Email": record.email, "CC": record.cc}
@@ -0,0 +1,44 @@
+"""Per-party aggregates behind the dashboard's summary tables."""
+import pandas as pd
+
+from .matching import normalize_name, party_column, party_keys
+
+SUMMARY_COLUMNS = ["Party", "Rows", "Total Invoice", "CR", "DR", "Balance", "Debit Notes", "Recipients"]
+# Summary column -> payment frame column it sums
+_SUMMED = {"Total Invoice": "Total Inv. Amount", "CR": "Bank Payment", "DR": "Debit Amount"}
+
+
+def party_summary(payment_df, debit_df, matched_results):
+    """One row per matched party (in ``matched_results`` order) with its row count and totals.
+
+    Sums are grouped column-wise over the frames with the same normalized
+    keys ``match_data`` uses, instead of walking each party's record dicts.
+    """
+    entry_keys = [normalize_name(entry['party_code']) for entry in matched_results]
+    summary = pd.DataFrame({"Party": [entry['party_code'] for entry in matched_results]})
+
+    pay_col = party_column(payment_df)
+    if pay_col:
+        keys = pd.Series(party_keys(payment_df[pay_col]), index=payment_df.index)
+        summary["Rows"] = keys.value_counts(sort=False).reindex(entry_keys, fill_value=0).to_numpy()
+        present = {name: column for name, column in _SUMMED.items() if column in payment_df.columns}
+        amounts = pd.DataFrame({name: pd.to_numeric(payment_df[column], errors="coerce").fillna(0)
+                                for name, column in present.items()}, index=payment_df.index)
+        sums = amounts.groupby(keys, sort=False).sum().reindex(entry_keys, fill_value=0)
+        for name in present:
+            summary[name] = sums[name].round(2).to_numpy()
+        # The statement's Bank Final Amount: total CR minus total DR (a missing column counts as 0)
+        balance = sums.get("CR", 0.0) - sums.get("DR", 0.0)
+        summary["Balance"] = balance.round(2).to_numpy() if isinstance(balance, pd.Series) else 0.0
+    else:
+        summary["Rows"] = 0
+
+    debit_col = party_column(debit_df)
+    if debit_col and not debit_df.empty:
+        note_counts = pd.Series(party_keys(debit_df[debit_col])).value_counts(sort=False)
+        summary["Debit Notes"] = note_counts.reindex(entry_keys, fill_value=0).to_numpy()
+    else:
+        summary["Debit Notes"] = 0
+    summary["Recipients"] = [sum(1 for address in entry['emails'] + (entry.get('cc_emails') or []) if address)
+                             for entry in matched_results]
+    return summary.reindex(columns=[c for c in SUMMARY_COLUMNS if c in summary.columns])
@@ -0,0 +1,198 @@
+"""Spans and counters timing each pipeline stage, with an optional profiler dump.
+
+A ``Trace`` records one span per stage (load, match, render, each SMTP
+connect/login/send...) plus counters such as rows parsed or bytes sent, and
+serializes to JSON. A disabled trace hands out a shared no-op span, so
+instrumented code costs one method call per stage when tracing is off.
+
+Set ``PAYMENT_MAIL_PROFILE=cprofile`` (or ``pyinstrument``, if installed) to
+also profile whatever runs inside ``Trace.profile``.
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+import uuid
+import warnings
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import pyinstrument
+except ImportError:  # optional dependency
+    pyinstrument = None
+
+PROFILE_ENV = "PAYMENT_MAIL_PROFILE"
+STAGE_COLUMNS = ["Stage", "Calls", "Total (s)", "Mean (ms)", "Max (ms)", "Counters"]
+# Innermost open span; a context variable so threads and asyncio tasks each nest their own spans
+_current = ContextVar("payment_mail_span", default=None)
+
+
+class Span:
+    """One timed stage; ``add`` attaches counters that also roll up into the trace."""
+
+    __slots__ = ("trace", "name", "parent", "thread", "start", "seconds", "counters", "_token")
+
+    def __init__(self, trace, name, counters):
+        self.trace = trace
+        self.name = name
+        self.counters = counters
+        self.parent = None
+        self.seconds = None
+
+    def add(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def __enter__(self):
+        outer = _current.get()
+        self.parent = outer.name if outer is not None and outer.trace is self.trace else None
+        self._token = _current.set(self)
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        _current.reset(self._token)
+        self.trace._finish(self)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def add(self, counter, n=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """Thread-safe collection of finished spans and run-wide counters."""
+
+    def __init__(self, name="run", enabled=True):
+        self.name = name
+        self.enabled = enabled
+        self.trace_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.spans = []
+        self.counters = {}
+        self.profile_path = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def span(self, name, **counters):
+        """Context manager timing ``name``; keyword arguments are initial counters."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, counters)
+
+    def count(self, counter, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def _finish(self, span):
+        with self._lock:
+            self.spans.append(span)
+            for counter, n in span.counters.items():
+                self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def stages(self):
+        """Per-stage rows (``STAGE_COLUMNS``) in order of first completion."""
+        with self._lock:
+            spans = list(self.spans)
+        grouped = {}
+        for span in spans:
+            grouped.setdefault(span.name, []).append(span)
+        rows = []
+        for name, group in grouped.items():
+            total = sum(span.seconds for span in group)
+            counters = {}
+            for span in group:
+                for counter, n in span.counters.items():
+                    counters[counter] = counters.get(counter, 0) + n
+            rows.append({
+                "Stage": name,
+                "Calls": len(group),
+                "Total (s)": round(total, 4),
+                "Mean (ms)": round(total / len(group) * 1000, 2),
+                "Max (ms)": round(max(span.seconds for span in group) * 1000, 2),
+                "Counters": ", ".join(f"{counter}={n:,}" if isinstance(n, int) else f"{counter}={n:.3g}"
+                                      for counter, n in counters.items()),
+            })
+        return rows
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_seconds": round(time.perf_counter() - self._t0, 6),
+            "counters": counters,
+            "stages": self.stages(),
+            "spans": [{"name": span.name, "parent": span.parent, "thread": span.thread,
+                       "start": round(span.start - self._t0, 6), "seconds": round(span.seconds, 6),
+                       "counters": span.counters} for span in spans],
+            "profile": str(self.profile_path) if self.profile_path else None,
+        }
+
+    def write_json(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=1, default=str), encoding="utf-8")
+        return path
+
+    @contextmanager
+    def profile(self, stem, mode=None):
+        """Profile the block when ``mode`` (default ``$PAYMENT_MAIL_PROFILE``) names a profiler.
+
+        The dump goes to ``stem`` + ``.prof`` (cProfile, readable with
+        ``pstats``/snakeviz) or ``.html`` (pyinstrument); its path is kept in
+        ``profile_path``. Without a mode the block runs unprofiled.
+        """
+        mode = (mode if mode is not None else os.environ.get(PROFILE_ENV, "")).strip().lower()
+        if not mode:
+            yield None
+            return
+        if mode == "pyinstrument" and pyinstrument is None:
+            warnings.warn("pyinstrument is not installed; profiling with cProfile instead")
+            mode = "cprofile"
+        if mode not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"{PROFILE_ENV} must be 'cprofile' or 'pyinstrument', not {mode!r}")
+        stem = Path(stem)
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        if mode == "pyinstrument":
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+            try:
+                yield profiler
+            finally:
+                profiler.stop()
+                self.profile_path = stem.with_suffix(".html")
+                self.profile_path.write_text(profiler.output_html(), encoding="utf-8")
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield profiler
+            finally:
+                profiler.disable()
+                self.profile_path = stem.with_suffix(".prof")
+                profiler.dump_stats(self.profile_path)
+
+
+NULL_TRACE = Trace("disabled", enabled=False)
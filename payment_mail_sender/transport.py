@@ -0,0 +1,192 @@
+"""Pooled SMTP transport with token-bucket rate limiting."""
+import queue
+import smtplib
+import threading
+import time
+
+from .trace import NULL_TRACE
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``rate`` tokens per second, ``burst`` max stored.
+
+    A rate of ``None``/``0`` disables limiting. ``acquire`` reserves a token and
+    sleeps for however long the caller has to wait for it; async callers use
+    ``reserve`` and await the returned delay themselves.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate) if rate else 0.0
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Take a token now and return how long the caller must wait before using it
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+class _PooledConnection:
+    __slots__ = ("server", "bucket", "sent")
+
+    def __init__(self, per_connection_rate):
+        self.server = None
+        self.bucket = TokenBucket(per_connection_rate)
+        self.sent = 0
+
+
+class SMTPPool:
+    """A small pool of authenticated SMTP connections reused across messages.
+
+    Connections are opened lazily, logged in once and recycled after
+    ``max_messages_per_connection`` messages. A send that hits
+    ``SMTPServerDisconnected`` reconnects and retries up to ``retries`` times.
+    Connect, login, rate-limit waits and sends are timed as spans on ``trace``.
+    """
+
+    def __init__(self, user, password, host="smtp.gmail.com", port=465, size=2, use_ssl=True,
+                 rate=None, per_connection_rate=None, timeout=30, retries=2,
+                 max_messages_per_connection=None, trace=NULL_TRACE):
+        if size < 1:
+            raise ValueError("SMTP pool size must be at least 1")
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.size = size
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.retries = retries
+        self.max_messages_per_connection = max_messages_per_connection
+        self.bucket = TokenBucket(rate)
+        self.reconnects = 0
+        self.trace = trace
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(_PooledConnection(per_connection_rate))
+
+    def _connect(self, conn):
+        with self.trace.span("smtp.connect"):
+            if self.use_ssl:
+                server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+            else:
+                server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.user and self.password:
+            try:
+                with self.trace.span("smtp.login"):
+                    server.login(self.user, self.password)
+            except BaseException:
+                # Bad credentials or an auth timeout: don't leak the connected socket
+                server.close()
+                raise
+        conn.server = server
+        conn.sent = 0
+
+    @staticmethod
+    def _disconnect(conn):
+        if conn.server is not None:
+            try:
+                conn.server.quit()
+            except (smtplib.SMTPException, OSError):
+                conn.server.close()
+            conn.server = None
+
+    def _send_on(self, conn, from_addr, recipients, message):
+        limit = self.max_messages_per_connection
+        if conn.server is not None and limit and conn.sent >= limit:
+            self._disconnect(conn)
+        attempt = 0
+        while True:
+            if conn.server is None:
+                self._connect(conn)
+            try:
+                with self.trace.span("smtp.send") as span:
+                    refused = conn.server.sendmail(from_addr, recipients, message)
+                    span.add("bytes_sent", len(message))
+                conn.sent += 1
+                return refused
+            except smtplib.SMTPServerDisconnected:
+                conn.server = None
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                self.reconnects += 1
+                self.trace.count("smtp_retries")
+
+    def send(self, from_addr, recipients, message):
+        """Send one pre-built message (``str`` or ``bytes``) through an idle connection."""
+        # Waiting on the overall rate limit or a free connection, then on the connection's own limit
+        with self.trace.span("smtp.queue"):
+            self.bucket.acquire()
+            conn = self._idle.get()
+        try:
+            with self.trace.span("smtp.throttle"):
+                conn.bucket.acquire()
+            return self._send_on(conn, from_addr, recipients, message)
+        finally:
+            self._idle.put(conn)
+
+    def imap(self, jobs, timed=False):
+        """Send ``(from_addr, recipients, message, tag)`` jobs on all connections at once.
+
+        Yields ``(tag, error)`` pairs in completion order on the calling thread,
+        with ``error`` set to the raised exception or ``None`` on success. With
+        ``timed=True`` the pairs become ``(tag, error, seconds)``, the time the
+        send took including any rate-limit wait.
+        """
+        pending = queue.Queue()
+        done = queue.Queue()
+        count = 0
+        for job in jobs:
+            pending.put(job)
+            count += 1
+
+        def worker():
+            while True:
+                try:
+                    from_addr, recipients, message, tag = pending.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                try:
+                    self.send(from_addr, recipients, message)
+                    error = None
+                except Exception as e:
+                    error = e
+                done.put((tag, error, time.perf_counter() - start) if timed else (tag, error))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.size, count))]
+        for t in threads:
+            t.start()
+        for _ in range(count):
+            yield done.get()
+        for t in threads:
+            t.join()
+
+    def close(self):
+        conns = [self._idle.get() for _ in range(self.size)]
+        for conn in conns:
+            self._disconnect(conn)
+            self._idle.put(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
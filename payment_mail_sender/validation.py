@@ -0,0 +1,126 @@
+"""Columnar validation of parsed payment/debit frames: problems are collected into a table, never raised."""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_object_dtype, is_string_dtype
+
+from .matching import party_column, party_keys
+
+VIOLATION_COLUMNS = ["Check", "Severity", "Row", "Party Name", "Inv. No.", "Detail"]
+AMOUNT_COLUMNS = ("Total Inv. Amount", "Debit Amount", "Bank Payment")
+DEBIT_TOLERANCE = 0.01  # same tolerance match_data uses to skip a party
+
+
+def _present(values):
+    # Non-null and not a blank string
+    present = values.notna()
+    if is_object_dtype(values.dtype):
+        # Mixed cells: test each distinct value once (-1 = missing, maps to the trailing False)
+        codes, uniques = pd.factorize(values)
+        blank = np.array([isinstance(u, str) and not u.strip() for u in uniques] + [False], dtype=bool)
+        present &= ~blank[codes]
+    elif is_string_dtype(values.dtype):
+        present &= values.str.strip() != ""
+    return present
+
+
+def _date_column(values):
+    """Return ``(present, dates, unparseable)`` masks/values for one date column."""
+    if is_datetime64_any_dtype(values.dtype):
+        return values.notna(), values, pd.Series(False, index=values.index)
+    # Dates repeat heavily: inspect and parse each distinct cell once, each on its own like safe_date_format
+    codes, uniques = pd.factorize(values.astype(object))
+    blank = np.array([isinstance(u, str) and not u.strip() for u in uniques] + [True], dtype=bool)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce", format="mixed").to_numpy()
+    present = pd.Series(~blank[codes], index=values.index)
+    dates = pd.Series(np.append(parsed, np.datetime64("NaT"))[codes], index=values.index).where(present)
+    return present, dates, present & dates.isna()
+
+
+def _rows(check, severity, frame, mask, detail, party_col):
+    hits = frame.loc[mask]
+    return pd.DataFrame({
+        "Check": check,
+        "Severity": severity,
+        "Row": hits.index.astype(object),
+        "Party Name": hits[party_col].astype(object) if party_col else None,
+        "Inv. No.": hits["Inv. No."].astype(object) if "Inv. No." in hits.columns else None,
+        "Detail": detail(hits) if callable(detail) else detail,
+    })
+
+
+def validate_frames(payment_df, debit_df):
+    """Run every check over the parsed frames and return one row per violation.
+
+    Columns are ``VIOLATION_COLUMNS``; ``Row`` is the payment frame's index
+    label (empty for per-party checks). Severity ``error`` marks rows the old
+    guard refused or parties ``match_data`` will skip; ``warning`` is
+    informational.
+    """
+    found = []
+    party_col = party_column(payment_df)
+
+    # Invoice date == payment date, and date cells that don't parse
+    if "Pur. Date" in payment_df.columns and "Payment Date" in payment_df.columns:
+        inv, pay = payment_df["Pur. Date"], payment_df["Payment Date"]
+        inv_present, inv_dates, inv_bad = _date_column(inv)
+        pay_present, pay_dates, pay_bad = _date_column(pay)
+        same_date = inv_dates.notna() & (inv_dates == pay_dates)
+        # Cells that aren't dates are compared as text, like the old guard
+        as_text = inv_present & pay_present & (inv_dates.isna() | pay_dates.isna())
+        same_text = pd.Series(False, index=payment_df.index)
+        same_text[as_text] = inv[as_text].astype(str).str.strip() == pay[as_text].astype(str).str.strip()
+        found.append(_rows("Invoice date equals payment date", "error", payment_df, same_date | same_text,
+                           lambda hits: [f"Pur. Date and Payment Date are both {v}" for v in hits["Pur. Date"].tolist()],
+                           party_col))
+        for column, bad in (("Pur. Date", inv_bad), ("Payment Date", pay_bad)):
+            found.append(_rows("Unparseable date", "warning", payment_df, bad,
+                               lambda hits, column=column: [f"{column} {v!r}" for v in hits[column].tolist()],
+                               party_col))
+
+    # Negative amounts
+    for column in AMOUNT_COLUMNS:
+        if column in payment_df.columns:
+            amounts = pd.to_numeric(payment_df[column], errors="coerce")
+            found.append(_rows("Negative amount", "warning", payment_df, amounts < 0,
+                               lambda hits, amounts=amounts, column=column:
+                               [f"{column} {a:.2f}" for a in amounts[hits.index].tolist()],
+                               party_col))
+
+    # Duplicate bill numbers within a party
+    if party_col and "Inv. No." in payment_df.columns:
+        bills = payment_df["Inv. No."].astype(str).str.strip()
+        has_bill = _present(payment_df["Inv. No."]) & (bills.str.lower() != "nan")
+        keyed = pd.DataFrame({"key": party_keys(payment_df[party_col]), "bill": bills}, index=payment_df.index)[has_bill]
+        counts = keyed.groupby(["key", "bill"], sort=False)["bill"].transform("size")
+        duplicate = pd.Series(False, index=payment_df.index)
+        duplicate[counts.index[counts > 1]] = True
+        found.append(_rows("Duplicate bill number", "warning", payment_df, duplicate,
+                           lambda hits: [f"Inv. No. appears {n} times for this party" for n in counts[hits.index].tolist()],
+                           party_col))
+
+    # DR total per party vs its positive debit notes (the comparison match_data skips parties on)
+    debit_party_col = party_column(debit_df)
+    if party_col and debit_party_col and "Debit Amount" in payment_df.columns and "Amount" in debit_df.columns:
+        pay_keys = party_keys(payment_df[party_col])
+        pay_dr = pd.to_numeric(payment_df["Debit Amount"], errors="coerce").fillna(0)
+        pay_sum = pay_dr.groupby(pay_keys, sort=False).sum()
+        note_amounts = pd.to_numeric(debit_df["Amount"], errors="coerce")
+        note_sum = note_amounts.where(note_amounts > 0, 0).groupby(party_keys(debit_df[debit_party_col]), sort=False).sum()
+        note_sum = note_sum.reindex(pay_sum.index, fill_value=0)
+        mismatched = (pay_sum - note_sum).abs() > DEBIT_TOLERANCE
+        names = payment_df[party_col].groupby(pay_keys, sort=False).first()
+        keys = pay_sum.index[mismatched]
+        found.append(pd.DataFrame({
+            "Check": "Debit total mismatch",
+            "Severity": "error",
+            "Row": None,
+            "Party Name": names[keys].astype(object).to_numpy(),
+            "Inv. No.": None,
+            "Detail": [f"Debit Amount total {p:.2f} vs debit notes {n:.2f}"
+                       for p, n in zip(pay_sum[keys].tolist(), note_sum[keys].tolist())],
+        }))
+
+    found = [frame for frame in found if not frame.empty]
+    if not found:
+        return pd.DataFrame(columns=VIOLATION_COLUMNS)
+    return pd.concat(found, ignore_index=True)[VIOLATION_COLUMNS]
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from bench_accounts import FROM_ADDR, accounts_for, messages
+from payment_mail_sender.accounts import QUOTA_WINDOW, QuotaExhausted, QuotaScheduler, is_quota_rejection
+from payment_mail_sender.journal import ResumableRun, SendJournal
+from smtp_sink import SMTPSink
+
+FIRST, SECOND = "sender0@example.com", "sender1@example.com"
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = SendJournal(tmp_path / "journal.db")
+    yield journal
+    journal.close()
+
+
+def run(journal, accounts, jobs, now=None):
+    """One journalled run; returns the scheduler and ``{key: (account, error)}``."""
+    run_id = journal.start_run(source="test")
+    send_run = ResumableRun(journal, run_id, [key for key, _, _ in jobs])
+    todo = [job for job in jobs if not send_run.is_delivered(job[0])]
+    send_run.begin([(key, key, "", recipients, message) for key, recipients, message in todo])
+    scheduler = QuotaScheduler(accounts, journal, run_id, now=now)
+    results = {}
+    for (key, recipients, message), account, error in scheduler.imap(
+            (FROM_ADDR, recipients, message, (key, recipients, message)) for key, recipients, message in todo):
+        if isinstance(error, QuotaExhausted):
+            send_run.defer(key, key, "", recipients, str(error))
+        else:
+            send_run.finish(key, key, "", recipients, error, message=message, account=account)
+        results[key] = (account, error)
+    return scheduler, results
+
+
+def outcome(results):
+    counts = {"sent": 0, "failed": 0, "deferred": 0}
+    for _, error in results.values():
+        counts["sent" if error is None else "deferred" if isinstance(error, QuotaExhausted) else "failed"] += 1
+    return counts
+
+
+def test_refused_account_reroutes_to_the_next(journal):
+    jobs = messages(12)
+    # The server refuses FIRST after 3 messages although the journal allows 10
+    with SMTPSink(quota={FIRST: 3, SECOND: 10}) as sink:
+        scheduler, results = run(journal, accounts_for(sink, [FIRST, SECOND], 10, None), jobs)
+        assert outcome(results) == {"sent": 12, "failed": 0, "deferred": 0}
+        assert sink.rejected == 1
+        assert sink.usage[FIRST][0] == 3 and sink.usage[SECOND][0] == 9
+    assert [account for account, _ in results.values()].count(SECOND) == 9
+    assert scheduler.quotas[0].exhausted
+    usage = journal.account_usage(datetime.now(timezone.utc) - QUOTA_WINDOW)
+    assert usage[FIRST][0] == 3 and usage[FIRST][3] is not None  # the refusal is journalled as QUOTA
+    assert len(journal.delivered_keys(None)) == 12
+
+
+def test_refusal_exhausts_the_account_for_a_window(journal):
+    with SMTPSink(quota={FIRST: 2}) as sink:
+        accounts = accounts_for(sink, [FIRST], 10, None)
+        _, results = run(journal, accounts, messages(5))
+        assert outcome(results) == {"sent": 2, "failed": 0, "deferred": 3}
+        refused = sink.rejected
+        # The next run trusts the refusal over the journal's count and never reaches the server
+        scheduler, results = run(journal, accounts, messages(5))
+        assert outcome(results) == {"sent": 0, "failed": 0, "deferred": 3}
+        assert sink.rejected == refused
+    assert scheduler.capacity()[0]["Messages Left"] == 0
+    assert scheduler.next_window() > datetime.now(timezone.utc) + QUOTA_WINDOW - timedelta(minutes=1)
+
+
+def test_failed_send_releases_its_quota(journal):
+    jobs = messages(6)
+    # Job 0 has a single recipient, which the server does not know: a failure, not a quota refusal
+    with SMTPSink(refuse=["party0@example.com"]) as sink:
+        scheduler, results = run(journal, accounts_for(sink, [FIRST], 4, None), jobs)
+        assert sink.rejected == 0
+    account, error = results["0"]
+    assert error is not None and not isinstance(error, QuotaExhausted) and not is_quota_rejection(error)
+    # The failure gave its message back, so 4 others still fit the quota of 4
+    assert outcome(results) == {"sent": 4, "failed": 1, "deferred": 1}
+    assert scheduler.quotas[0].messages == 0
+    assert not scheduler.quotas[0].exhausted
+
+
+def test_resume_after_exhaustion(journal):
+    jobs = messages(7)
+    with SMTPSink() as sink:
+        accounts = accounts_for(sink, [FIRST, SECOND], 2, None)
+        _, results = run(journal, accounts, jobs)
+        assert outcome(results) == {"sent": 4, "failed": 0, "deferred": 3}
+        deferred = {key for key, (_, error) in results.items() if error is not None}
+        # Same day: the journal's usage fills both quotas, nothing is sent
+        _, results = run(journal, accounts, jobs)
+        assert outcome(results) == {"sent": 0, "failed": 0, "deferred": 3}
+        assert set(results) == deferred
+        # A window later the quotas are free again; only what was deferred is sent
+        later = datetime.now(timezone.utc) + QUOTA_WINDOW + timedelta(minutes=1)
+        _, results = run(journal, accounts, jobs, now=later)
+        assert set(results) == deferred
+        assert outcome(results) == {"sent": 3, "failed": 0, "deferred": 0}
+        assert sink.messages == 7
+    assert len(journal.delivered_keys(None)) == 7
+
+
+def test_allot_defers_past_the_journal_quota(journal):
+    with SMTPSink() as sink:
+        accounts = accounts_for(sink, [FIRST], 3, None)
+        run(journal, accounts, messages(2))
+    scheduler = QuotaScheduler(accounts, journal, journal.start_run(source="test"))
+    fits, deferred = scheduler.allot(FIRST, [([f"party{i}@example.com"], i) for i in range(3)])
+    assert fits == [0]
+    assert [tag for tag, _ in deferred] == [1, 2]
+    assert all(isinstance(error, QuotaExhausted) for _, error in deferred)
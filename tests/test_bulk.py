@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from payment_mail_sender.accounts import QuotaExhausted, is_quota_rejection
+from payment_mail_sender.bulk import bulk_send, open_connection
+from smtp_sink import SMTPSink
+
+MESSAGE = b"From: ap@example.com\r\nTo: party@example.com\r\nSubject: Statement\r\n\r\nBody\r\n"
+
+
+def entries(count):
+    return [{"party_code": f"P{i}", "recipients": [f"party{i}@example.com"]} for i in range(count)]
+
+
+def render(entry):
+    return "ap@example.com", entry["recipients"], MESSAGE
+
+
+def connector(sink):
+    return lambda: open_connection("ap@example.com", "secret", host="127.0.0.1", port=sink.port, use_ssl=False)
+
+
+def run(todo, render, connect, **options):
+    results, skipped = [], []
+    options.setdefault("on_result", lambda entry, error, done, total, elapsed, latency:
+                       results.append((entry["party_code"], error, done, total)))
+    options.setdefault("on_skip", lambda entry, done, total, elapsed: skipped.append((entry["party_code"], done, total)))
+    counts = asyncio.run(bulk_send(todo, render, connect, **options))
+    return counts, results, skipped
+
+
+def test_sends_every_entry():
+    with SMTPSink() as sink:
+        counts, results, skipped = run(entries(12), render, connector(sink), concurrency=3)
+    assert counts == (12, 0)
+    assert sink.messages == 12
+    assert sorted(code for code, *_ in results) == sorted(f"P{i}" for i in range(12))
+    assert [done for *_, done, _ in results] == list(range(1, 13))
+    assert not skipped
+
+
+def test_unrendered_entries_still_reach_total():
+    with SMTPSink() as sink:
+        counts, results, skipped = run(entries(6), lambda entry: None if entry["party_code"] in ("P1", "P4") else
+                                       render(entry), connector(sink), concurrency=2)
+    assert counts == (4, 0)
+    assert [code for code, *_ in skipped] == ["P1", "P4"]
+    # The last callback, whichever kind, reports done == total
+    assert max([done for *_, done, _ in results] + [done for _, done, _ in skipped]) == 6
+
+
+def test_skip_list_is_not_sent():
+    with SMTPSink() as sink:
+        counts, results, _ = run(entries(5), render, connector(sink), skip={"P0", "P2"})
+    assert counts == (3, 0)
+    assert {code for code, *_ in results} == {"P1", "P3", "P4"}
+    assert all(total == 3 for *_, total in results)
+
+
+def test_render_errors_are_failures():
+    def failing(entry):
+        if entry["party_code"] == "P2":
+            raise ValueError("bad row")
+        return render(entry)
+
+    with SMTPSink() as sink:
+        counts, results, _ = run(entries(4), failing, connector(sink))
+    assert counts == (3, 1)
+    assert [str(error) for code, error, *_ in results if code == "P2"] == ["bad row"]
+
+
+def test_connect_error_cancels_the_run():
+    def connect():
+        raise ConnectionRefusedError("no route")
+
+    # Enough entries to fill the rendered queue, so produce() would block without the cancel
+    with pytest.raises(ConnectionRefusedError):
+        asyncio.run(asyncio.wait_for(bulk_send(entries(50), render, connect, concurrency=2), timeout=10))
+
+
+def test_quota_rejection_defers_the_rest():
+    with SMTPSink(quota=3) as sink:
+        counts, results, _ = run(entries(8), render, connector(sink), concurrency=1)
+    assert counts == (3, 0)  # refusals and deferrals are not failures
+    errors = [error for _, error, *_ in results]
+    assert errors[:3] == [None] * 3
+    assert is_quota_rejection(errors[3])
+    assert all(isinstance(error, QuotaExhausted) for error in errors[4:])
+    # Only the first refused message reached the server
+    assert sink.rejected == 1
@@ -0,0 +1,54 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from bench_matching import make_workload
+from payment_mail_sender.cache import IngestCache, approx_size
+from payment_mail_sender.delta import reconcile
+from payment_mail_sender.matching import match_data
+
+
+@pytest.fixture
+def no_pickling(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("approx_size must not pickle")
+
+    monkeypatch.setattr(pickle, "dumps", refuse)
+
+
+def test_frames_are_sized_by_memory_usage(no_pickling):
+    frame = pd.DataFrame({"name": ["a" * 100] * 1000, "amount": 1.5})
+    assert approx_size(frame) == frame.memory_usage(index=True, deep=True).sum()
+    pair_bytes = approx_size((frame, frame.copy()))
+    assert 2 * approx_size(frame) <= pair_bytes < 2 * approx_size(frame) + 100  # plus the tuple itself
+
+
+def test_reconciliation_reports_its_ledgers(no_pickling):
+    reconciliation = reconcile(*make_workload(5_000, 200))
+    ledgers = {id(rows.ledger): rows.ledger for entry in reconciliation.matched_results
+               for rows in (entry['payments'], entry['debits'])}
+    assert len(ledgers) == 2  # one per sheet, shared by every party
+    ledger_bytes = sum(ledger.nbytes for ledger in ledgers.values())
+    assert ledger_bytes < approx_size(reconciliation) < 2 * ledger_bytes
+
+
+def test_match_results_count_a_shared_ledger_once(no_pickling):
+    matched_results, _, _ = match_data(*make_workload(5_000, 200))
+    ledger = matched_results[0]['payments'].ledger
+    single = approx_size([matched_results[0]])
+    assert ledger.nbytes < single
+    assert approx_size(matched_results) < single + approx_size(matched_results[1]['debits'].ledger) + 500 * len(matched_results)
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    frame = pd.DataFrame({"amount": range(1000)})
+    size = approx_size(frame)
+    cache = IngestCache(max_bytes=int(size * 2.5))
+    for key in "abc":
+        cache.get_or_compute(key, frame.copy)
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.get_or_compute("c", lambda: pytest.fail("c should be cached")) is not None
+    cache.get_or_compute("a", frame.copy)
+    assert cache.misses == 4 and cache.hits == 1
+    assert cache.current_bytes == 2 * size
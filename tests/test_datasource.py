@@ -0,0 +1,83 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from bench_db_source import populate_standin
+from payment_mail_sender.datasource import (
+    ConnectionPool, build_payment_query, create_standin, iter_raw_chunks, load_database, sqlite_connector,
+)
+from payment_mail_sender.ingest import load_excel
+from workload import write_vendor_workbook
+
+ROWS, PARTIES, SEED = 300, 20, 3
+
+
+@pytest.fixture
+def standin(tmp_path):
+    db_path = tmp_path / "easysell.db"
+    populate_standin(db_path, ROWS, PARTIES, SEED)
+    with ConnectionPool(sqlite_connector(db_path), size=2) as pool:
+        yield pool
+
+
+@pytest.fixture
+def workbook_frames(tmp_path):
+    return load_excel(write_vendor_workbook(tmp_path / "payments.xlsx", ROWS, PARTIES, seed=SEED))
+
+
+def assert_frames_equal(actual, expected):
+    pd.testing.assert_frame_equal(actual[0], expected[0])
+    pd.testing.assert_frame_equal(actual[1], expected[1])
+
+
+@pytest.mark.parametrize("chunk_size", [ROWS * 2, ROWS, 100, 37], ids=["one chunk", "exact", "even", "uneven"])
+def test_database_matches_workbook(standin, workbook_frames, chunk_size):
+    query, params = build_payment_query()
+    assert_frames_equal(load_database(standin, query, params, chunk_size=chunk_size), workbook_frames)
+
+
+def test_chunks_continue_the_index(standin):
+    query, params = build_payment_query()
+    chunks = list(iter_raw_chunks(standin, query, params, chunk_size=37))
+    assert [len(chunk) for chunk in chunks] == [37] * (ROWS // 37) + [ROWS % 37]
+    assert pd.concat(chunks).index.equals(pd.RangeIndex(ROWS))
+
+
+def test_filtered_query_matches_filtered_workbook(standin, workbook_frames):
+    query, params = build_payment_query(advised_no="ADV00002")
+    payment_df, debit_df = load_database(standin, query, params, chunk_size=16)
+    expected = workbook_frames[0][workbook_frames[0]["Main Advised No."] == "ADV00002"]
+    assert len(payment_df) == 50
+    pd.testing.assert_frame_equal(payment_df.reset_index(drop=True), expected.reset_index(drop=True))
+    assert set(debit_df["Return Invoice No."].str.replace(" (CR)", "", regex=False)) <= set(payment_df["Inv. No."])
+
+
+def test_empty_result(standin):
+    query, params = build_payment_query(advised_no="NO-SUCH-ADVICE")
+    chunks = list(iter_raw_chunks(standin, query, params, chunk_size=37))
+    assert len(chunks) == 1 and chunks[0].empty
+    assert "Seller Name" in chunks[0].columns
+    payment_df, debit_df = load_database(standin, query, params, chunk_size=37)
+    assert payment_df.empty and debit_df.empty
+    assert list(payment_df.columns) == list(load_database(standin, *build_payment_query())[0].columns)
+    assert list(debit_df.columns) == ["Party Code", "Party Name", "Date", "Return Invoice No.", "Amount"]
+
+
+def test_empty_table(tmp_path):
+    db_path = create_standin(tmp_path / "empty.db")
+    with ConnectionPool(sqlite_connector(db_path)) as pool:
+        payment_df, debit_df = load_database(pool, *build_payment_query())
+    assert payment_df.empty and debit_df.empty
+
+
+def test_pool_reuses_and_drops_broken_connections(standin):
+    query, params = build_payment_query()
+    load_database(standin, query, params)
+    load_database(standin, query, params)
+    assert standin.opened == 1
+    with pytest.raises(sqlite3.OperationalError):
+        load_database(standin, "SELECT * FROM NoSuchTable")
+    # The connection that raised was closed, not returned to the pool
+    load_database(standin, query, params)
+    assert standin.opened == 2
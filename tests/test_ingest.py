@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from bench_load_excel import legacy_load_excel
+from payment_mail_sender.ingest import load_excel
+from workload import VENDOR_HEADERS, vendor_rows, write_legacy_workbook
+
+
+def write_sheet(path, rows=200, parties=15, summary_header=True, total_row=True, drop=(), cell=None, **row_options):
+    """A vendor export like ``write_vendor_workbook``, with columns dropped or cells rewritten by ``cell``."""
+    keep = [i for i, header in enumerate(VENDOR_HEADERS) if header not in drop]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Payment Details")
+    if summary_header:
+        ws.append(["Seller Name: ALL SELLERS    Advised No: ADV-2025-01"])
+        ws.append([])
+    ws.append([VENDOR_HEADERS[i] for i in keep])
+    for n, row in enumerate(vendor_rows(rows, parties, **row_options)):
+        if cell is not None:
+            row = [cell(n, VENDOR_HEADERS[i], value) for i, value in enumerate(row)]
+        ws.append([row[i] for i in keep])
+    if total_row:
+        total = [None] * len(keep)
+        total[[VENDOR_HEADERS[i] for i in keep].index("Bill No")] = "Total"
+        ws.append(total)
+    wb.save(path)
+    return path
+
+
+def as_text(n, header, value):
+    # Amounts exported as text, some of them not numbers at all
+    if header in ("CR", "DR", "Total With Tax") and value is not None:
+        return "n/a" if n % 17 == 0 else f"{value:.2f}"
+    return value
+
+
+SHAPES = {
+    "summary header and total row": {},
+    "no summary header": {"summary_header": False},
+    "no trailing total row": {"total_row": False},
+    "no CR column": {"drop": ("CR",)},
+    "no total columns": {"drop": ("Total With Tax", "Zoho Total With Tax", "Total Without Tax")},
+    "text-typed amounts": {"cell": as_text},
+    "empty DR and CR": {"dr_ratio": 0.0, "cr_ratio": 0.0},
+    "DR only": {"cr_ratio": 0.0},
+}
+
+
+@pytest.mark.parametrize("shape", SHAPES, ids=list(SHAPES))
+@pytest.mark.parametrize("chunk_rows", [None, 37], ids=["whole", "streamed"])
+def test_load_excel_matches_legacy(tmp_path, shape, chunk_rows):
+    path = write_sheet(tmp_path / "vendor.xlsx", **SHAPES[shape])
+    payment_df, debit_df = load_excel(path, chunk_rows=chunk_rows)
+    legacy_payment, legacy_debit = legacy_load_excel(path)
+    pd.testing.assert_frame_equal(payment_df, legacy_payment)
+    pd.testing.assert_frame_equal(debit_df, legacy_debit)
+    assert len(payment_df) == 200
+
+
+def test_load_excel_legacy_two_sheet_format(tmp_path):
+    path = write_legacy_workbook(tmp_path / "legacy.xlsx", 120, 10)
+    for new, old in zip(load_excel(path), legacy_load_excel(path)):
+        pd.testing.assert_frame_equal(new, old)
+
+
+def test_load_excel_reports_missing_columns(tmp_path):
+    path = write_sheet(tmp_path / "vendor.xlsx", drop=("Bill No", "Main Advised No"), total_row=False)
+    with pytest.raises(ValueError, match="Bill No, Main Advised No"):
+        load_excel(path)
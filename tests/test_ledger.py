@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from bench_export import assert_same_sheets
+from bench_matching import legacy_match_data
+from payment_mail_sender.export import party_frames, write_partywise_workbook, write_partywise_zip
+from payment_mail_sender.ingest import normalize_vendor_frame
+from payment_mail_sender.ledger import PartyLedger
+from payment_mail_sender.matching import match_data
+from payment_mail_sender.render import render_email_body
+from payment_mail_sender.summary import party_summary
+from workload import VENDOR_HEADERS, party_names, vendor_rows
+
+
+@pytest.fixture(scope="module")
+def results():
+    """The same vendor sheet matched by ``match_data`` (ledgers) and the baseline (row dicts)."""
+    raw = pd.DataFrame(list(vendor_rows(1_500, 30)), columns=VENDOR_HEADERS)
+    for column in ("Invoice Date", "Payment Date"):
+        raw[column] = pd.to_datetime(raw[column])
+    payment_df, debit_df = normalize_vendor_frame(raw)
+    party_emails = [{"PartyName": name, "Email": f"vendor{i}@example.com", "CC": ""}
+                    for i, name in enumerate(party_names(30))]
+    ledgers, _, _ = match_data(payment_df.copy(), debit_df.copy(), party_emails)
+    baseline, _, _ = legacy_match_data(payment_df.copy(), debit_df.copy(), party_emails)
+    return payment_df, debit_df, ledgers, sorted(baseline, key=lambda entry: entry['party_code'])
+
+
+def by_party(entries):
+    return {entry['party_code']: entry for entry in entries}
+
+
+def test_records_equal_baseline_row_dicts(results):
+    _, _, ledgers, baseline = results
+    assert len(ledgers) == len(baseline) == 30
+    old = by_party(baseline)
+    for entry in ledgers:
+        assert isinstance(entry['payments'], PartyLedger)
+        assert entry['payments'].records() == old[entry['party_code']]['payments']
+        assert entry['debits'].records() == old[entry['party_code']]['debits']
+
+
+def test_render_accepts_both_shapes(results):
+    _, _, ledgers, baseline = results
+    old = by_party(baseline)
+    for entry in ledgers:
+        name = entry['party_code']
+        assert render_email_body(name, entry['payments']) == render_email_body(name, old[name]['payments'])
+
+
+def test_summary_accepts_both_shapes(results):
+    payment_df, debit_df, ledgers, _ = results
+    # Same entries in the same order, once with ledgers and once with row dicts
+    as_dicts = [dict(entry, payments=entry['payments'].records(), debits=entry['debits'].records())
+                for entry in ledgers]
+    pd.testing.assert_frame_equal(party_summary(payment_df, debit_df, ledgers),
+                                  party_summary(payment_df, debit_df, as_dicts))
+
+
+def test_export_accepts_both_shapes(results, tmp_path):
+    _, _, ledgers, _ = results
+    as_dicts = [dict(entry, payments=entry['payments'].records(), debits=entry['debits'].records())
+                for entry in ledgers]
+    from_ledgers = write_partywise_workbook(tmp_path / "ledgers.xlsx", party_frames(ledgers))
+    from_dicts = write_partywise_workbook(tmp_path / "dicts.xlsx", party_frames(as_dicts))
+    assert_same_sheets(pd.read_excel(from_dicts, sheet_name=None), pd.read_excel(from_ledgers, sheet_name=None))
+    zipped = write_partywise_zip(tmp_path / "dicts.zip", party_frames(as_dicts[:3]), workers=1)
+    assert zipped.stat().st_size > 0
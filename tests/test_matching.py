@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from bench_matching import _canonical, legacy_match_data, make_workload
+from payment_mail_sender.matching import match_data
+
+
+def both(payment_df, debit_df, party_emails):
+    new = match_data(payment_df.copy(), debit_df.copy(), party_emails)
+    old = legacy_match_data(payment_df.copy(), debit_df.copy(), party_emails)
+    return _canonical(new), _canonical(old)
+
+
+@pytest.mark.parametrize("rows,parties,seed", [(50, 5, 1), (1_000, 70, 42), (2_000, 150, 7)])
+def test_matches_baseline(rows, parties, seed):
+    new, old = both(*make_workload(rows, parties, seed=seed))
+    assert new == old
+    assert new[0]  # the workload matches parties, so the comparison is not vacuous
+
+
+def test_debit_mismatch_is_skipped_like_baseline():
+    payment_df, debit_df, party_emails = make_workload(500, 20)
+    debit_df.loc[0, "Amount"] += 1
+    new, old = both(payment_df, debit_df, party_emails)
+    assert new == old
+    assert any("Debit Amount mismatch" in line for line in new[1])
+
+
+def test_empty_debit_sheet_matches_baseline():
+    payment_df, _, party_emails = make_workload(300, 10)
+    payment_df["Debit Amount"] = 0.0
+    debit_df = pd.DataFrame(columns=["Party Name", "Party Code", "Date", "Return Invoice No.", "Amount"])
+    new, old = both(payment_df, debit_df, party_emails)
+    assert new == old
+    assert all(entry["debits"] == [] for entry in new[0])
+
+
+def test_directory_without_cc_and_blank_emails_matches_baseline():
+    payment_df, debit_df, party_emails = make_workload(400, 12)
+    party_emails = [{"PartyName": e["PartyName"], "Email": "" if i % 4 == 0 else e["Email"]}
+                    for i, e in enumerate(party_emails)]
+    new, old = both(payment_df, debit_df, party_emails)
+    assert new == old
+    assert new[2]
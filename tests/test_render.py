@@ -0,0 +1,41 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from bench_render import PARTY_EMAILS, legacy_generate_email_body, payment_rows
+from payment_mail_sender.render import render_email_body, safe_date_format
+
+
+@pytest.mark.parametrize("value,expected", [
+    (pd.Timestamp("2025-03-01"), "01/03/2025"),
+    (datetime(2025, 3, 1, 14, 30), "01/03/2025"),
+    (date(2025, 3, 1), "01/03/2025"),
+    ("2025-03-01", "01/03/2025"),
+    ("", ""),
+    (None, ""),
+    (float("nan"), ""),
+    (pd.NaT, ""),
+    ("not a date", ""),
+    ("31/02/2024", ""),
+    (10 ** 30, ""),
+    (object(), ""),
+])
+def test_safe_date_format(value, expected):
+    assert safe_date_format(value) == expected
+
+
+def test_safe_date_format_lets_interrupts_through(monkeypatch):
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(pd, "to_datetime", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        safe_date_format("2025-03-01")
+
+
+@pytest.mark.parametrize("count", [1, 10, 500])
+def test_render_matches_legacy(count):
+    rows = payment_rows(count)
+    assert render_email_body("101-VENDOR 1-Amazon", rows) == legacy_generate_email_body(
+        "101-vendor 1-amazon", rows, [], PARTY_EMAILS)
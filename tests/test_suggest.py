@@ -0,0 +1,28 @@
+from payment_mail_sender.directory import PartyDirectory
+from payment_mail_sender.suggest import SuggestionIndex, suggest_matches
+
+ENTRIES = [
+    {"PartyCode": "731", "PartyName": "731-AUROMIN-Amazon", "Email": "auromin@example.com", "CC": ""},
+    {"PartyCode": "512", "PartyName": "512-KALPANA TEXTILES-Amazon", "Email": "kalpana@example.com", "CC": ""},
+    {"PartyCode": "640", "PartyName": "640-NO EMAIL-Amazon", "Email": "", "CC": ""},
+]
+SELLERS = [{"party_code": "731-AUROMIN-Flipkart", "party_name": "731-AUROMIN-Flipkart", "payment_count": 4},
+           {"party_code": "512 - Kalpana Textile - Amazon", "party_name": "512 - Kalpana Textile - Amazon",
+            "payment_count": 2}]
+
+
+def test_suggests_the_closest_directory_entry():
+    suggestions = suggest_matches(SELLERS, PartyDirectory(ENTRIES))
+    best = suggestions.drop_duplicates("Seller").set_index("Seller")["Suggested Party"]
+    assert best["731-AUROMIN-Flipkart"] == "731-AUROMIN-Amazon"
+    assert best["512 - Kalpana Textile - Amazon"] == "512-KALPANA TEXTILES-Amazon"
+    # Entries without an email are never suggested
+    assert "640-NO EMAIL-Amazon" not in set(suggestions["Suggested Party"])
+
+
+def test_caller_supplied_empty_index_is_used():
+    empty = SuggestionIndex(PartyDirectory([]))
+    assert len(empty) == 0
+    # An empty index is falsy but still the caller's choice; the directory is not indexed instead
+    suggestions = suggest_matches(SELLERS, PartyDirectory(ENTRIES), index=empty)
+    assert suggestions["Suggested Party"].dropna().empty
@@ -0,0 +1,68 @@
+import re
+
+import pandas as pd
+import pytest
+
+from payment_mail_sender.ingest import normalize_vendor_frame
+from payment_mail_sender.matching import match_data
+from payment_mail_sender.render import render_email_body
+from payment_mail_sender.summary import party_summary
+from workload import LEGACY_DEBIT_HEADERS, LEGACY_PAYMENT_HEADERS, VENDOR_HEADERS, legacy_rows, party_names, vendor_rows
+
+_TOTALS_RE = re.compile(r">Total</td>\s*<td[^>]*>(-?[\d.]+)</td>\s*<td[^>]*>(-?[\d.]+)</td>\s*<td[^>]*>(-?[\d.]+)</td>")
+_FINAL_RE = re.compile(r"Bank Final Amount</td>\s*<td[^>]*>(-?[\d.]+)</td>")
+
+
+def vendor_frames(rows, parties):
+    raw = pd.DataFrame(list(vendor_rows(rows, parties)), columns=VENDOR_HEADERS)
+    for column in ("Invoice Date", "Payment Date"):
+        raw[column] = pd.to_datetime(raw[column])
+    return normalize_vendor_frame(raw)
+
+
+def legacy_frames(rows, parties):
+    pairs = list(legacy_rows(rows, parties))
+    payment_df = pd.DataFrame([payment for payment, _ in pairs], columns=LEGACY_PAYMENT_HEADERS)
+    debit_df = pd.DataFrame([debit for _, debit in pairs if debit], columns=LEGACY_DEBIT_HEADERS)
+    return payment_df, debit_df
+
+
+def directory(parties):
+    return [{"PartyName": name, "Email": f"vendor{i}@example.com", "CC": ""} for i, name in enumerate(party_names(parties))]
+
+
+@pytest.mark.parametrize("frames", [vendor_frames, legacy_frames], ids=["vendor sheet", "legacy sheets"])
+def test_summary_matches_rendered_statement(frames):
+    payment_df, debit_df = frames(2_000, 40)
+    matched_results, _, _ = match_data(payment_df, debit_df, directory(40))
+    assert matched_results
+    summary = party_summary(payment_df, debit_df, matched_results).set_index("Party")
+    for entry in matched_results:
+        body = render_email_body(entry['party_code'], entry['payments'])
+        total_credit, total_debit, balance = map(float, _TOTALS_RE.search(body).groups())
+        row = summary.loc[entry['party_code']]
+        assert row["Rows"] == len(entry['payments'])
+        assert row["CR"] == pytest.approx(total_credit, abs=0.005)
+        assert row["DR"] == pytest.approx(total_debit, abs=0.005)
+        assert row["Balance"] == pytest.approx(balance, abs=0.005)
+        assert row["Balance"] == pytest.approx(float(_FINAL_RE.search(body).group(1)), abs=0.005)
+
+
+def test_balance_differs_from_net_amount():
+    # Net Amount is Total - DR - CR on vendor sheets; the statement's balance is CR - DR
+    payment_df, debit_df = vendor_frames(200, 5)
+    matched_results, _, _ = match_data(payment_df, debit_df, directory(5))
+    summary = party_summary(payment_df, debit_df, matched_results)
+    assert (summary["Balance"] == (summary["CR"] - summary["DR"]).round(2)).all()
+    assert not (summary["Balance"] == payment_df.groupby("Party Name")["Net Amount"].sum().round(2)
+                .reindex(summary["Party"]).to_numpy()).all()
+
+
+def test_balance_without_debit_column():
+    payment_df, debit_df = legacy_frames(300, 5)
+    payment_df = payment_df.drop(columns="Debit Amount")
+    matched_results, _, _ = match_data(payment_df.assign(**{"Debit Amount": 0.0}), debit_df.iloc[0:0],
+                                       directory(5))
+    summary = party_summary(payment_df, debit_df.iloc[0:0], matched_results)
+    assert "DR" not in summary.columns
+    assert (summary["Balance"] == summary["CR"]).all()
@@ -0,0 +1,145 @@
+import smtplib
+import time
+
+import pytest
+
+from payment_mail_sender.transport import SMTPPool, TokenBucket
+from smtp_sink import SMTPSink
+
+MESSAGE = b"From: ap@example.com\r\nTo: party@example.com\r\nSubject: Statement\r\n\r\nBody\r\n"
+
+
+def pool_for(sink, **options):
+    options.setdefault("use_ssl", False)
+    return SMTPPool("ap@example.com", "secret", host="127.0.0.1", port=sink.port, **options)
+
+
+def send(pool, count):
+    for _ in range(count):
+        pool.send("ap@example.com", ["party@example.com"], MESSAGE)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_spaces_out_acquires():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, burst=2, clock=clock, sleep=clock.sleep)
+    waits = [bucket.acquire() for _ in range(5)]
+    # Two tokens are stored, after that one every quarter second
+    assert waits == pytest.approx([0.0, 0.0, 0.25, 0.25, 0.25])
+    assert clock.now == pytest.approx(0.75)
+
+
+def test_token_bucket_refills_up_to_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    clock.now += 10  # idle time must not bank more than ``burst`` tokens
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_token_bucket_without_rate_never_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=None, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(100)] == [0.0] * 100
+    assert not clock.slept
+
+
+def test_pool_reuses_logged_in_connections():
+    with SMTPSink() as sink:
+        with pool_for(sink, size=2) as pool:
+            send(pool, 10)
+        assert sink.messages == 10
+        # Sequential sends keep taking the most recently used connection
+        assert sink.connections == 1
+        assert sink.logins == 1
+
+
+def test_pool_imap_uses_at_most_size_connections():
+    with SMTPSink(latency=0.001) as sink:
+        with pool_for(sink, size=3) as pool:
+            jobs = (("ap@example.com", ["party@example.com"], MESSAGE, i) for i in range(30))
+            results = list(pool.imap(jobs))
+        assert sorted(tag for tag, _ in results) == list(range(30))
+        assert all(error is None for _, error in results)
+        assert sink.messages == 30
+        assert sink.connections <= 3
+
+
+def test_pool_recycles_after_max_messages_per_connection():
+    with SMTPSink() as sink:
+        with pool_for(sink, size=1, max_messages_per_connection=3) as pool:
+            send(pool, 7)
+        assert sink.messages == 7
+        assert sink.connections == 3
+
+
+def test_pool_reconnects_after_server_disconnect():
+    with SMTPSink(drop_after=2) as sink:
+        with pool_for(sink, size=1) as pool:
+            send(pool, 5)
+            assert pool.reconnects == 2
+        assert sink.messages == 5
+        assert sink.connections == 3
+
+
+def test_pool_gives_up_after_retries():
+    with SMTPSink(drop_after=1) as sink:
+        with pool_for(sink, size=1, retries=0) as pool:
+            send(pool, 1)
+            with pytest.raises(smtplib.SMTPServerDisconnected):
+                send(pool, 1)
+
+
+def test_pool_rate_limit_spaces_out_sends():
+    with SMTPSink() as sink:
+        with pool_for(sink, size=2, rate=50) as pool:
+            start = time.perf_counter()
+            send(pool, 11)
+            elapsed = time.perf_counter() - start
+    # One token up front, then one every 20 ms
+    assert elapsed >= 0.18
+
+
+def test_pool_per_connection_rate_limits_each_connection():
+    with SMTPSink() as sink:
+        with pool_for(sink, size=1, per_connection_rate=50) as pool:
+            start = time.perf_counter()
+            send(pool, 6)
+            elapsed = time.perf_counter() - start
+    assert elapsed >= 0.09
+
+
+def test_failed_login_closes_the_socket(monkeypatch):
+    opened = []
+
+    class RecordingSMTP(smtplib.SMTP):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    monkeypatch.setattr(smtplib, "SMTP", RecordingSMTP)
+    with SMTPSink(password="other") as sink:
+        pool = pool_for(sink, size=1)
+        with pytest.raises(smtplib.SMTPAuthenticationError):
+            send(pool, 1)
+        assert len(opened) == 1
+        assert opened[0].sock is None  # closed, not left for the garbage collector
+        assert sink.messages == 0
+        # The connection slot went back to the pool unconnected, so a later send logs in afresh
+        sink.password = "secret"
+        send(pool, 1)
+        pool.close()
+        assert sink.messages == 1